@@ -0,0 +1,71 @@
+import time
+import asyncio
+import logging
+import tempfile
+from typing import List
+
+import numpy as np
+from llama_index.core import Settings
+from llama_index.core.embeddings import MockEmbedding
+
+from domain.entities import MCSDocumentChunk
+from infrastructure.adapters.llamaindex_adapter import LlamaIndexKnowledgeBase
+from infrastructure.adapters.numpy_adapter import NumpyKnowledgeBase
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger("BenchmarkConcurrentRetrieval")
+
+EMBED_DIM = 1024
+CORPUS_SIZE = 5000
+QUERIES_PER_LEVEL = 64
+CONCURRENCY_LEVELS = [1, 2, 4, 8, 16]
+EMBED_LATENCY_SECONDS = 0.05
+
+class SlowMockEmbedding(MockEmbedding):
+    """Mock embedding that sleeps like a remote embedding API round-trip."""
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        await asyncio.sleep(EMBED_LATENCY_SECONDS)
+        return self._get_vector()
+
+async def run_level(kb, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            await kb.query(f"асуулт {i}", top_k=10)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(QUERIES_PER_LEVEL)))
+    return QUERIES_PER_LEVEL / (time.perf_counter() - started)
+
+async def main():
+    rng = np.random.default_rng(0)
+    chunks = [
+        MCSDocumentChunk(
+            chunk_id=f"chunk_{i}",
+            content=f"Бичвэр {i}",
+            metadata={"file_name": "bench.pdf"},
+            embedding=rng.standard_normal(EMBED_DIM).astype(np.float32).tolist()
+        )
+        for i in range(CORPUS_SIZE)
+    ]
+
+    embed_model = SlowMockEmbedding(embed_dim=EMBED_DIM)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        numpy_kb = NumpyKnowledgeBase(persist_dir=f"{tmp}/np", embed_model=embed_model)
+        await numpy_kb.insert(chunks)
+
+        llama_kb = LlamaIndexKnowledgeBase(persist_dir=f"{tmp}/llama")
+        Settings.embed_model = embed_model
+        await llama_kb.insert(chunks)
+
+        for name, kb in [("numpy", numpy_kb), ("llamaindex", llama_kb)]:
+            for concurrency in CONCURRENCY_LEVELS:
+                qps = await run_level(kb, concurrency)
+                print(f"{name:>10} concurrency={concurrency:>2} throughput={qps:8.1f} queries/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
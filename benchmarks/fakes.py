@@ -0,0 +1,260 @@
+import re
+import time
+import uuid
+import asyncio
+import hashlib
+from functools import lru_cache
+from typing import Any, AsyncGenerator, Generator, List, Optional, Sequence, Union
+
+import numpy as np
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseAsyncGen,
+    CompletionResponseGen,
+    LLMMetadata,
+    MessageRole,
+    ToolCallBlock,
+)
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.core.llms.callbacks import llm_chat_callback, llm_completion_callback
+from llama_index.core.llms.function_calling import FunctionCallingLLM
+from llama_index.core.llms.llm import ToolSelection
+from llama_index.core.tools.types import BaseTool
+from pydantic import Field
+
+from infrastructure.adapters.lexical_index import tokenize
+
+_EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_HOURS_PATTERN = re.compile(r"цаг|hours", re.IGNORECASE)
+
+@lru_cache(maxsize=65536)
+def _token_vector(token: str, dim: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+    return np.random.default_rng(seed).standard_normal(dim, dtype=np.float32)
+
+class FakeEmbedding(BaseEmbedding):
+    """
+    Deterministic stand-in for the Jina embedding API.
+
+    A text's vector is the normalized sum of one fixed random vector per stemmed token, so texts
+    sharing words are close to each other, as with a real model. Every call sleeps `latency`
+    seconds (once per batch for batch calls) to mimic the network round-trip.
+    """
+
+    embed_dim: int = Field(default=1024, gt=0)
+    latency: float = Field(default=0.0, ge=0)
+
+    def __init__(self, embed_dim: int = 1024, latency: float = 0.0, **kwargs: Any):
+        kwargs.setdefault("model_name", "fake-embedding")
+        super().__init__(embed_dim=embed_dim, latency=latency, **kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "FakeEmbedding"
+
+    def _vector(self, text: str) -> List[float]:
+        vector = np.zeros(self.embed_dim, dtype=np.float32)
+        for token in tokenize(text) or [text]:
+            vector += _token_vector(token, self.embed_dim)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm > 0 else vector).tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        time.sleep(self.latency)
+        return self._vector(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return self._vector(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        await asyncio.sleep(self.latency)
+        return self._vector(query)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        await asyncio.sleep(self.latency)
+        return self._vector(text)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+class FakeLLM(FunctionCallingLLM):
+    """
+    Deterministic stand-in for the OpenAI chat models.
+
+    With tools available it behaves like the HR agent: a question mentioning working hours
+    ("цаг") calls `calculate_employee_working_hours` with the email found in the message, any
+    other question calls `ask_knowledge_base`, and once a tool result is present the answer
+    quotes it. Without tools it answers with the start of the prompt. Each call waits
+    `latency` seconds before the first token, then streams `stream_tokens` tokens
+    `token_latency` seconds apart.
+    """
+
+    latency: float = Field(default=0.0, ge=0)
+    token_latency: float = Field(default=0.0, ge=0)
+    stream_tokens: int = Field(default=20, gt=0)
+    answer_chars: int = Field(default=400, gt=0)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "FakeLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="fake-llm", is_chat_model=True, is_function_calling_model=True)
+
+    def _respond(self, messages: Sequence[ChatMessage], tools: Sequence[BaseTool]) -> ChatMessage:
+        if messages and messages[-1].role == MessageRole.TOOL:
+            return ChatMessage(
+                role=MessageRole.ASSISTANT,
+                content=f"Хариулт:\n{(messages[-1].content or '')[:self.answer_chars]}"
+            )
+
+        question = next((m.content or "" for m in reversed(messages) if m.role == MessageRole.USER), "")
+        tool_names = {tool.metadata.name for tool in tools}
+
+        email = _EMAIL_PATTERN.search(question)
+        if email and _HOURS_PATTERN.search(question) and "calculate_employee_working_hours" in tool_names:
+            call = ToolCallBlock(
+                tool_call_id=f"call_{uuid.uuid4().hex}",
+                tool_name="calculate_employee_working_hours",
+                tool_kwargs={"employee_email": email.group(0)}
+            )
+            return ChatMessage(role=MessageRole.ASSISTANT, blocks=[call])
+
+        if "ask_knowledge_base" in tool_names:
+            query = question.rsplit("Ажилтны асуулт:", 1)[-1].strip()
+            call = ToolCallBlock(
+                tool_call_id=f"call_{uuid.uuid4().hex}",
+                tool_name="ask_knowledge_base",
+                tool_kwargs={"query": query}
+            )
+            return ChatMessage(role=MessageRole.ASSISTANT, blocks=[call])
+
+        prompt = "\n".join(m.content or "" for m in messages)
+        return ChatMessage(role=MessageRole.ASSISTANT, content=f"Хариулт:\n{prompt[:self.answer_chars]}")
+
+    def _deltas(self, text: str) -> List[str]:
+        if not text:
+            return [""]
+        size = max(1, -(-len(text) // self.stream_tokens))
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    @llm_chat_callback()
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        time.sleep(self.latency + self.token_latency * self.stream_tokens)
+        message = self._respond(messages, kwargs.get("tools") or [])
+        return ChatResponse(message=message, delta=message.content)
+
+    @llm_chat_callback()
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        await asyncio.sleep(self.latency + self.token_latency * self.stream_tokens)
+        message = self._respond(messages, kwargs.get("tools") or [])
+        return ChatResponse(message=message, delta=message.content)
+
+    @llm_chat_callback()
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        message = self._respond(messages, kwargs.get("tools") or [])
+
+        def gen() -> Generator[ChatResponse, None, None]:
+            time.sleep(self.latency)
+            text = ""
+            for delta in self._deltas(message.content or ""):
+                time.sleep(self.token_latency)
+                text += delta
+                yield ChatResponse(
+                    message=message if not message.content
+                    else ChatMessage(role=MessageRole.ASSISTANT, content=text),
+                    delta=delta
+                )
+
+        return gen()
+
+    @llm_chat_callback()
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        message = self._respond(messages, kwargs.get("tools") or [])
+
+        async def gen() -> AsyncGenerator[ChatResponse, None]:
+            await asyncio.sleep(self.latency)
+            text = ""
+            for delta in self._deltas(message.content or ""):
+                await asyncio.sleep(self.token_latency)
+                text += delta
+                yield ChatResponse(
+                    message=message if not message.content
+                    else ChatMessage(role=MessageRole.ASSISTANT, content=text),
+                    delta=delta
+                )
+
+        return gen()
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        response = self.chat([ChatMessage(role=MessageRole.USER, content=prompt)])
+        return CompletionResponse(text=response.message.content or "")
+
+    @llm_completion_callback()
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        response = await self.achat([ChatMessage(role=MessageRole.USER, content=prompt)])
+        return CompletionResponse(text=response.message.content or "")
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        def gen() -> Generator[CompletionResponse, None, None]:
+            text = ""
+            for response in self.stream_chat([ChatMessage(role=MessageRole.USER, content=prompt)]):
+                text += response.delta or ""
+                yield CompletionResponse(text=text, delta=response.delta)
+
+        return gen()
+
+    @llm_completion_callback()
+    async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseAsyncGen:
+        async def gen() -> AsyncGenerator[CompletionResponse, None]:
+            text = ""
+            async for response in await self.astream_chat([ChatMessage(role=MessageRole.USER, content=prompt)]):
+                text += response.delta or ""
+                yield CompletionResponse(text=text, delta=response.delta)
+
+        return gen()
+
+    def _prepare_chat_with_tools(
+            self,
+            tools: Sequence[BaseTool],
+            user_msg: Optional[Union[str, ChatMessage]] = None,
+            chat_history: Optional[List[ChatMessage]] = None,
+            verbose: bool = False,
+            allow_parallel_tool_calls: bool = False,
+            **kwargs: Any
+        ) -> dict:
+
+        messages = list(chat_history or [])
+        if isinstance(user_msg, str):
+            messages.append(ChatMessage(role=MessageRole.USER, content=user_msg))
+        elif user_msg is not None:
+            messages.append(user_msg)
+        return {"messages": messages, "tools": tools}
+
+    def get_tool_calls_from_response(
+            self,
+            response: ChatResponse,
+            error_on_no_tool_call: bool = False,
+            **kwargs: Any
+        ) -> List[ToolSelection]:
+
+        calls = [block for block in response.message.blocks if isinstance(block, ToolCallBlock)]
+        if not calls and error_on_no_tool_call:
+            raise ValueError("Expected at least one tool call, but got none.")
+        return [
+            ToolSelection(tool_id=call.tool_call_id or "", tool_name=call.tool_name, tool_kwargs=call.tool_kwargs)
+            for call in calls
+        ]
@@ -0,0 +1,431 @@
+import os
+import io
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import itertools
+import contextlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from botbuilder.schema import Activity, ActivityTypes, ChannelAccount, ConversationAccount, ResourceResponse
+from botbuilder.schema.teams import TeamsChannelAccount
+from llama_index.core import Settings
+from llama_index.core.base.llms.types import ChatMessage, MessageRole, ToolCallBlock
+from llama_index.core.memory import ChatMemoryBuffer
+from llama_index.core.utils import get_tokenizer
+
+from benchmarks.fakes import FakeEmbedding, FakeLLM
+from domain.entities import MCSDocumentChunk
+from infrastructure.adapters.llamaindex_adapter import LlamaIndexKnowledgeBase
+from infrastructure.adapters.numpy_adapter import NumpyKnowledgeBase
+from infrastructure.adapters.timesheet_repository import CsvTimesheetRepository
+from services.document_service import DocumentService
+from services.knowledge_service import KnowledgeService
+from services.semantic_cache import SemanticCache
+from services.context_assembler import ContextAssembler
+from services.conversation_memory import CompactingChatMemory
+from services import react_service
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger("BenchmarkSuite")
+
+EMBED_DIM = 1024
+QUERIES = [
+    "Ээлжийн амралтын цалинг хэрхэн тооцдог вэ?",
+    "Өвчтэй үед чөлөө хэрхэн авах вэ?",
+    "Сонгон шалгаруулалтын үе шатууд юу вэ?",
+    "Цалинтай чөлөө хэдэн хоног авч болох вэ?",
+    "Ажилтан ээлжийн амралтаа хэсэгчлэн эдэлж болох уу?",
+    "Миний энэ сарын ажилласан цаг хэд вэ?",
+    "Миний цалингийн цаг хэд болсон бэ?",
+    "Гэрээс ажиллах журам ямар вэ?",
+]
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """Milliseconds: p50/p95/p99, mean and max of samples given in seconds."""
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        "count": int(len(ms)),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "max_ms": float(ms.max()),
+    }
+
+def use_fake_models(args: argparse.Namespace) -> None:
+    """Points Settings and the agent at the local stand-ins. LlamaIndexKnowledgeBase resets Settings, so call after creating one."""
+    Settings.embed_model = FakeEmbedding(embed_dim=EMBED_DIM, latency=args.embed_latency)
+    Settings.llm = FakeLLM(latency=args.llm_latency, token_latency=args.token_latency)
+    react_service.workflow.llm = Settings.llm
+
+def synthetic_chunks(count: int, seed: int = 0) -> List[MCSDocumentChunk]:
+    """Chunks of random words drawn from the queries' vocabulary plus filler, embedded without latency."""
+    rng = np.random.default_rng(seed)
+    vocabulary = sorted({word for query in QUERIES for word in query.rstrip("?").split()})
+    vocabulary += [f"үг{i}" for i in range(2000)]
+    embed_model = FakeEmbedding(embed_dim=EMBED_DIM)
+
+    chunks = []
+    for i in range(count):
+        content = " ".join(rng.choice(vocabulary, size=60))
+        chunks.append(MCSDocumentChunk(
+            chunk_id=f"synthetic_chunk_{i}",
+            content=content,
+            metadata={"file_name": f"synthetic_{i // 50}.pdf", "page_label": str(i % 50 + 1)},
+            embedding=embed_model.get_text_embedding(content)
+        ))
+    return chunks
+
+def synthetic_timesheet(path: str, rows: int, employees: int = 200, seed: int = 0) -> List[str]:
+    """Writes a timesheet CSV in the export format and returns the employee emails."""
+    rng = np.random.default_rng(seed)
+    emails = [f"employee{i}@techpack.mn" for i in range(employees)]
+
+    clock_in = pd.Timestamp("2025-06-01 08:00") + pd.to_timedelta(
+        np.sort(rng.integers(0, 365 * 24 * 60, size=rows)), unit="m"
+    )
+    working = rng.uniform(4, 11, size=rows).round(2)
+    clock_out = clock_in + pd.to_timedelta(working, unit="h")
+
+    pd.DataFrame({
+        "employee_email": rng.choice(emails, size=rows),
+        "clock_in": clock_in.strftime("%m/%d/%Y %H:%M"),
+        "clock_out": clock_out.strftime("%m/%d/%Y %H:%M"),
+        "total_working_hours": working,
+        "total_salary_hours": np.minimum(working, 8),
+    }).to_csv(path, index=False)
+    return emails
+
+async def bench_ingestion(args: argparse.Namespace, tmp: str) -> Dict[str, Any]:
+    document_service = DocumentService(manifest_path=os.path.join(tmp, "manifest.json"))
+
+    started = time.perf_counter()
+    chunks = await document_service.ingest_documents(args.docs)
+    parse_seconds = time.perf_counter() - started
+
+    kb = LlamaIndexKnowledgeBase(persist_dir=os.path.join(tmp, "ingestion_storage"))
+    use_fake_models(args)
+    knowledge_service = KnowledgeService(kb)
+
+    started = time.perf_counter()
+    await knowledge_service.insert(chunks)
+    insert_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await kb.persist()
+    persist_seconds = time.perf_counter() - started
+
+    return {
+        "files": len({chunk.metadata.get("file_name") for chunk in chunks}),
+        "chunks": len(chunks),
+        "parse_seconds": parse_seconds,
+        "embed_insert_seconds": insert_seconds,
+        "persist_seconds": persist_seconds,
+        "parse_chunks_per_second": len(chunks) / parse_seconds if parse_seconds else None,
+        "embed_insert_chunks_per_second": len(chunks) / insert_seconds if insert_seconds else None,
+    }
+
+async def bench_query(args: argparse.Namespace, tmp: str) -> List[Dict[str, Any]]:
+    results = []
+    for size in args.corpus_sizes:
+        kb = LlamaIndexKnowledgeBase(persist_dir=os.path.join(tmp, f"query_storage_{size}"))
+        use_fake_models(args)
+        await kb.insert(synthetic_chunks(size))
+
+        samples = []
+        for i in range(args.queries):
+            started = time.perf_counter()
+            await kb.query(QUERIES[i % len(QUERIES)], top_k=10)
+            samples.append(time.perf_counter() - started)
+
+        results.append({"corpus_size": size, "top_k": 10, **latency_summary(samples)})
+        logger.warning(f"query corpus={size}: p50={results[-1]['p50_ms']:.1f}ms")
+    return results
+
+async def bench_quantization(args: argparse.Namespace, tmp: str) -> List[Dict[str, Any]]:
+    """Recall@10 of quantized NumpyKnowledgeBase search against exact search, with in-memory index size and latency."""
+    embed_model = FakeEmbedding(embed_dim=EMBED_DIM)
+    rng = np.random.default_rng(1)
+    results = []
+
+    for size in args.corpus_sizes:
+        chunks = synthetic_chunks(size)
+        queries = QUERIES + [
+            " ".join(chunks[i].content.split()[:8])
+            for i in rng.choice(size, size=max(args.queries - len(QUERIES), 0))
+        ]
+        queries = queries[:args.queries]
+
+        exact_ids = None
+        for mode in [None, "int8", "binary"]:
+            persist_dir = os.path.join(tmp, f"quantization_{size}_{mode or 'float32'}")
+            kb = NumpyKnowledgeBase(persist_dir=persist_dir, embed_model=embed_model, quantization=mode)
+            await kb.insert(chunks)
+            await kb.persist()
+
+            samples = []
+            ids = []
+            for query in queries:
+                started = time.perf_counter()
+                result = await kb.query(query, top_k=10)
+                samples.append(time.perf_counter() - started)
+                ids.append({chunk.chunk_id for chunk in result.chunks})
+
+            if exact_ids is None:
+                exact_ids = ids
+            recall = float(np.mean([len(found & expected) / len(expected) for found, expected in zip(ids, exact_ids)]))
+
+            results.append({
+                "corpus_size": size,
+                "quantization": mode or "float32",
+                "index_bytes": kb.index_nbytes(),
+                "recall_at_10": recall,
+                **latency_summary(samples),
+            })
+            logger.warning(
+                f"quantization corpus={size} mode={mode or 'float32'}: {results[-1]['index_bytes'] / 2**20:.1f}MiB "
+                f"recall@10={recall:.3f} p50={results[-1]['p50_ms']:.1f}ms"
+            )
+    return results
+
+def bench_timesheet(args: argparse.Namespace, tmp: str) -> List[Dict[str, Any]]:
+    results = []
+    original = react_service.timesheet_repository
+
+    try:
+        for rows in args.csv_rows:
+            path = os.path.join(tmp, f"timesheet_{rows}.csv")
+            emails = synthetic_timesheet(path, rows)
+            react_service.timesheet_repository = CsvTimesheetRepository(path)
+
+            samples = []
+            # The tool prints its result; keep that out of the benchmark output.
+            with contextlib.redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                react_service.calculate_employee_working_hours(emails[0])
+                cold_seconds = time.perf_counter() - started
+
+                for i in range(args.timesheet_calls):
+                    started = time.perf_counter()
+                    react_service.calculate_employee_working_hours(emails[i % len(emails)])
+                    samples.append(time.perf_counter() - started)
+
+            # Whole-company report for a window the tool has not cached, as run at a payroll cut-off.
+            started = time.perf_counter()
+            report = react_service.timesheet_repository.working_hours_report(pd.Timestamp("2025-06-01"), pd.Timestamp("2026-06-01"))
+            report_seconds = time.perf_counter() - started
+
+            results.append({
+                "csv_rows": rows,
+                "cold_ms": cold_seconds * 1000,
+                "org_report_ms": report_seconds * 1000,
+                "org_report_employees": len(report),
+                **latency_summary(samples)
+            })
+            logger.warning(
+                f"timesheet rows={rows}: cold={cold_seconds * 1000:.1f}ms p50={results[-1]['p50_ms']:.3f}ms "
+                f"org report={report_seconds * 1000:.1f}ms"
+            )
+    finally:
+        react_service.timesheet_repository = original
+    return results
+
+async def bench_memory(args: argparse.Namespace, tmp: str) -> List[Dict[str, Any]]:
+    """
+    History tokens the agent sends on each turn of one long conversation in which every turn
+    calls ask_knowledge_base, with the default buffer (sized to gpt-4o-mini's context window)
+    and with CompactingChatMemory summarizing through the stand-in LLM after each turn.
+    """
+    tokenizer = get_tokenizer()
+    chunks = synthetic_chunks(200, seed=3)
+    assembler = ContextAssembler(token_budget=3000, tokenizer=tokenizer)
+    memories = {
+        "buffer": ChatMemoryBuffer.from_defaults(token_limit=int(128_000 * 0.75)),
+        "compacting": CompactingChatMemory(
+            token_limit=args.memory_token_limit,
+            summary_llm=FakeLLM(latency=args.llm_latency, answer_chars=1200)
+        ),
+    }
+
+    results = []
+    for name, memory in memories.items():
+        history_tokens: List[int] = []
+        compaction_seconds: List[float] = []
+
+        for turn in range(args.memory_turns):
+            question = QUERIES[turn % len(QUERIES)]
+            await memory.aput(ChatMessage(role=MessageRole.USER, content=f"employee{turn % 7}@techpack.mn: {question}"))
+            sent = await memory.aget()
+            history_tokens.append(len(tokenizer(" ".join(str(message.content or "") for message in sent))))
+
+            call_id = f"call_{turn}"
+            context = assembler.assemble(question, chunks[turn % 20 * 10:turn % 20 * 10 + 10])
+            await memory.aput_messages([
+                ChatMessage(role=MessageRole.ASSISTANT, blocks=[
+                    ToolCallBlock(tool_call_id=call_id, tool_name="ask_knowledge_base", tool_kwargs={"query": question})
+                ]),
+                ChatMessage(role=MessageRole.TOOL, content=context.text, additional_kwargs={"tool_call_id": call_id}),
+                ChatMessage(role=MessageRole.ASSISTANT, content=f"Хариулт [Citation 1]: {context.text[:600]}"),
+            ])
+
+            if isinstance(memory, CompactingChatMemory) and memory.needs_compaction():
+                started = time.perf_counter()
+                await memory.acompact()
+                compaction_seconds.append(time.perf_counter() - started)
+
+        results.append({
+            "memory": name,
+            "turns": args.memory_turns,
+            "history_tokens_by_turn": history_tokens,
+            "max_history_tokens": max(history_tokens),
+            "final_history_tokens": history_tokens[-1],
+            "compactions": len(compaction_seconds),
+            "compaction": latency_summary(compaction_seconds) if compaction_seconds else None,
+        })
+        logger.warning(
+            f"memory {name}: turn 1={history_tokens[0]} turn {args.memory_turns}={history_tokens[-1]} "
+            f"max={max(history_tokens)} tokens, {len(compaction_seconds)} compactions"
+        )
+    return results
+
+class FakeTurnContext:
+    """The parts of TurnContext the bot uses; sent activities are recorded instead of posted to Teams."""
+
+    def __init__(self, text: str, conversation_id: str, user_id: str):
+        self.activity = Activity(
+            type=ActivityTypes.message,
+            text=text,
+            conversation=ConversationAccount(id=conversation_id),
+            from_property=ChannelAccount(id=user_id),
+        )
+        self.sent: List[Activity] = []
+        self.first_message_at: float | None = None
+
+    async def send_activity(self, activity: Activity) -> ResourceResponse:
+        if activity.type == ActivityTypes.message and self.first_message_at is None:
+            self.first_message_at = time.perf_counter()
+        self.sent.append(activity)
+        return ResourceResponse(id=f"activity_{len(self.sent)}")
+
+    async def update_activity(self, activity: Activity) -> ResourceResponse:
+        return ResourceResponse(id=activity.id)
+
+async def bench_bot_turns(args: argparse.Namespace, tmp: str) -> List[Dict[str, Any]]:
+    import bot as bot_module
+    from bot import MCSHumanResourcesBot
+    from services.intent_router import IntentRouter
+    from services.llm_service import LLMService
+
+    class BenchmarkBot(MCSHumanResourcesBot):
+        async def _fetch_member(self, turn_context) -> TeamsChannelAccount:
+            await asyncio.sleep(args.teams_latency)
+            user_id = turn_context.activity.from_property.id
+            return TeamsChannelAccount(id=user_id, email=user_id)
+
+    document_service = DocumentService(manifest_path=os.path.join(tmp, "bot_manifest.json"))
+    kb = LlamaIndexKnowledgeBase(persist_dir=os.path.join(tmp, "bot_storage"))
+    use_fake_models(args)
+    knowledge_service = KnowledgeService(kb, semantic_cache=SemanticCache())
+    await knowledge_service.insert(await document_service.ingest_documents(args.docs))
+    react_service.set_knowledge_service(knowledge_service)
+    bot_module.llm_service = LLMService(llm=Settings.llm)
+
+    emails = react_service.timesheet_repository.frame()["employee_email"].astype(str).unique().tolist()
+    bot = BenchmarkBot()
+    results = []
+
+    for routed, concurrency in itertools.product((False, True), args.concurrency):
+        router = IntentRouter() if routed else None
+        bot_module.intent_router = router
+        semaphore = asyncio.Semaphore(concurrency)
+        samples: List[float] = []
+        first_message: List[float] = []
+
+        async def turn(i: int) -> None:
+            email = emails[i % len(emails)]
+            turn_context = FakeTurnContext(QUERIES[i % len(QUERIES)], f"conversation_{routed}_{concurrency}_{i % 32}", email)
+            async with semaphore:
+                started = time.perf_counter()
+                await bot.on_message_activity(turn_context)
+                samples.append(time.perf_counter() - started)
+                if turn_context.first_message_at is not None:
+                    first_message.append(turn_context.first_message_at - started)
+
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await asyncio.gather(*(turn(i) for i in range(args.turns)))
+        elapsed = time.perf_counter() - started
+
+        results.append({
+            "intent_router": routed,
+            "routes": dict(router.routes) if router is not None else None,
+            "concurrency": concurrency,
+            "turns_per_second": args.turns / elapsed,
+            **latency_summary(samples),
+            "first_message": latency_summary(first_message),
+        })
+        logger.warning(
+            f"bot router={'on' if routed else 'off'} concurrency={concurrency}: p50={results[-1]['p50_ms']:.0f}ms "
+            f"p95={results[-1]['p95_ms']:.0f}ms p99={results[-1]['p99_ms']:.0f}ms"
+        )
+    return results
+
+async def main(args: argparse.Namespace) -> None:
+    report: Dict[str, Any] = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {"python": sys.version.split()[0], "platform": platform.platform(), "cpus": os.cpu_count()},
+        "settings": {
+            key: value for key, value in vars(args).items() if key not in ("output", "only")
+        },
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if "ingestion" in args.only:
+            report["ingestion"] = await bench_ingestion(args, tmp)
+        if "query" in args.only:
+            report["query"] = await bench_query(args, tmp)
+        if "quantization" in args.only:
+            report["quantization"] = await bench_quantization(args, tmp)
+        if "timesheet" in args.only:
+            report["timesheet"] = await asyncio.to_thread(bench_timesheet, args, tmp)
+        if "memory" in args.only:
+            report["memory"] = await bench_memory(args, tmp)
+        if "bot" in args.only:
+            report["bot_turns"] = await bench_bot_turns(args, tmp)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Benchmark results written to {args.output}.")
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline performance benchmarks with local stand-ins for Jina and OpenAI.")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--only", nargs="+", default=["ingestion", "query", "quantization", "timesheet", "memory", "bot"],
+                        choices=["ingestion", "query", "quantization", "timesheet", "memory", "bot"])
+    parser.add_argument("--docs", default="docs", help="Directory of PDFs used for ingestion and the bot's knowledge base.")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Seconds per embedding API call.")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds before an LLM call's first token.")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="Seconds between streamed LLM tokens.")
+    parser.add_argument("--teams-latency", type=float, default=0.2, help="Seconds per uncached Teams member lookup.")
+    parser.add_argument("--corpus-sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--queries", type=int, default=50, help="Queries per corpus size.")
+    parser.add_argument("--csv-rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--timesheet-calls", type=int, default=200, help="Tool calls per CSV size.")
+    parser.add_argument("--memory-turns", type=int, default=60, help="Turns of the long conversation in the memory benchmark.")
+    parser.add_argument("--memory-token-limit", type=int, default=3000, help="Token budget of the compacting memory.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--turns", type=int, default=64, help="Bot turns per concurrency level.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -1,19 +1,62 @@
+import os
+import asyncio
+
 from botbuilder.core import ActivityHandler, TurnContext
 from botbuilder.schema import Activity, ActivityTypes
+from botbuilder.schema.teams import TeamsChannelAccount
 from botbuilder.core.teams import TeamsInfo
+from llama_index.core.agent.workflow import ToolCallResult
 
 from services.knowledge_service import KnowledgeService
 from services.llm_service import LLMService
 
 
-from services.react_service import workflow, ctx
+from services.react_service import workflow, context_store, get_knowledge_service, answer_cache, calculate_employee_working_hours, retrieve_policy_chunks, UNKNOWN_EMAIL
+from services.intent_router import IntentRouter, POLICY, WORKING_HOURS
+from services.member_cache import MemberProfileCache
+from streaming import TeamsResponseStreamer
+from infrastructure.telemetry import span, trace
 
 #kb_service = KnowledgeService(None)
-#llm_service = LLMService(None)
+
+# Synthesizes the intent router's policy answers; created on first use, so importing the bot builds no LLM client.
+llm_service: LLMService | None = None
+
+def get_llm_service() -> LLMService:
+    global llm_service
+
+    if llm_service is None:
+        llm_service = LLMService()
+    return llm_service
+
+# Clear working-hours and policy questions skip the agent's planning call; the rest go to the agent.
+intent_router = (
+    IntentRouter(
+        threshold=float(os.getenv("INTENT_ROUTER_THRESHOLD", "0.75")),
+        margin=float(os.getenv("INTENT_ROUTER_MARGIN", "0.05"))
+    )
+    if os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+    else None
+)
+
+# Only answers grounded purely in the knowledge base are safe to share between employees.
+CACHEABLE_TOOLS = {"ask_knowledge_base"}
+
+# "update" edits one message as tokens arrive, "chunked" sends paragraphs, "off" sends the final answer only.
+STREAMING_MODE = os.getenv("STREAMING_MODE", "update")
+
+member_cache: MemberProfileCache[TeamsChannelAccount] = MemberProfileCache(
+    ttl_seconds=float(os.getenv("MEMBER_CACHE_TTL_SECONDS", "3600")),
+    max_size=int(os.getenv("MEMBER_CACHE_SIZE", "4096"))
+)
 
 class MCSHumanResourcesBot(ActivityHandler):
 
     async def on_message_activity(self, turn_context: TurnContext):
+        with trace("bot.turn", conversation_id=turn_context.activity.conversation.id):
+            await self._answer_message(turn_context)
+
+    async def _answer_message(self, turn_context: TurnContext):
         
         await turn_context.send_activity(
             Activity(type=ActivityTypes.typing)
@@ -21,21 +64,94 @@ class MCSHumanResourcesBot(ActivityHandler):
 
         query = turn_context.activity.text.strip()
 
-        member = await TeamsInfo.get_member(
-            turn_context,
-            turn_context.activity.from_property.id
-        )
+        email = await self._get_member_email(turn_context) or UNKNOWN_EMAIL
+        # Without an email the agent must not call the employee-specific tools (they refuse it as well).
+        email_line = email if email != UNKNOWN_EMAIL else f"{UNKNOWN_EMAIL} (профайлыг олж чадсангүй)"
+        employee_query = f"Ажилтны email: {email_line}\nАжилтны асуулт: {query}"
 
-        email = member.email
-        employee_query = f"Ажилтны email: {email}\nАжилтны асуулт: {query}"
-        response = await workflow.run(user_msg=employee_query, ctx=ctx)
-        
-        #context = await kb_service.query(query, top_k=5)
-        #response = await llm_service.synthesize_response(query, context.chunks)
+        knowledge_service = await get_knowledge_service()
 
-        await turn_context.send_activity(
-            Activity(
-                type=ActivityTypes.message,
-                text=response
+        response = None
+        if answer_cache is not None:
+            cached = await answer_cache.lookup(query, knowledge_service.version, require_answer=True)
+            if cached is not None:
+                response = cached.answer
+
+        if response is None and intent_router is not None:
+            response = await self._answer_directly(turn_context, query, email, employee_query, knowledge_service)
+
+        if response is not None:
+            await turn_context.send_activity(
+                Activity(
+                    type=ActivityTypes.message,
+                    text=response
+                )
+            )
+            return
+
+        async with TeamsResponseStreamer(turn_context, mode=STREAMING_MODE) as streamer:
+            async with context_store.session(turn_context.activity.conversation.id) as ctx:
+                with span("agent.run"):
+                    handler = workflow.run(user_msg=employee_query, ctx=ctx)
+
+                    tools_used = set()
+                    async for event in handler.stream_events():
+                        if isinstance(event, ToolCallResult):
+                            tools_used.add(event.tool_name)
+                        await streamer.on_event(event)
+
+                    response = str(await handler)
+
+            await streamer.finish(response)
+
+        if answer_cache is not None and tools_used and tools_used <= CACHEABLE_TOOLS:
+            await answer_cache.store(query, knowledge_service.version, answer=response)
+
+    async def _answer_directly(
+            self,
+            turn_context: TurnContext,
+            query: str,
+            email: str,
+            employee_query: str,
+            knowledge_service: KnowledgeService
+        ) -> str | None:
+        """
+        Answers a message the intent router is confident about with one tool call or with retrieval
+        and a single synthesis call. Returns None when the message should go to the agent.
+        """
+        route = await intent_router.route(query)
+
+        if route.intent == WORKING_HOURS and email != UNKNOWN_EMAIL:
+            with span("router.working_hours"):
+                # Reads and aggregates the timesheet, so it runs off the event loop.
+                response = await asyncio.to_thread(calculate_employee_working_hours, email)
+        elif route.intent == POLICY:
+            with span("router.policy"):
+                chunks = await retrieve_policy_chunks(query)
+                if not chunks:
+                    return None
+                response = await get_llm_service().synthesize_response(query, chunks)
+            if answer_cache is not None:
+                await answer_cache.store(query, knowledge_service.version, answer=response)
+        else:
+            return None
+
+        await context_store.record(turn_context.activity.conversation.id, employee_query, response)
+        return response
+
+    async def _get_member_email(self, turn_context: TurnContext) -> str | None:
+        """Returns the sender's email address from the member cache, or None if it cannot be looked up."""
+        sender = turn_context.activity.from_property
+        member = await member_cache.get(
+            sender.aad_object_id or sender.id,
+            lambda: self._fetch_member(turn_context)
+        )
+        return member.email if member is not None else None
+
+    async def _fetch_member(self, turn_context: TurnContext) -> TeamsChannelAccount:
+        """Looks up the sender in the Teams roster."""
+        with span("teams.get_member"):
+            return await TeamsInfo.get_member(
+                turn_context,
+                turn_context.activity.from_property.id
             )
-        )
\ No newline at end of file
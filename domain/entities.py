@@ -1,6 +1,7 @@
-from typing import Dict, List, Optional, Union
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Union
 from pydantic import BaseModel, Field, ConfigDict
-from datetime import datetime
+from datetime import date, datetime
 
 primitive = Union[str, int, float, bool, None]
 
@@ -14,6 +15,66 @@ class MCSDocumentChunk(BaseModel):
     metadata: Dict[str, primitive] = Field(default_factory=dict)
     embedding: Optional[List[float]] = None
 
+class ChunkView:
+    """
+    Read-only view of a retrieved chunk for the query path.
+    Holds references to the index's own text, metadata and vector instead of copies: the
+    score is merged into `metadata` only when it is read, and `embedding` (a sequence, an
+    array or a zero-argument callable) is only converted to a list when accessed. `metadata`
+    is read-only, so a caller cannot change the index's copy.
+    Use `to_chunk()` where an MCSDocumentChunk is needed.
+    """
+    __slots__ = ("chunk_id", "content", "score", "_metadata", "_embedding")
+
+    def __init__(
+            self,
+            chunk_id: str,
+            content: str,
+            metadata: Dict[str, primitive],
+            score: Optional[float] = None,
+            embedding: Union[Sequence[float], Callable[[], Optional[Sequence[float]]], None] = None
+        ):
+
+        self.chunk_id = chunk_id
+        self.content = content
+        self.score = score
+        self._metadata = metadata
+        self._embedding = embedding
+
+    @classmethod
+    def of(cls, chunk: Union["ChunkView", MCSDocumentChunk], score: Optional[float] = None) -> "ChunkView":
+        """Wraps a chunk or view, replacing its score when one is given."""
+        if isinstance(chunk, ChunkView):
+            return cls(chunk.chunk_id, chunk.content, chunk._metadata, chunk.score if score is None else score, chunk._embedding)
+        metadata = chunk.metadata
+        return cls(chunk.chunk_id, chunk.content, metadata, metadata.get("score") if score is None else score, chunk.embedding)
+
+    @property
+    def metadata(self) -> Mapping[str, primitive]:
+        if self.score is None:
+            return MappingProxyType(self._metadata)
+        return MappingProxyType({**self._metadata, "score": self.score})
+
+    @property
+    def embedding(self) -> Optional[List[float]]:
+        embedding = self._embedding
+        if callable(embedding):
+            embedding = embedding()
+        if embedding is None:
+            return None
+        return embedding.tolist() if hasattr(embedding, "tolist") else list(embedding)
+
+    def to_chunk(self, include_embedding: bool = False) -> MCSDocumentChunk:
+        return MCSDocumentChunk(
+            chunk_id=self.chunk_id,
+            content=self.content,
+            metadata=dict(self.metadata),
+            embedding=self.embedding if include_embedding else None
+        )
+
+    def __repr__(self) -> str:
+        return f"ChunkView(chunk_id={self.chunk_id!r}, score={self.score!r}, content={self.content[:40]!r})"
+
 class MCSDocument(BaseModel):
     """
     Domain model for source documents
@@ -29,7 +90,66 @@ class QueryResult(BaseModel):
     """
     Domain model for query results
     A framework-agnostic representation of a query result.
+    Knowledge bases return ChunkViews; MCSDocumentChunks are accepted as well.
     """
-    chunks: List[MCSDocumentChunk]
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    chunks: List[Union[ChunkView, MCSDocumentChunk]]
     response: str
-    metadata: Dict[str, primitive] = Field(default_factory=dict)
\ No newline at end of file
+    metadata: Dict[str, primitive] = Field(default_factory=dict)
+
+class ChunkFilter(BaseModel):
+    """
+    Domain model for metadata filters on knowledge base queries
+    Narrows the chunks a query scores; unset fields do not filter. Document codes and
+    effective dates are those parsed from the file names, e.g. "HR-0506R" and 2024-02-05.
+    With `latest_only`, chunks of older versions of the same document code are left out.
+    """
+    document_codes: List[str] = Field(default_factory=list)
+    file_names: List[str] = Field(default_factory=list)
+    effective_from: Optional[date] = None
+    effective_to: Optional[date] = None
+    page_from: Optional[int] = None
+    page_to: Optional[int] = None
+    latest_only: bool = False
+
+class RosterSchedule(BaseModel):
+    """
+    Domain model for an employee's work roster
+    A rotation of `days_on` shifts of `shift_hours` followed by `days_off` rest days, repeating from `anchor`.
+    """
+    model_config = ConfigDict(frozen=True)
+
+    anchor: date
+    days_on: int = 14
+    days_off: int = 14
+    shift_hours: float = 12.0
+
+class TimesheetSubmission(BaseModel):
+    """
+    Domain model for a timesheet entry submitted to the ERP
+    Tracked from the moment it is durably queued (status "queued") until the ERP accepts
+    ("sent") or rejects ("rejected") it, or retries are exhausted ("failed"). The idempotency
+    key identifies the entry to the ERP, so a retried batch never books it twice.
+    """
+    submission_id: str
+    idempotency_key: str
+    employee_email: str
+    timestamp: str
+    hours: float
+    absence_type: str
+    status: str = "queued"
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+class IngestionBatch(BaseModel):
+    """
+    Domain model for an incremental ingestion run
+    Chunks of new or changed files to insert and chunk IDs of changed or removed files to delete.
+    """
+    chunks: List[MCSDocumentChunk]
+    deleted_chunk_ids: List[str] = Field(default_factory=list)
+    changed_files: List[str] = Field(default_factory=list)
+    removed_files: List[str] = Field(default_factory=list)
\ No newline at end of file
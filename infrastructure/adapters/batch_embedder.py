@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from llama_index.core import Settings
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from domain.entities import MCSDocumentChunk
+from infrastructure.adapters.embedding_cache import CachedEmbedding
+from infrastructure.model_gateway import GatewayEmbedding
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("BatchEmbedder")
+
+class BatchEmbedder:
+    """
+    Embeds document chunks in fixed-size batches with a bounded number of concurrent
+    requests to the embedding provider. Failed batches are retried with exponential backoff
+    and jitter, unless the model goes through the ModelGateway, whose retries and retry budget
+    then are the only ones. When a checkpoint path is set, every completed batch is appended to it, so
+    a failed run can be resumed without re-embedding the batches that already succeeded. The
+    checkpoint is read once per embedder; its embeddings are handed out once and it is cleared
+    when the knowledge base has persisted them.
+    """
+
+    def __init__(
+            self,
+            embed_model: BaseEmbedding | None = None,
+            batch_size: int = 64,
+            max_concurrency: int = 4,
+            max_retries: int = 5,
+            backoff_seconds: float = 1.0,
+            checkpoint_path: str | None = None
+        ):
+
+        self._embed_model = embed_model
+        self._batch_size = batch_size
+        self._max_concurrency = max_concurrency
+        self._max_retries = max_retries
+        self._backoff_seconds = backoff_seconds
+        self._checkpoint_path = checkpoint_path
+
+        # Embeddings from the checkpoint not yet handed out, loaded on first use.
+        self._checkpointed: Optional[Dict[str, List[float]]] = None
+
+        self.last_throughput: Optional[float] = None
+
+    async def embed(self, chunks: List[MCSDocumentChunk]) -> List[List[float]]:
+        """Returns one embedding per chunk, reusing chunk and checkpointed embeddings where present."""
+        if self._checkpointed is None:
+            self._checkpointed = self._read_checkpoint()
+
+        done: Dict[str, List[float]] = {}
+        for chunk in chunks:
+            if chunk.embedding is not None:
+                done[chunk.chunk_id] = chunk.embedding
+            elif chunk.chunk_id in self._checkpointed:
+                # Stays on disk until the knowledge base persists; kept in memory only until inserted.
+                done[chunk.chunk_id] = self._checkpointed.pop(chunk.chunk_id)
+
+        todo = [chunk for chunk in chunks if chunk.chunk_id not in done]
+        batches = [todo[i:i + self._batch_size] for i in range(0, len(todo), self._batch_size)]
+
+        if done and todo:
+            logger.info(f"Resuming embedding: {len(chunks) - len(todo)} chunks already embedded.")
+
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        started = time.perf_counter()
+
+        async def run(batch: List[MCSDocumentChunk]) -> None:
+            async with semaphore:
+                vectors = await self._embed_with_retry([chunk.content for chunk in batch])
+            embedded = dict(zip((chunk.chunk_id for chunk in batch), vectors))
+            done.update(embedded)
+            self._append_checkpoint(embedded)
+
+        results = await asyncio.gather(*(run(batch) for batch in batches), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
+
+        elapsed = time.perf_counter() - started
+        if todo:
+            self.last_throughput = len(todo) / elapsed if elapsed > 0 else float("inf")
+            logger.info(
+                f"Embedded {len(todo)} chunks in {len(batches)} batches in {elapsed:.2f}s "
+                f"({self.last_throughput:.1f} chunks/s)."
+            )
+
+        return [done[chunk.chunk_id] for chunk in chunks]
+
+    def clear_checkpoint(self) -> None:
+        """Removes the checkpoint once its embeddings have been stored in the knowledge base."""
+        self._checkpointed = {}
+        if self._checkpoint_path and os.path.exists(self._checkpoint_path):
+            os.remove(self._checkpoint_path)
+
+    async def _embed_with_retry(self, texts: List[str]) -> List[List[float]]:
+        embed_model = self._embed_model or Settings.embed_model
+        # Retrying around the gateway would multiply its attempts and stack two backoff schedules.
+        max_retries = 0 if _gateway_backed(embed_model) else self._max_retries
+
+        for attempt in range(max_retries + 1):
+            try:
+                return await embed_model.aget_text_embedding_batch(texts)
+            except (ValueError, TypeError):
+                raise
+            except Exception as e:
+                if attempt == max_retries:
+                    raise
+                delay = self._backoff_seconds * (2 ** attempt) * (0.5 + random.random())
+                logger.warning(f"Embedding batch failed ({e}); retrying in {delay:.1f}s.")
+                await asyncio.sleep(delay)
+
+    def _read_checkpoint(self) -> Dict[str, List[float]]:
+        if not self._checkpoint_path or not os.path.exists(self._checkpoint_path):
+            return {}
+
+        done = {}
+        with open(self._checkpoint_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.update(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn last line from an interrupted run; its batch is simply embedded again.
+                    break
+        return done
+
+    def _append_checkpoint(self, embedded: Dict[str, List[float]]) -> None:
+        if not self._checkpoint_path:
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(self._checkpoint_path)), exist_ok=True)
+        with open(self._checkpoint_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(embedded) + "\n")
+
+def _gateway_backed(embed_model: BaseEmbedding) -> bool:
+    if isinstance(embed_model, CachedEmbedding):
+        embed_model = embed_model.embed_model
+    return isinstance(embed_model, GatewayEmbedding)
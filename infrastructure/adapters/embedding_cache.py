@@ -0,0 +1,225 @@
+import os
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from pydantic import PrivateAttr
+
+from infrastructure.telemetry import CACHE_REQUESTS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("EmbeddingCache")
+
+def normalize_text(text: str) -> str:
+    """Normalizes text for cache keys: NFC unicode form, lower case and collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFC", text).lower().split())
+
+class EmbeddingCache:
+    """
+    Size-bounded in-memory LRU of embeddings with a TTL, optionally backed by a SQLite file
+    so that cached vectors survive process restarts.
+    """
+
+    def __init__(
+            self,
+            max_size: int = 4096,
+            ttl_seconds: float | None = 7 * 24 * 3600,
+            persist_path: str | None = None
+        ):
+
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        # Key -> (created, vector); vectors are tuples so a caller can never mutate a cached one.
+        self._entries: "OrderedDict[str, Tuple[float, Tuple[float, ...]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        self.hits = 0
+        self.misses = 0
+
+        if persist_path:
+            os.makedirs(os.path.dirname(os.path.abspath(persist_path)), exist_ok=True)
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, created REAL, vector BLOB)"
+            )
+            self._db.commit()
+            logger.info(f"Embedding cache persisted to {persist_path}.")
+
+    def get(self, key: str) -> Optional[List[float]]:
+        """Returns a copy of the cached embedding for the key, or None when missing or expired."""
+        now = time.time()
+        vector = self._memory_get(key, now)
+        if vector is None and self._db is not None:
+            vector = self._db_get(key, now)
+        return self._counted(vector)
+
+    async def aget(self, key: str) -> Optional[List[float]]:
+        """Like `get()`, with the SQLite lookup in a worker thread so it never blocks the event loop."""
+        now = time.time()
+        vector = self._memory_get(key, now)
+        if vector is None and self._db is not None:
+            vector = await asyncio.to_thread(self._db_get, key, now)
+        return self._counted(vector)
+
+    def put(self, key: str, embedding: List[float]) -> None:
+        """Stores an embedding in memory and, when configured, on disk."""
+        created, vector = time.time(), tuple(embedding)
+        with self._lock:
+            self._remember(key, created, vector)
+        if self._db is not None:
+            self._db_put(key, created, vector)
+
+    async def aput(self, key: str, embedding: List[float]) -> None:
+        """Like `put()`, with the SQLite write in a worker thread."""
+        created, vector = time.time(), tuple(embedding)
+        with self._lock:
+            self._remember(key, created, vector)
+        if self._db is not None:
+            await asyncio.to_thread(self._db_put, key, created, vector)
+
+    def clear(self) -> None:
+        """Drops every cached embedding, including the persisted ones."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and the current in-memory size."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries)
+        }
+
+    def _memory_get(self, key: str, now: float) -> Optional[Tuple[float, ...]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry[0], now):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _db_get(self, key: str, now: float) -> Optional[Tuple[float, ...]]:
+        with self._lock:
+            row = self._db.execute("SELECT created, vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None or self._expired(row[0], now):
+                return None
+            vector = tuple(array("f", row[1]))
+            self._remember(key, row[0], vector)
+            return vector
+
+    def _db_put(self, key: str, created: float, vector: Tuple[float, ...]) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings (key, created, vector) VALUES (?, ?, ?)",
+                (key, created, array("f", vector).tobytes())
+            )
+            self._db.commit()
+
+    def _counted(self, vector: Optional[Tuple[float, ...]]) -> Optional[List[float]]:
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        CACHE_REQUESTS.inc(cache="embedding", result="miss" if vector is None else "hit")
+        # Cached vectors are immutable tuples; callers get their own list, so mutating it cannot corrupt the cache.
+        return None if vector is None else list(vector)
+
+    def _remember(self, key: str, created: float, embedding: Tuple[float, ...]) -> None:
+        self._entries[key] = (created, embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self._ttl_seconds is not None and now - created > self._ttl_seconds
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Embedding model wrapper that serves query embeddings from an EmbeddingCache.
+    Keys combine the normalized query text with the wrapped model name and task,
+    so switching either never returns a stale vector. Text (document) embeddings
+    are passed through to the wrapped model unchanged.
+    """
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, cache: EmbeddingCache | None = None, **kwargs: Any):
+        super().__init__(
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            **kwargs
+        )
+        self._embed_model = embed_model
+        self._cache = cache or EmbeddingCache()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        return self._embed_model
+
+    def _key(self, query: str) -> str:
+        model = getattr(self._embed_model, "model", None) or self._embed_model.model_name
+        task = getattr(self._embed_model, "_task", None) or "query"
+        return f"{model}|{task}|{normalize_text(query)}"
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        key = self._key(query)
+        embedding = self._cache.get(key)
+        if embedding is None:
+            embedding = self._embed_model.get_query_embedding(query)
+            self._cache.put(key, embedding)
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        key = self._key(query)
+        embedding = await self._cache.aget(key)
+        if embedding is None:
+            embedding = await self._embed_model.aget_query_embedding(query)
+            await self._cache.aput(key, embedding)
+        return embedding
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed_model.get_text_embedding(text)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return await self._embed_model.aget_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_model.get_text_embedding_batch(texts)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return await self._embed_model.aget_text_embedding_batch(texts)
+
+def cache_from_env() -> EmbeddingCache:
+    """Builds an EmbeddingCache from the EMBEDDING_CACHE_* environment variables."""
+    ttl = os.getenv("EMBEDDING_CACHE_TTL_SECONDS")
+    return EmbeddingCache(
+        max_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "4096")),
+        ttl_seconds=float(ttl) if ttl else 7 * 24 * 3600,
+        persist_path=os.getenv("EMBEDDING_CACHE_PATH") or None
+    )
@@ -0,0 +1,75 @@
+import os
+import json
+import random
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set
+
+from domain.entities import TimesheetSubmission
+from infrastructure.interfaces import ITimesheetSink
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("FileTimesheetSink")
+
+class FileTimesheetSink(ITimesheetSink):
+    """
+    Stand-in for the ERP that books submissions as JSON lines in a local file.
+
+    Like the ERP it acknowledges a known idempotency key without booking it again and
+    rejects entries whose hours are outside (0, 24]. `latency` and `failure_rate` simulate a
+    slow or flaky ERP: a failed call raises before anything is booked.
+    """
+
+    def __init__(self, path: str = "./erp_outbox.jsonl", latency: float = 0.0, failure_rate: float = 0.0):
+        self._path = path
+        self._latency = latency
+        self._failure_rate = failure_rate
+        self._booked: Optional[Set[str]] = None
+
+    async def submit(self, submissions: List[TimesheetSubmission]) -> Dict[str, str]:
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        if self._failure_rate and random.random() < self._failure_rate:
+            raise ConnectionError("ERP stand-in: simulated outage.")
+
+        booked = await asyncio.to_thread(self._booked_keys)
+        rejected: Dict[str, str] = {}
+        keys: Set[str] = set()
+        lines = []
+
+        for submission in submissions:
+            if submission.idempotency_key in booked or submission.idempotency_key in keys:
+                continue
+            if not 0 < submission.hours <= 24:
+                rejected[submission.idempotency_key] = f"hours must be within (0, 24], got {submission.hours}"
+                continue
+            keys.add(submission.idempotency_key)
+            lines.append(json.dumps({
+                "idempotency_key": submission.idempotency_key,
+                "employee_email": submission.employee_email,
+                "timestamp": submission.timestamp,
+                "hours": submission.hours,
+                "absence_type": submission.absence_type,
+            }, ensure_ascii=False))
+
+        if lines:
+            await asyncio.to_thread(self._append, lines)
+            # Only once written: a failed write must leave the entries to be booked on retry.
+            booked.update(keys)
+            logger.info(f"Booked {len(lines)} timesheet entries in {self._path}.")
+        return rejected
+
+    def _booked_keys(self) -> Set[str]:
+        if self._booked is None:
+            self._booked = set()
+            if os.path.exists(self._path):
+                with open(self._path, encoding="utf-8") as f:
+                    self._booked = {json.loads(line)["idempotency_key"] for line in f if line.strip()}
+        return self._booked
+
+    def _append(self, lines: List[str]) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+        with open(self._path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
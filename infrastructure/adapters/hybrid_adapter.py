@@ -0,0 +1,186 @@
+import os
+import logging
+from typing import Dict, List, Set
+
+from infrastructure.interfaces import IKnowledgeBase
+from infrastructure.adapters.lexical_index import LexicalIndex, DOCUMENT_CODE_PATTERN, stem, tokenize
+from infrastructure.adapters.metadata_index import MetadataIndex
+from domain.entities import MCSDocumentChunk, QueryResult, ChunkView, ChunkFilter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("HybridKB")
+
+class HybridKnowledgeBase(IKnowledgeBase):
+    """
+    IKnowledgeBase decorator that combines a vector knowledge base with a local BM25 index.
+
+    Chunks are indexed lexically at insert time. Queries fuse the vector and BM25 rankings with
+    reciprocal-rank fusion. Keyword-style queries (mostly document codes, or at most
+    `keyword_max_terms` terms that all occur in the corpus) are answered from the lexical
+    index alone by `query_local`, which KnowledgeService tries before its semantic cache, so
+    they make no remote embedding call at all. A query that names an indexed
+    document code is filtered to that document, so a longer question about it is retrieved
+    hybrid within the document rather than by the code alone.
+    """
+
+    def __init__(
+            self,
+            knowledge_base: IKnowledgeBase,
+            lexical_path: str = "./lexical_index.pkl",
+            candidate_multiplier: int = 3,
+            rrf_k: int = 60,
+            keyword_max_terms: int = 2
+        ):
+
+        self._kb = knowledge_base
+        self._lexical_path = lexical_path
+        self._candidate_multiplier = candidate_multiplier
+        self._rrf_k = rrf_k
+        self._keyword_max_terms = keyword_max_terms
+
+        self._lexical = self._load_lexical()
+        self._metadata = self._build_metadata()
+
+    async def insert(self, chunks: List[MCSDocumentChunk]) -> None:
+        """Inserts chunks into the wrapped knowledge base and the lexical index."""
+        await self._kb.insert(chunks)
+        for chunk in chunks:
+            self._lexical.add(chunk.chunk_id, chunk.content, dict(chunk.metadata))
+        self._metadata.remove(chunk.chunk_id for chunk in chunks)
+        self._metadata.add((chunk.chunk_id, chunk.metadata) for chunk in chunks)
+
+    async def delete(self, chunk_ids: List[str]) -> None:
+        """Deletes chunks from the wrapped knowledge base and the lexical index."""
+        await self._kb.delete(chunk_ids)
+        for chunk_id in chunk_ids:
+            self._lexical.remove(chunk_id)
+        self._metadata.remove(chunk_ids)
+
+    async def query_local(self, query_text: str, top_k: int = 5, filters: ChunkFilter | None = None) -> QueryResult | None:
+        """Answers a keyword query from the lexical index; None for other queries and keyword queries without hits."""
+        terms = tokenize(query_text)
+        if not self._is_keyword_query(terms):
+            return None
+
+        filters = self._scoped(terms, filters)
+        lexical_hits = self._lexical.search(query_text, top_k * self._candidate_multiplier, chunk_ids=self._allowed(filters))
+        if not lexical_hits:
+            return None
+
+        chunks = [self._lexical_chunk(chunk_id, score) for chunk_id, score in lexical_hits[:top_k]]
+        logger.info(f"Answered keyword query '{query_text}' from the lexical index. Retrieved {len(chunks)} chunks.")
+        return QueryResult(
+            chunks=chunks,
+            response="",
+            metadata={"score": chunks[0].score, "retrieval": "lexical"}
+        )
+
+    async def query(self, query_text: str, top_k: int = 5, filters: ChunkFilter | None = None) -> QueryResult:
+        """Answers keyword queries lexically; fuses vector and BM25 rankings otherwise. Both sides honour `filters`."""
+        local = await self.query_local(query_text, top_k=top_k, filters=filters)
+        if local is not None:
+            return local
+
+        candidates = top_k * self._candidate_multiplier
+        filters = self._scoped(tokenize(query_text), filters)
+        lexical_hits = self._lexical.search(query_text, candidates, chunk_ids=self._allowed(filters))
+
+        vector_result = await self._kb.query(query_text, top_k=candidates, filters=filters)
+
+        fused: Dict[str, float] = {}
+        for rank, chunk in enumerate(vector_result.chunks):
+            fused[chunk.chunk_id] = fused.get(chunk.chunk_id, 0.0) + 1.0 / (self._rrf_k + rank + 1)
+        for rank, (chunk_id, _) in enumerate(lexical_hits):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (self._rrf_k + rank + 1)
+
+        vector_chunks = {chunk.chunk_id: chunk for chunk in vector_result.chunks}
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+        chunks = []
+        for chunk_id, score in ranked:
+            chunk = vector_chunks.get(chunk_id)
+            if chunk is None:
+                chunk = self._lexical_chunk(chunk_id, score)
+            else:
+                chunk = ChunkView.of(chunk, score=score)
+            chunks.append(chunk)
+
+        logger.info(
+            f"Fused {len(vector_result.chunks)} vector and {len(lexical_hits)} lexical candidates "
+            f"for '{query_text}'. Retrieved {len(chunks)} chunks."
+        )
+
+        return QueryResult(
+            chunks=chunks,
+            response=vector_result.response,
+            metadata={"score": chunks[0].score if chunks else None, "retrieval": "hybrid"}
+        )
+
+    async def persist(self) -> None:
+        """Persists the wrapped knowledge base and the lexical index."""
+        await self._kb.persist()
+        self._lexical.persist(self._lexical_path)
+
+    async def load(self) -> None:
+        """Loads the wrapped knowledge base and the lexical index."""
+        await self._kb.load()
+        self._lexical = self._load_lexical()
+        self._metadata = self._build_metadata()
+
+    def all_chunks(self) -> List[MCSDocumentChunk]:
+        return self._kb.all_chunks()
+
+    def state_version(self) -> int:
+        return self._kb.state_version()
+
+    def document_catalogue(self) -> Dict[str, str]:
+        return self._kb.document_catalogue()
+
+    def _scoped(self, terms: List[str], filters: ChunkFilter | None) -> ChunkFilter | None:
+        """Restricts `filters` to the indexed document codes the query names, unless the caller chose documents."""
+        codes = self._document_codes(terms)
+        if codes and not (filters and filters.document_codes):
+            return ChunkFilter(document_codes=codes) if filters is None else filters.model_copy(update={"document_codes": codes})
+        return filters
+
+    def _allowed(self, filters: ChunkFilter | None) -> Set[str] | None:
+        return None if filters is None else set(self._metadata.matching_ids(filters))
+
+    def _is_keyword_query(self, terms: List[str]) -> bool:
+        codes = {term for term in terms if DOCUMENT_CODE_PATTERN.match(term)}
+        if codes:
+            # A code is also indexed as its parts ("hr", "0506r"); those are not extra words.
+            parts = {stem(part) for code in codes for part in code.split("-")}
+            words = {term for term in terms if term not in codes and term not in parts}
+            return len(codes) > len(words)
+        return 0 < len(set(terms)) <= self._keyword_max_terms and all(term in self._lexical for term in terms)
+
+    def _document_codes(self, terms: List[str]) -> List[str]:
+        """The indexed HR document codes named in the query, upper-cased."""
+        codes = [term.upper() for term in dict.fromkeys(terms) if DOCUMENT_CODE_PATTERN.match(term)]
+        if not codes:
+            return []
+        catalogue = self._metadata.catalogue()
+        return [code for code in codes if code in catalogue]
+
+    def _lexical_chunk(self, chunk_id: str, score: float) -> ChunkView:
+        _, content, metadata = self._lexical.document(chunk_id)
+        return ChunkView(chunk_id=chunk_id, content=content, metadata=metadata, score=score)
+
+    def _build_metadata(self) -> MetadataIndex:
+        """Indexes the lexical index's chunk metadata, used to filter lexical hits."""
+        return MetadataIndex.build((chunk_id, metadata) for chunk_id, _, metadata in self._lexical.documents())
+
+    def _load_lexical(self) -> LexicalIndex:
+        """Loads the persisted lexical index, or builds it from the wrapped knowledge base."""
+        if os.path.exists(self._lexical_path):
+            return LexicalIndex.load(self._lexical_path)
+
+        lexical = LexicalIndex()
+        for chunk in self._kb.all_chunks():
+            lexical.add(chunk.chunk_id, chunk.content, dict(chunk.metadata))
+
+        if len(lexical):
+            logger.info(f"Built lexical index over {len(lexical)} existing chunks.")
+            lexical.persist(self._lexical_path)
+        return lexical
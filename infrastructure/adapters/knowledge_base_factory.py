@@ -0,0 +1,44 @@
+import os
+import logging
+
+from infrastructure.interfaces import IKnowledgeBase
+from infrastructure.adapters.hybrid_adapter import HybridKnowledgeBase
+from infrastructure.adapters.llamaindex_adapter import LlamaIndexKnowledgeBase
+from infrastructure.adapters.numpy_adapter import NumpyKnowledgeBase
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("KnowledgeBaseFactory")
+
+LLAMAINDEX = "llamaindex"
+NUMPY = "numpy"
+
+def knowledge_base_from_env() -> IKnowledgeBase:
+    """
+    Builds the knowledge base from the environment, so the service and ingestion use the same index.
+
+    KNOWLEDGE_BASE_BACKEND selects "llamaindex" (default, ./storage) or "numpy" (./storage_np);
+    KNOWLEDGE_BASE_DIR overrides the directory. QUANTIZATION ("int8" or "binary") applies to the
+    numpy backend. HYBRID_RETRIEVAL (default true) adds the BM25 index, persisted per backend.
+    """
+    backend = os.getenv("KNOWLEDGE_BASE_BACKEND", LLAMAINDEX).strip().lower()
+    quantization = os.getenv("QUANTIZATION", "").strip().lower() or None
+    persist_dir = os.getenv("KNOWLEDGE_BASE_DIR")
+
+    if backend == NUMPY:
+        persist_dir = persist_dir or "./storage_np"
+        knowledge_base: IKnowledgeBase = NumpyKnowledgeBase(persist_dir=persist_dir, quantization=quantization)
+        lexical_path = os.path.join(persist_dir, "lexical_index.pkl")
+    elif backend == LLAMAINDEX:
+        if quantization:
+            raise ValueError(f"QUANTIZATION={quantization} requires KNOWLEDGE_BASE_BACKEND={NUMPY}.")
+        persist_dir = persist_dir or "./storage"
+        knowledge_base = LlamaIndexKnowledgeBase(persist_dir=persist_dir)
+        lexical_path = "./lexical_index.pkl" if persist_dir == "./storage" else os.path.join(persist_dir, "lexical_index.pkl")
+    else:
+        raise ValueError(f"Unknown KNOWLEDGE_BASE_BACKEND '{backend}'; expected '{LLAMAINDEX}' or '{NUMPY}'.")
+
+    logger.info(f"Using the {backend} knowledge base in {persist_dir}" + (f" with {quantization} quantization." if quantization else "."))
+
+    if os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true":
+        knowledge_base = HybridKnowledgeBase(knowledge_base, lexical_path=lexical_path)
+    return knowledge_base
@@ -0,0 +1,248 @@
+import os
+import re
+import math
+import pickle
+import logging
+import unicodedata
+from collections import Counter
+from typing import Any, Collection, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("LexicalIndex")
+
+# Words joined by hyphens are kept whole (document codes such as "hr-0506r") and also split.
+_TOKEN_PATTERN = re.compile(r"[0-9a-zа-яёөү]+(?:-[0-9a-zа-яёөү]+)*")
+DOCUMENT_CODE_PATTERN = re.compile(r"^[a-z]{2,4}-\d{3,5}[a-z]?$")
+
+# Mongolian case endings and plural suffixes, longest first. Only one suffix is stripped.
+_SUFFIXES = sorted([
+    "ийн", "ын", "ний", "ны", "ий",
+    "ийг", "ыг",
+    "аас", "ээс", "оос", "өөс", "иас", "иос", "иэс",
+    "аар", "ээр", "оор", "өөр", "иар", "иор",
+    "тай", "тэй", "той",
+    "руу", "рүү", "луу", "лүү",
+    "ад", "эд", "од", "өд",
+    "ууд", "үүд", "нууд", "нүүд", "нар", "нэр",
+], key=len, reverse=True)
+
+# Single-consonant case endings, stripped only after the letters that take them, so that
+# nominatives such as "амралт" or "цаг" keep their last consonant: dative "т" follows г, в, р
+# and с ("цагт"), dative "д" follows other consonants ("ажилд"), and accusative "г" follows
+# й, a long vowel or an н-stem ("далайг", "цалинг").
+_CONSONANT_SUFFIXES = {
+    "т": frozenset("гврс"),
+    "д": frozenset("бвгжзйклмнпрсфхцчшщ"),
+    "г": frozenset("йн"),
+}
+_LONG_VOWELS = ("аа", "ээ", "оо", "өө", "уу", "үү")
+_VOWELS = frozenset("аэоөуүиыяеёю")
+_MIN_STEM_LENGTH = 3
+
+# Bumped whenever stemming changes, so that persisted postings are rebuilt.
+TOKENIZER_VERSION = 2
+
+STOPWORDS = frozenset([
+    "ба", "болон", "буюу", "нь", "энэ", "тэр", "эдгээр", "тэдгээр", "юу", "вэ", "бэ", "уу", "үү",
+    "байна", "байх", "байгаа", "гэж", "гэх", "бол", "ямар", "хэрхэн", "яаж", "хэд", "хэдэн",
+    "би", "миний", "та", "таны", "бид", "дээр", "доор", "хүртэл", "тухай", "мөн", "ч", "л",
+])
+
+def stem(token: str) -> str:
+    """
+    Light Mongolian Cyrillic stemmer: strips at most one case or plural suffix, then folds the
+    stem alternations of declension so that nominative, genitive and accusative forms meet
+    ("ажилтан", "ажилтны", "ажилтныг" -> "ажилт"; "хуваарь", "хуваарийн" -> "хуваар").
+    """
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= _MIN_STEM_LENGTH:
+            return _fold(token[:-len(suffix)])
+
+    if len(token) - 1 >= _MIN_STEM_LENGTH:
+        ending, previous = token[-1], token[-2]
+        if ending in _CONSONANT_SUFFIXES and (
+            previous in _CONSONANT_SUFFIXES[ending] or (ending == "г" and token[:-1].endswith(_LONG_VOWELS))
+        ):
+            return _fold(token[:-1])
+    return _fold(token)
+
+def _fold(stem: str) -> str:
+    """
+    Normalizes a stem: drops a soft sign, a final short vowel that the genitive elides
+    ("байгууллага"), the "г" of н-stems ("цалинг") and the fleeting vowel of "-ан" stems.
+    """
+    if stem.endswith("ь"):
+        stem = stem[:-1]
+    if len(stem) - 1 > _MIN_STEM_LENGTH and stem[-1] in "аэоө" and stem[-2] not in _VOWELS:
+        return stem[:-1]
+    if stem.endswith("нг") and len(stem) - 1 >= _MIN_STEM_LENGTH:
+        stem = stem[:-1]
+    if len(stem) - 1 > _MIN_STEM_LENGTH and stem[-1] == "н" and stem[-2] not in _VOWELS:
+        # "ажилтн" (from "ажилтны", "ажилтныг") -> "ажилт"
+        return stem[:-1]
+    if len(stem) - 2 > _MIN_STEM_LENGTH and stem[-1] == "н" and stem[-2] in "аэоө" and stem[-3] not in _VOWELS:
+        # "ажилтан" -> "ажилт"
+        return stem[:-2]
+    return stem
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cases, splits on non-letters, drops stopwords and stems Cyrillic words."""
+    tokens = []
+    for word in _TOKEN_PATTERN.findall(unicodedata.normalize("NFC", text).lower()):
+        if word in STOPWORDS:
+            continue
+        if "-" in word:
+            tokens.append(word)
+            tokens.extend(stem(part) for part in word.split("-") if part not in STOPWORDS)
+        else:
+            tokens.append(stem(word))
+    return tokens
+
+class LexicalIndex:
+    """
+    BM25 inverted index over chunk contents.
+
+    Postings are kept as parallel int32 document-id and uint16 term-frequency arrays per term.
+    Inserts go to per-term staging lists that are frozen into arrays before the next search.
+    Deleted documents are tombstoned and the index is rebuilt once a quarter of it is dead.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self._k1 = k1
+        self._b = b
+
+        # Document slot -> (chunk_id, content, metadata), or None once deleted.
+        self._docs: List[Optional[Tuple[str, str, Dict[str, Any]]]] = []
+        self._slots: Dict[str, int] = {}
+        self._lengths: List[int] = []
+        self._dead_slots: List[int] = []
+
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._staging: Dict[str, List[Tuple[int, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._postings or term in self._staging
+
+    def add(self, chunk_id: str, content: str, metadata: Dict[str, Any]) -> None:
+        """Indexes a chunk, replacing any earlier chunk with the same ID."""
+        if chunk_id in self._slots:
+            self.remove(chunk_id)
+
+        slot = len(self._docs)
+        tokens = tokenize(content)
+        self._docs.append((chunk_id, content, metadata))
+        self._lengths.append(len(tokens))
+        self._slots[chunk_id] = slot
+
+        for term, tf in Counter(tokens).items():
+            self._staging.setdefault(term, []).append((slot, min(tf, 65535)))
+
+    def remove(self, chunk_id: str) -> None:
+        slot = self._slots.pop(chunk_id, None)
+        if slot is not None:
+            self._docs[slot] = None
+            self._dead_slots.append(slot)
+
+    def document(self, chunk_id: str) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        slot = self._slots.get(chunk_id)
+        return None if slot is None else self._docs[slot]
+
+    def documents(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """Yields (chunk_id, content, metadata) of every indexed chunk."""
+        return (doc for doc in self._docs if doc is not None)
+
+    def search(self, query: str, top_k: int, chunk_ids: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """Returns up to top_k (chunk_id, BM25 score) pairs with a positive score, best first, among `chunk_ids` if given."""
+        self._freeze()
+        if not self._slots:
+            return []
+
+        lengths = np.asarray(self._lengths, dtype=np.float32)
+        norm = self._k1 * (1 - self._b + self._b * lengths / max(float(lengths.mean()), 1.0))
+        scores = np.zeros(len(self._docs), dtype=np.float32)
+        total = len(self._slots)
+
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            doc_ids, tfs = postings
+            idf = math.log(1 + (total - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            tf = tfs.astype(np.float32)
+            scores[doc_ids] += idf * tf * (self._k1 + 1) / (tf + norm[doc_ids])
+
+        if self._dead_slots:
+            scores[self._dead_slots] = 0
+        if chunk_ids is not None:
+            allowed = np.zeros(len(self._docs), dtype=bool)
+            allowed[[self._slots[chunk_id] for chunk_id in chunk_ids if chunk_id in self._slots]] = True
+            scores[~allowed] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        return [(self._docs[slot][0], float(scores[slot])) for slot in candidates]
+
+    def persist(self, path: str) -> None:
+        self._freeze()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {"docs": self._docs, "lengths": self._lengths, "postings": self._postings, "tokenizer_version": TOKENIZER_VERSION},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(tmp_path, path)
+        logger.info(f"Lexical index with {len(self)} chunks persisted to {path}.")
+
+    @classmethod
+    def load(cls, path: str, k1: float = 1.5, b: float = 0.75) -> "LexicalIndex":
+        index = cls(k1=k1, b=b)
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        index._docs = state["docs"]
+        index._lengths = state["lengths"]
+        index._postings = state["postings"]
+        index._slots = {doc[0]: slot for slot, doc in enumerate(index._docs) if doc is not None}
+        index._dead_slots = [slot for slot, doc in enumerate(index._docs) if doc is None]
+
+        if state.get("tokenizer_version") != TOKENIZER_VERSION:
+            # Postings of an older stemmer would not match today's query terms.
+            live = [doc for doc in index._docs if doc is not None]
+            index = cls(k1=k1, b=b)
+            for chunk_id, content, metadata in live:
+                index.add(chunk_id, content, metadata)
+            logger.info(f"Re-tokenized lexical index from {path} with tokenizer version {TOKENIZER_VERSION}.")
+
+        logger.info(f"Lexical index with {len(index)} chunks loaded from {path}.")
+        return index
+
+    def _freeze(self) -> None:
+        """Merges staged postings into the arrays, or rebuilds everything if too many documents are dead."""
+        if self._dead_slots and len(self._dead_slots) * 4 >= len(self._docs):
+            live = [doc for doc in self._docs if doc is not None]
+            self.__init__(k1=self._k1, b=self._b)
+            for chunk_id, content, metadata in live:
+                self.add(chunk_id, content, metadata)
+
+        if not self._staging:
+            return
+
+        for term, entries in self._staging.items():
+            doc_ids = np.fromiter((slot for slot, _ in entries), dtype=np.int32, count=len(entries))
+            tfs = np.fromiter((tf for _, tf in entries), dtype=np.uint16, count=len(entries))
+            existing = self._postings.get(term)
+            if existing is not None:
+                doc_ids = np.concatenate([existing[0], doc_ids])
+                tfs = np.concatenate([existing[1], tfs])
+            self._postings[term] = (doc_ids, tfs)
+
+        self._staging = {}
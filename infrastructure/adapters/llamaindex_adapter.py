@@ -1,22 +1,28 @@
 import os
+import asyncio
 import logging
 from dotenv import load_dotenv
 from typing import Any, Dict, List, Optional
 from llama_index.core import VectorStoreIndex, Document, StorageContext
-from llama_index.core.schema import TextNode, NodeWithScore
+from llama_index.core.schema import TextNode, NodeWithScore, QueryBundle
+from llama_index.core.retrievers import BaseRetriever, VectorIndexRetriever
+from llama_index.core.query_engine import RetrieverQueryEngine
 from llama_index.core.storage.docstore import SimpleDocumentStore
 from llama_index.core.storage.index_store import SimpleIndexStore
 from llama_index.core.vector_stores import SimpleVectorStore
-from llama_index.embeddings.jinaai import JinaEmbedding
-from llama_index.llms.openai import OpenAI
 from llama_index.core import Settings, load_index_from_storage
 from llama_index.core.response_synthesizers import ResponseMode
 from infrastructure.interfaces import IKnowledgeBase
-from domain.entities import MCSDocumentChunk, QueryResult, MCSDocument
+from infrastructure.model_gateway import gateway
+from infrastructure.adapters.batch_embedder import BatchEmbedder
+from infrastructure.adapters.metadata_index import MetadataIndex
+from domain.entities import MCSDocumentChunk, QueryResult, MCSDocument, ChunkView, ChunkFilter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("LLamaIndexKB")
 
+METADATA_INDEX_FILE = "metadata_index.pkl"
+
 class LlamaIndexKnowledgeBase(IKnowledgeBase):
     """
     LlamaIndex-based implementation of the IKnowledgeBase interface.
@@ -24,12 +30,25 @@ class LlamaIndexKnowledgeBase(IKnowledgeBase):
     def __init__(
             self, 
             persist_dir: str = "./storage",
-            generate_response: bool = False
+            generate_response: bool = False,
+            embed_batch_size: int = 64,
+            embed_concurrency: int = 4
         ):
         
         self._persist_dir = persist_dir
         self._index: Optional[VectorStoreIndex] = None
         self._generate_response = generate_response
+        # Retrievers and query engines are built once per top_k and reused across queries.
+        self._retrievers: Dict[int, BaseRetriever] = {}
+        self._query_engines: Dict[int, RetrieverQueryEngine] = {}
+        # File, document code, effective date and page of every node, for filtered queries.
+        self._metadata = MetadataIndex()
+        # Kept next to, not inside, the persist directory, whose existence means "load the index".
+        self._embedder = BatchEmbedder(
+            batch_size=embed_batch_size,
+            max_concurrency=embed_concurrency,
+            checkpoint_path=f"{os.path.normpath(persist_dir)}.embedding_checkpoint.jsonl"
+        )
 
         self.set_configuration()
 
@@ -42,51 +61,97 @@ class LlamaIndexKnowledgeBase(IKnowledgeBase):
 
 
     async def insert(self, chunks: List[MCSDocumentChunk]) -> None:
-        """Converts MCSDocumentChunks to LlamaIndex Documents and inserts them into the index."""
+        """Embeds MCSDocumentChunks in concurrent batches, converts them to LlamaIndex nodes and inserts them into the index."""
+        embeddings = await self._embedder.embed(chunks)
+
         nodes = [self._chunk_to_node(chunk) for chunk in chunks]
+        for node, embedding in zip(nodes, embeddings):
+            node.embedding = embedding
 
         if self._index is None:
             self._index = VectorStoreIndex(nodes)
         else:
             self._index.insert_nodes(nodes)
 
+        # Re-inserted chunk IDs replace their nodes, so their old metadata rows go too.
+        self._metadata.remove(chunk.chunk_id for chunk in chunks)
+        self._metadata.add((chunk.chunk_id, chunk.metadata) for chunk in chunks)
+
         logger.info(f"Inserted {len(chunks)} chunks into the knowledge base index.")
 
-    async def query(self, query_text: str, top_k: int = 5) -> QueryResult:
-        """Queries the knowledge base index and returns relevant document chunks."""
+    async def delete(self, chunk_ids: List[str]) -> None:
+        """Removes nodes with the given IDs from the vector store and the docstore."""
+        if self._index is None or not chunk_ids:
+            return
+
+        self._index.delete_nodes(chunk_ids, delete_from_docstore=True)
+        self._metadata.remove(chunk_ids)
+        logger.info(f"Deleted {len(chunk_ids)} chunks from the knowledge base index.")
+
+    async def query(self, query_text: str, top_k: int = 5, filters: ChunkFilter | None = None) -> QueryResult:
+        """
+        Queries the knowledge base index and returns relevant document chunks.
+
+        The query embedding is awaited on the event loop, while the vector search itself runs
+        in a worker thread, so concurrent queries do not block each other. With `filters`,
+        only the nodes the metadata index selects are scored.
+        """
         if self._index is None:
             raise ValueError("Knowledge base index is not initialized.")
-    
+
+        retriever = self._get_retriever(top_k)
+        if filters is not None:
+            node_ids = self._metadata.matching_ids(filters)
+            if not node_ids:
+                logger.info(f"No chunks match the filters of query '{query_text}'.")
+                return QueryResult(chunks=[], response="", metadata={"score": None})
+            retriever = VectorIndexRetriever(self._index, similarity_top_k=top_k, node_ids=node_ids)
+
+        embedding = await Settings.embed_model.aget_query_embedding(query_text)
+        query_bundle = QueryBundle(query_str=query_text, embedding=embedding)
+
+        nodes = await asyncio.to_thread(retriever.retrieve, query_bundle)
+
         if self._generate_response:
             logger.info("Generating response with relevant chunks.")
-            query_engine = self._index.as_query_engine(
-                similarity_top_k=top_k,
-                response_mode=ResponseMode.DEFAULT
-            )
+            response = await self._get_query_engine(top_k).asynthesize(query_bundle, nodes)
+            response_text = str(response.response)
         else:
             logger.info("Generating response is disabled; only retrieving relevant chunks.")
-            query_engine = self._index.as_query_engine(
-                similarity_top_k=top_k,
-                response_mode=ResponseMode.NO_TEXT
-            )
-
-        response = query_engine.query(query_text)
+            response_text = ""
 
         chunks = [
             self._node_to_chunk(node)
-            for node in response.source_nodes
+            for node in nodes
         ]
 
         query_result = QueryResult(
             chunks=chunks,
-            response=str(response.response),
-            metadata={"score": getattr(response, "score", None)}
+            response=response_text,
+            metadata={"score": nodes[0].score if nodes else None}
         )
 
         logger.info(f"Queried knowledge base with text: '{query_text}'. Retrieved {len(chunks)} chunks.")
 
         return query_result
 
+    def _get_retriever(self, top_k: int) -> BaseRetriever:
+        retriever = self._retrievers.get(top_k)
+        if retriever is None:
+            retriever = self._index.as_retriever(similarity_top_k=top_k)
+            self._retrievers[top_k] = retriever
+        return retriever
+
+    def _get_query_engine(self, top_k: int) -> RetrieverQueryEngine:
+        query_engine = self._query_engines.get(top_k)
+        if query_engine is None:
+            query_engine = self._index.as_query_engine(
+                similarity_top_k=top_k,
+                response_mode=ResponseMode.DEFAULT
+            )
+            self._query_engines[top_k] = query_engine
+        return query_engine
+
     async def load(self) -> None:
         """Loads the knowledge base state from storage."""
         if os.path.exists(self._persist_dir):
@@ -98,50 +163,79 @@ class LlamaIndexKnowledgeBase(IKnowledgeBase):
 
         storage_context = StorageContext.from_defaults(persist_dir=self._persist_dir)
         self._index = load_index_from_storage(storage_context)
+        self._retrievers.clear()
+        self._query_engines.clear()
+        self._metadata = self._load_metadata()
         logger.info("Knowledge base loaded from storage.")
 
     async def persist(self) -> None:
         """Persists the current state of the index to storage."""
         if self._index:
             self._index.storage_context.persist(persist_dir=self._persist_dir)
+            self._metadata.persist(os.path.join(self._persist_dir, METADATA_INDEX_FILE))
+            self._embedder.clear_checkpoint()
             logger.info("Knowledge base persisted to storage.")
-    
+
+    def state_version(self) -> int:
+        """The latest modification time of the persisted files, in nanoseconds."""
+        if not os.path.isdir(self._persist_dir):
+            return 0
+        return max((entry.stat().st_mtime_ns for entry in os.scandir(self._persist_dir) if entry.is_file()), default=0)
+
     def set_configuration(self) -> None:
-        """Sets up the LlamaIndex configuration with JinaEmbedding and OpenAI LLM."""
+        """Sets up the LlamaIndex configuration with the gateway's cached Jina embedding and OpenAI LLM."""
 
         load_dotenv()
 
-        Settings.embed_model = JinaEmbedding(
-            model="jina-embeddings-v3",
-            api_key=os.getenv("JINAAI_API_KEY")
-        )
-
-        Settings.llm = OpenAI(
-            model="chatgpt-4o-latest",
-            temperature=0.1,
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
+        Settings.embed_model = gateway.embedding()
+        Settings.llm = gateway.llm("chatgpt-4o-latest", temperature=0.1)
 
         logger.info("Knowledge base LLM and Embedding model configs set.")
 
     def _chunk_to_node(self, chunk: MCSDocumentChunk) -> TextNode:
         """Converts an MCSDocumentChunk (DTO) to a LlamaIndex TextNode (DAO)."""
         return TextNode(
-            id=chunk.chunk_id,
+            id_=chunk.chunk_id,
             text=chunk.content,
             metadata=chunk.metadata,
             embedding=chunk.embedding
         )
     
-    def _node_to_chunk(self, node: NodeWithScore) -> MCSDocumentChunk:
-        """Converts a LlamaIndex TextNode (DAO) to an MCSDocumentChunk (DTO)."""
-        return MCSDocumentChunk(
-            chunk_id=node.id_,
-            content=node.text,
-            metadata={**node.metadata, "score": node.score},
-            embedding=node.embedding
+    def _node_to_chunk(self, node: NodeWithScore) -> ChunkView:
+        """Wraps a retrieved LlamaIndex node (DAO) in a ChunkView without copying its metadata or embedding."""
+        return ChunkView(
+            chunk_id=node.node.id_,
+            content=node.node.text,
+            metadata=node.node.metadata,
+            score=node.score,
+            embedding=node.node.embedding
         )
     
+    def all_chunks(self) -> List[MCSDocumentChunk]:
+        """Returns every document chunk stored in the docstore."""
+        if self._index is None:
+            return []
+        return [
+            MCSDocumentChunk(chunk_id=node.id_, content=node.get_content(), metadata=node.metadata)
+            for node in self._index.docstore.docs.values()
+        ]
+
+    def document_catalogue(self) -> Dict[str, str]:
+        """Returns the HR document codes in the index with the title of their newest version."""
+        return self._metadata.catalogue()
+
+    def _load_metadata(self) -> MetadataIndex:
+        """Loads the persisted metadata index, or builds it from the docstore when it is missing or stale."""
+        path = os.path.join(self._persist_dir, METADATA_INDEX_FILE)
+        if os.path.exists(path):
+            metadata = MetadataIndex.load(path)
+            if len(metadata) == self.count():
+                return metadata
+
+        metadata = MetadataIndex.build((chunk.chunk_id, chunk.metadata) for chunk in self.all_chunks())
+        logger.info(f"Built metadata index over {len(metadata)} existing chunks.")
+        return metadata
+
     def count(self) -> int:
         """Returns the number of document chunks in the knowledge base."""
         if self._index is None:
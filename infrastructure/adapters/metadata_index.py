@@ -0,0 +1,185 @@
+import os
+import re
+import pickle
+import logging
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from domain.entities import ChunkFilter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("MetadataIndex")
+
+# HR regulation files are named "<code>[-_]<title>[-_ ]<YYMMDD>.pdf", e.g. "HR-0506R_Чөлөө -240205.pdf".
+_CODE_PATTERN = re.compile(r"^\s*(?P<code>[A-Za-z]{2,4}-\d{3,5}[A-Za-z]?)")
+_DATE_PATTERN = re.compile(r"(?P<date>\d{6})\s*$")
+
+_NO_VALUE = -1
+
+@lru_cache(maxsize=4096)
+def parse_document_name(file_name: str) -> Tuple[Optional[str], Optional[date], str]:
+    """Splits an HR document file name into its upper-cased code, effective date and title, each None/empty if absent."""
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+
+    code = None
+    match = _CODE_PATTERN.match(stem)
+    if match:
+        code = match.group("code").upper()
+        stem = stem[match.end():]
+
+    effective = None
+    match = _DATE_PATTERN.search(stem)
+    if match:
+        try:
+            effective = datetime.strptime(match.group("date"), "%y%m%d").date()
+            stem = stem[:match.start()]
+        except ValueError:
+            pass
+
+    return code, effective, stem.strip(" -_")
+
+class MetadataIndex:
+    """
+    Column store of chunk metadata used to narrow queries before any vector is scored.
+
+    One row per chunk, in insertion order: file name, HR document code and effective date
+    (both parsed from the file name) and page number, held as integer arrays so a filter is
+    a few vectorized comparisons. Removing chunks compacts the rows, which keeps them aligned
+    with a row-ordered vector matrix.
+    """
+
+    def __init__(self):
+        self._ids: List[str] = []
+        self._file_names: List[str] = []
+        self._file_ids: Dict[str, int] = {}
+        self._codes: List[str] = []
+        self._code_ids: Dict[str, int] = {}
+        # Title of the newest version seen of each code, and that version's date.
+        self._titles: Dict[str, str] = {}
+        self._title_dates: Dict[str, int] = {}
+
+        self._file_column = np.zeros(0, dtype=np.int32)
+        self._code_column = np.zeros(0, dtype=np.int32)
+        # Effective dates as proleptic Gregorian ordinals.
+        self._date_column = np.zeros(0, dtype=np.int32)
+        self._page_column = np.zeros(0, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def ids(self) -> List[str]:
+        """Chunk IDs in row order."""
+        return self._ids
+
+    def add(self, chunks: Iterable[Tuple[str, Mapping[str, Any]]]) -> None:
+        """Appends (chunk_id, metadata) rows."""
+        files, codes, dates, pages = [], [], [], []
+
+        for chunk_id, metadata in chunks:
+            file_name = str(metadata.get("file_name") or os.path.basename(str(metadata.get("file_path") or "")))
+            code, effective, title = parse_document_name(file_name)
+
+            self._ids.append(chunk_id)
+            files.append(self._intern(file_name, self._file_names, self._file_ids))
+            codes.append(self._intern(code, self._codes, self._code_ids) if code else _NO_VALUE)
+            dates.append(effective.toordinal() if effective else _NO_VALUE)
+            pages.append(self._page(metadata.get("page_label")))
+
+            if code and title and dates[-1] >= self._title_dates.get(code, _NO_VALUE):
+                self._titles[code] = title
+                self._title_dates[code] = dates[-1]
+
+        self._file_column = np.concatenate([self._file_column, np.asarray(files, dtype=np.int32)])
+        self._code_column = np.concatenate([self._code_column, np.asarray(codes, dtype=np.int32)])
+        self._date_column = np.concatenate([self._date_column, np.asarray(dates, dtype=np.int32)])
+        self._page_column = np.concatenate([self._page_column, np.asarray(pages, dtype=np.int32)])
+
+    def remove(self, chunk_ids: Iterable[str]) -> None:
+        targets = set(chunk_ids)
+        keep = np.fromiter((chunk_id not in targets for chunk_id in self._ids), dtype=bool, count=len(self._ids))
+        if not keep.all():
+            self.select(keep)
+
+    def select(self, keep: np.ndarray) -> None:
+        """Keeps only the rows where `keep` is True."""
+        self._ids = [chunk_id for chunk_id, kept in zip(self._ids, keep) if kept]
+        self._file_column = self._file_column[keep]
+        self._code_column = self._code_column[keep]
+        self._date_column = self._date_column[keep]
+        self._page_column = self._page_column[keep]
+
+    def mask(self, filters: ChunkFilter) -> np.ndarray:
+        """Returns a boolean mask over the rows that satisfy every set field of `filters`."""
+        mask = np.ones(len(self._ids), dtype=bool)
+
+        if filters.file_names:
+            file_ids = [self._file_ids[name] for name in filters.file_names if name in self._file_ids]
+            mask &= np.isin(self._file_column, file_ids)
+        if filters.document_codes:
+            code_ids = [self._code_ids[code.upper()] for code in filters.document_codes if code.upper() in self._code_ids]
+            mask &= np.isin(self._code_column, code_ids)
+        if filters.effective_from is not None:
+            mask &= self._date_column >= filters.effective_from.toordinal()
+        if filters.effective_to is not None:
+            mask &= (self._date_column != _NO_VALUE) & (self._date_column <= filters.effective_to.toordinal())
+        if filters.page_from is not None:
+            mask &= self._page_column >= filters.page_from
+        if filters.page_to is not None:
+            mask &= (self._page_column != _NO_VALUE) & (self._page_column <= filters.page_to)
+
+        if filters.latest_only and len(self._codes):
+            # The newest version of each code among the rows that passed the date bounds, so an
+            # `effective_to` date selects the versions that were current at that date.
+            coded = mask & (self._code_column != _NO_VALUE)
+            latest = np.full(len(self._codes), _NO_VALUE, dtype=np.int32)
+            np.maximum.at(latest, self._code_column[coded], self._date_column[coded])
+            is_latest = self._date_column == latest[np.maximum(self._code_column, 0)]
+            mask &= (self._code_column == _NO_VALUE) | is_latest
+
+        return mask
+
+    def matching_ids(self, filters: ChunkFilter) -> List[str]:
+        return [self._ids[position] for position in np.flatnonzero(self.mask(filters))]
+
+    def catalogue(self) -> Dict[str, str]:
+        """Returns the indexed HR document codes with the title of their newest version."""
+        present = set(np.unique(self._code_column[self._code_column != _NO_VALUE]).tolist())
+        return {code: self._titles.get(code, "") for code_id, code in enumerate(self._codes) if code_id in present}
+
+    def persist(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "MetadataIndex":
+        index = cls()
+        with open(path, "rb") as f:
+            index.__dict__.update(pickle.load(f))
+        logger.info(f"Metadata index with {len(index)} chunks loaded from {path}.")
+        return index
+
+    @classmethod
+    def build(cls, chunks: Iterable[Tuple[str, Mapping[str, Any]]]) -> "MetadataIndex":
+        index = cls()
+        index.add(chunks)
+        return index
+
+    @staticmethod
+    def _intern(value: str, values: List[str], ids: Dict[str, int]) -> int:
+        if value not in ids:
+            ids[value] = len(values)
+            values.append(value)
+        return ids[value]
+
+    @staticmethod
+    def _page(label: Any) -> int:
+        try:
+            return int(str(label).strip())
+        except (TypeError, ValueError):
+            return _NO_VALUE
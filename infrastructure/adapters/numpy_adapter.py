@@ -0,0 +1,359 @@
+import os
+import json
+import asyncio
+import logging
+from dotenv import load_dotenv
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from infrastructure.interfaces import IKnowledgeBase
+from infrastructure.model_gateway import gateway
+from infrastructure.adapters.batch_embedder import BatchEmbedder
+from infrastructure.adapters.metadata_index import MetadataIndex
+from infrastructure.adapters.vector_quantization import QUANTIZERS, Codes, approximate_scores, encode_blocks
+from domain.entities import MCSDocumentChunk, QueryResult, ChunkView, ChunkFilter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("NumpyKB")
+
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNKS_FILE = "chunks.jsonl"
+OFFSETS_FILE = "offsets.npy"
+METADATA_INDEX_FILE = "metadata_index.pkl"
+
+class NumpyKnowledgeBase(IKnowledgeBase):
+    """
+    NumPy-based implementation of the IKnowledgeBase interface.
+
+    Embeddings are kept in one contiguous float32 matrix which is persisted as a
+    memory-mapped `.npy` file. Chunk text and metadata live in a JSON lines sidecar
+    that is read on demand through a byte offset table, so loading does not parse
+    the corpus and only the top-k records are decoded per query.
+
+    With `quantization` set to "int8" or "binary", compressed codes of the vectors are kept
+    in memory and persisted next to the matrix, which is then only memory-mapped. Queries
+    rank all codes, then rescore a shortlist of `top_k * rescore_factor` rows against the
+    float32 matrix, so only the shortlist's rows are paged in.
+    """
+    def __init__(
+            self,
+            persist_dir: str = "./storage_np",
+            embed_model: BaseEmbedding | None = None,
+            embed_batch_size: int = 64,
+            embed_concurrency: int = 4,
+            quantization: str | None = None,
+            rescore_factor: int | None = None
+        ):
+
+        if quantization is not None and quantization not in QUANTIZERS:
+            raise ValueError(f"Unknown quantization '{quantization}'; expected one of {sorted(QUANTIZERS)}.")
+
+        self._persist_dir = persist_dir
+        self._embed_model = embed_model
+        self._quantizer = QUANTIZERS[quantization] if quantization else None
+        self._rescore_factor = rescore_factor or (self._quantizer.default_rescore_factor if self._quantizer else 1)
+
+        # Vectors are L2-normalised on insert so a dot product is the cosine similarity.
+        self._matrix: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        # Compressed copies of the matrix rows, in row order; only set with quantization.
+        self._codes: Optional[Codes] = None
+        # File, document code, effective date and page per matrix row, for filtered queries.
+        self._metadata = MetadataIndex()
+        # Records inserted since the last persist, not yet present in the sidecar.
+        self._pending: List[Dict[str, Any]] = []
+        # Set after a delete: the next persist rewrites the sidecar instead of appending to it.
+        self._rewrite = False
+
+        if self._embed_model is None:
+            self.set_configuration()
+
+        self._embedder = BatchEmbedder(
+            self._embed_model,
+            batch_size=embed_batch_size,
+            max_concurrency=embed_concurrency,
+            checkpoint_path=f"{os.path.normpath(persist_dir)}.embedding_checkpoint.jsonl"
+        )
+
+        if os.path.exists(os.path.join(self._persist_dir, EMBEDDINGS_FILE)):
+            self._load()
+            logger.info("Loaded existing knowledge base matrix from storage.")
+        else:
+            logger.info("Initialized new knowledge base matrix.")
+
+    async def insert(self, chunks: List[MCSDocumentChunk]) -> None:
+        """
+        Embeds chunks in concurrent batches and appends them to the matrix. Chunks whose IDs are
+        already stored replace their rows, as in the other backends; within `chunks` the last copy wins.
+        """
+        if not chunks:
+            return
+
+        chunks = list({chunk.chunk_id: chunk for chunk in chunks}.values())
+        embeddings = await self._embedder.embed(chunks)
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+
+        stored = set(self._metadata.ids())
+        replaced = [chunk.chunk_id for chunk in chunks if chunk.chunk_id in stored]
+        if replaced:
+            await self.delete(replaced)
+
+        if self._matrix is None or len(self._matrix) == 0:
+            self._matrix = vectors
+            self._codes = None
+        else:
+            if vectors.shape[1] != self._matrix.shape[1]:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match the stored dimension {self._matrix.shape[1]}."
+                )
+            self._matrix = np.concatenate([self._matrix, vectors])
+
+        if self._quantizer:
+            codes = self._quantizer.encode(vectors)
+            if self._codes is not None:
+                codes = {key: np.concatenate([self._codes[key], codes[key]]) for key in codes}
+            self._codes = codes
+
+        self._pending.extend(
+            {"chunk_id": chunk.chunk_id, "content": chunk.content, "metadata": chunk.metadata}
+            for chunk in chunks
+        )
+        self._metadata.add((chunk.chunk_id, chunk.metadata) for chunk in chunks)
+
+        logger.info(f"Inserted {len(chunks)} chunks into the knowledge base matrix.")
+
+    async def delete(self, chunk_ids: List[str]) -> None:
+        """Drops the rows of the given chunks; the sidecar is compacted on the next persist."""
+        if self._matrix is None or not chunk_ids:
+            return
+
+        targets = set(chunk_ids)
+        records = self._records()
+        keep = np.fromiter((record["chunk_id"] not in targets for record in records), dtype=bool, count=len(records))
+
+        if keep.all():
+            return
+
+        self._matrix = np.ascontiguousarray(self._matrix[keep])
+        if self._codes is not None:
+            self._codes = {key: codes[keep] for key, codes in self._codes.items()}
+        self._metadata.select(keep)
+        self._pending = [record for record, kept in zip(records, keep) if kept]
+        self._offsets = None
+        self._rewrite = True
+
+        logger.info(f"Deleted {int((~keep).sum())} chunks from the knowledge base matrix.")
+
+    async def query(self, query_text: str, top_k: int = 5, filters: ChunkFilter | None = None) -> QueryResult:
+        """
+        Scores the stored vectors with one matrix product in a worker thread and returns the top-k
+        chunks. With `filters`, only the rows the metadata index selects are scored.
+        """
+        if self._matrix is None or len(self._matrix) == 0:
+            return QueryResult(chunks=[], response="", metadata={"score": None})
+
+        rows = None
+        if filters is not None:
+            rows = np.flatnonzero(self._metadata.mask(filters))
+            if len(rows) == 0:
+                logger.info(f"No chunks match the filters of query '{query_text}'.")
+                return QueryResult(chunks=[], response="", metadata={"score": None})
+
+        query_embedding = await self._embed_model.aget_query_embedding(query_text)
+        query_vector = self._normalize(np.asarray(query_embedding, dtype=np.float32))
+
+        chunks = await asyncio.to_thread(self._search, query_vector, top_k, rows)
+
+        logger.info(f"Queried knowledge base with text: '{query_text}'. Retrieved {len(chunks)} chunks.")
+
+        return QueryResult(
+            chunks=chunks,
+            response="",
+            metadata={"score": chunks[0].score if chunks else None}
+        )
+
+    def _search(self, query_vector: np.ndarray, top_k: int, rows: Optional[np.ndarray] = None) -> List[ChunkView]:
+        """CPU- and IO-bound part of a query: scoring `rows` (all if None), top-k selection and sidecar reads."""
+        if self._codes is None:
+            if rows is None:
+                scores = self._matrix @ query_vector
+                top = self._top_k(scores, top_k)
+                return [self._row_to_chunk(int(row), float(scores[row])) for row in top]
+
+            scores = np.asarray(self._matrix[rows], dtype=np.float32) @ query_vector
+            return [self._row_to_chunk(int(rows[i]), float(scores[i])) for i in self._top_k(scores, top_k)]
+
+        codes = self._codes if rows is None else {key: codes[rows] for key, codes in self._codes.items()}
+        approximate = approximate_scores(self._quantizer, codes, query_vector)
+        candidates = self._top_k(approximate, top_k * self._rescore_factor)
+        # Sorted so the shortlist's rows are read from the memory-mapped matrix in file order.
+        shortlist = np.sort(candidates if rows is None else rows[candidates])
+        exact = np.asarray(self._matrix[shortlist], dtype=np.float32) @ query_vector
+        order = self._top_k(exact, top_k)
+        return [self._row_to_chunk(int(shortlist[i]), float(exact[i])) for i in order]
+
+    async def load(self) -> None:
+        """Loads the knowledge base state from storage."""
+        if os.path.exists(os.path.join(self._persist_dir, EMBEDDINGS_FILE)):
+            self._load()
+        else:
+            logger.info("Persist directory does not exist. Cannot load knowledge base.")
+
+    def _load(self) -> None:
+        self._matrix = np.load(os.path.join(self._persist_dir, EMBEDDINGS_FILE), mmap_mode="r")
+        self._offsets = np.load(os.path.join(self._persist_dir, OFFSETS_FILE))
+        self._pending = []
+        self._codes = self._load_codes() if self._quantizer else None
+        self._metadata = self._load_metadata()
+        logger.info(f"Knowledge base loaded from storage with {len(self._matrix)} vectors.")
+
+    async def persist(self) -> None:
+        """Writes the matrix, the appended sidecar records and the offset table to storage."""
+        if self._matrix is None or not (self._pending or self._rewrite):
+            return
+
+        os.makedirs(self._persist_dir, exist_ok=True)
+        chunks_path = os.path.join(self._persist_dir, CHUNKS_FILE)
+        sidecar_path = f"{chunks_path}.tmp" if self._rewrite else chunks_path
+
+        # Pending records are appended; the persisted part of the sidecar is only rewritten after a delete.
+        offsets = [] if self._offsets is None else self._offsets.tolist()
+        with open(sidecar_path, "wb" if self._rewrite else "ab") as f:
+            position = f.tell()
+            for record in self._pending:
+                line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+                offsets.append(position)
+                f.write(line)
+                position += len(line)
+
+        if self._rewrite:
+            os.replace(sidecar_path, chunks_path)
+
+        self._write_array(OFFSETS_FILE, np.asarray(offsets, dtype=np.int64))
+        self._write_array(EMBEDDINGS_FILE, np.ascontiguousarray(self._matrix, dtype=np.float32))
+        self._metadata.persist(os.path.join(self._persist_dir, METADATA_INDEX_FILE))
+        if self._codes is not None:
+            for key, codes in self._codes.items():
+                self._write_array(self._codes_file(key), codes)
+
+        self._pending = []
+        self._rewrite = False
+        self._embedder.clear_checkpoint()
+        self._load()
+        logger.info("Knowledge base persisted to storage.")
+
+    def state_version(self) -> int:
+        """The latest modification time of the persisted files, in nanoseconds."""
+        if not os.path.isdir(self._persist_dir):
+            return 0
+        return max((entry.stat().st_mtime_ns for entry in os.scandir(self._persist_dir) if entry.is_file()), default=0)
+
+    def set_configuration(self) -> None:
+        """Sets up the gateway's cached Jina embedding model, used for both chunks and queries."""
+
+        load_dotenv()
+
+        self._embed_model = gateway.embedding()
+
+        logger.info("Knowledge base Embedding model config set.")
+
+    def all_chunks(self) -> List[MCSDocumentChunk]:
+        """Returns every document chunk, persisted and pending, in row order."""
+        return [
+            MCSDocumentChunk(chunk_id=record["chunk_id"], content=record["content"], metadata=record["metadata"])
+            for record in self._records()
+        ]
+
+    def count(self) -> int:
+        """Returns the number of document chunks in the knowledge base."""
+        if self._matrix is None:
+            return 0
+        return len(self._matrix)
+
+    def document_catalogue(self) -> Dict[str, str]:
+        """Returns the HR document codes in the matrix with the title of their newest version."""
+        return self._metadata.catalogue()
+
+    def index_nbytes(self) -> int:
+        """Returns the bytes of vector data held in memory for scoring: the codes, or the float32 matrix without quantization."""
+        if self._codes is not None:
+            return sum(codes.nbytes for codes in self._codes.values())
+        return 0 if self._matrix is None else self._matrix.nbytes
+
+    def _load_metadata(self) -> MetadataIndex:
+        """Loads the persisted metadata index, or builds it from the sidecar when it is missing or stale."""
+        path = os.path.join(self._persist_dir, METADATA_INDEX_FILE)
+        if os.path.exists(path):
+            metadata = MetadataIndex.load(path)
+            if len(metadata) == len(self._matrix):
+                return metadata
+
+        metadata = MetadataIndex.build((record["chunk_id"], record["metadata"]) for record in self._records())
+        logger.info(f"Built metadata index over {len(metadata)} existing chunks.")
+        return metadata
+
+    def _codes_file(self, key: str) -> str:
+        return f"embeddings.{self._quantizer.name}.{key}.npy"
+
+    def _load_codes(self) -> Codes:
+        """Loads the persisted codes into memory, or encodes the matrix when they are missing or stale."""
+        paths = [os.path.join(self._persist_dir, self._codes_file(key)) for key in self._quantizer.keys]
+        if all(os.path.exists(path) for path in paths):
+            codes = {key: np.load(path) for key, path in zip(self._quantizer.keys, paths)}
+            if all(len(array) == len(self._matrix) for array in codes.values()):
+                return codes
+
+        logger.info(f"Encoding {len(self._matrix)} vectors as {self._quantizer.name} codes.")
+        return encode_blocks(self._quantizer, self._matrix)
+
+    def _write_array(self, file_name: str, array: np.ndarray) -> None:
+        """Writes an array next to its target and swaps it in, so readers never see a partial file."""
+        path = os.path.join(self._persist_dir, file_name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+
+    def _records(self) -> List[Dict[str, Any]]:
+        """Reads every record, persisted and pending, in row order."""
+        records = []
+        if self._offsets is not None and len(self._offsets):
+            with open(os.path.join(self._persist_dir, CHUNKS_FILE), "rb") as f:
+                for offset in self._offsets:
+                    f.seek(int(offset))
+                    records.append(json.loads(f.readline()))
+        return records + self._pending
+
+    def _row_to_chunk(self, row: int, score: float) -> ChunkView:
+        """Decodes a single sidecar record into a ChunkView whose embedding is the (normalized) matrix row, read lazily."""
+        persisted = 0 if self._offsets is None else len(self._offsets)
+
+        if row < persisted:
+            with open(os.path.join(self._persist_dir, CHUNKS_FILE), "rb") as f:
+                f.seek(int(self._offsets[row]))
+                record = json.loads(f.readline())
+        else:
+            record = self._pending[row - persisted]
+
+        return ChunkView(
+            chunk_id=record["chunk_id"],
+            content=record["content"],
+            metadata=record["metadata"],
+            score=score,
+            embedding=self._matrix[row]
+        )
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+        """Selects the indices of the k highest scores in descending order without a full sort."""
+        if top_k >= len(scores):
+            return np.argsort(-scores)
+
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        return candidates[np.argsort(-scores[candidates])]
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
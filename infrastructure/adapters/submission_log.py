@@ -0,0 +1,121 @@
+import os
+import asyncio
+import logging
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from domain.entities import TimesheetSubmission
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("SubmissionLog")
+
+class SubmissionLog:
+    """
+    Append-only write-ahead log of timesheet submissions, one JSON line per state change.
+
+    Every record holds the whole submission, so replaying keeps the last record of each.
+    Appends are group-committed: records from concurrent writers that arrive while a write
+    is in progress go out together in the next write with a single fsync, and each writer
+    returns once its record is on disk. A torn last line from a crash is cut off on replay.
+    """
+
+    def __init__(self, path: str = "./timesheet_submissions.wal", fsync: bool = True):
+        self._path = path
+        self._fsync = fsync
+        self._file: Optional[BinaryIO] = None
+        self._pending: List[Tuple[bytes, asyncio.Future]] = []
+        self._writer: Optional[asyncio.Task] = None
+        # Held by each group write and by compaction, so a rewrite never drops an append.
+        self._lock = asyncio.Lock()
+        self.records = 0
+
+    def replay(self) -> Dict[str, TimesheetSubmission]:
+        """Returns the latest state of every logged submission, in first-logged order."""
+        submissions: Dict[str, TimesheetSubmission] = {}
+        if not os.path.exists(self._path):
+            return submissions
+
+        with open(self._path, "rb") as f:
+            data = f.read()
+
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            logger.warning(f"Dropping a torn {len(data) - complete}-byte record at the end of {self._path}.")
+            with open(self._path, "r+b") as f:
+                f.truncate(complete)
+
+        self.records = 0
+        for line in data[:complete].splitlines():
+            try:
+                submission = TimesheetSubmission.model_validate_json(line)
+            except ValidationError as e:
+                logger.warning(f"Skipping unreadable record in {self._path}: {e}")
+                continue
+            submissions[submission.submission_id] = submission
+            self.records += 1
+
+        logger.info(f"Replayed {self.records} records of {len(submissions)} submissions from {self._path}.")
+        return submissions
+
+    async def append(self, submissions: Iterable[TimesheetSubmission]) -> None:
+        """Logs the submissions' current state and returns once it is durable."""
+        data = b"".join(submission.model_dump_json().encode("utf-8") + b"\n" for submission in submissions)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((data, future))
+
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._write_pending())
+
+        # Shielded: a cancelled caller's record is still written with its group.
+        await asyncio.shield(future)
+
+    async def compact(self, snapshot: Callable[[], Iterable[TimesheetSubmission]]) -> None:
+        """Rewrites the log with one record per submission returned by `snapshot()`, taken under the write lock."""
+        async with self._lock:
+            submissions = list(snapshot())
+            await asyncio.to_thread(self._rewrite, submissions)
+            self.records = len(submissions)
+        logger.info(f"Compacted {self._path} to {len(submissions)} records.")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def _write_pending(self) -> None:
+        while self._pending:
+            async with self._lock:
+                group, self._pending = self._pending, []
+                try:
+                    await asyncio.to_thread(self._write, b"".join(data for data, _ in group))
+                except Exception as e:
+                    logger.error(f"Write to {self._path} failed: {e}")
+                    for _, future in group:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                self.records += sum(data.count(b"\n") for data, _ in group)
+                for _, future in group:
+                    if not future.done():
+                        future.set_result(None)
+
+    def _write(self, data: bytes) -> None:
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+            self._file = open(self._path, "ab")
+        self._file.write(data)
+        self._file.flush()
+        if self._fsync:
+            os.fsync(self._file.fileno())
+
+    def _rewrite(self, submissions: List[TimesheetSubmission]) -> None:
+        self.close()
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "wb") as f:
+            for submission in submissions:
+                f.write(submission.model_dump_json().encode("utf-8") + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path)
@@ -0,0 +1,366 @@
+import os
+import io
+import bisect
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from infrastructure.interfaces import ITimesheetRepository
+from domain.entities import RosterSchedule
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("TimesheetRepository")
+
+TIMESHEET_COLUMNS = ["employee_email", "clock_in", "clock_out", "total_working_hours", "total_salary_hours"]
+TIMESTAMP_COLUMNS = ["clock_in", "clock_out"]
+HOUR_COLUMNS = ["total_working_hours", "total_salary_hours"]
+
+# Number of trailing bytes compared to decide whether a grown file was only appended to.
+_TAIL_SIGNATURE_BYTES = 256
+# Working-hours reports kept per repository, e.g. the current payroll period and the previous one.
+_REPORT_CACHE_SIZE = 8
+
+STRATEGY_WEEKLY = "normal 40 hrs/week"
+STRATEGY_ROSTER = "roster"
+HOURS_PER_WORKDAY = 8.0
+REPORT_COLUMNS = ["strategy", "entries", "salary_hours", "working_hours", "expected_hours", "overtime_hours", "remaining_hours"]
+
+def expected_hours(start: datetime, end: datetime, roster: RosterSchedule | None = None) -> float:
+    """
+    Hours an employee is scheduled for on the days from `start` up to, not including, `end`:
+    8 hours per weekday under the 40 hrs/week strategy, or the roster's shifts that fall in the window.
+    """
+    first = np.datetime64(pd.Timestamp(start).date(), "D")
+    last = np.datetime64(pd.Timestamp(end).date(), "D")
+    if last <= first:
+        return 0.0
+
+    if roster is None:
+        return float(np.busday_count(first, last)) * HOURS_PER_WORKDAY
+
+    days = (np.arange(first, last) - np.datetime64(roster.anchor, "D")).astype(np.int64)
+    on_shift = np.mod(days, roster.days_on + roster.days_off) < roster.days_on
+    return float(on_shift.sum()) * roster.shift_hours
+
+def payroll_period(now: datetime, anchor: date, days: int = 14) -> Tuple[datetime, datetime]:
+    """Returns the [start, end) of the `days`-long payroll period containing `now`, periods counted from `anchor`."""
+    anchor_time = datetime.combine(anchor, datetime.min.time())
+    start = anchor_time + timedelta(days=((pd.Timestamp(now).to_pydatetime() - anchor_time).days // days) * days)
+    return start, start + timedelta(days=days)
+
+def load_rosters(csv_path: str) -> Dict[str, RosterSchedule]:
+    """Reads roster assignments from a CSV with employee_email, anchor (YYYY-MM-DD), days_on, days_off and shift_hours columns."""
+    frame = pd.read_csv(csv_path, dtype={"employee_email": "string"}, parse_dates=["anchor"])
+    return {
+        str(row.employee_email): RosterSchedule(
+            anchor=row.anchor.date(),
+            days_on=int(row.days_on),
+            days_off=int(row.days_off),
+            shift_hours=float(row.shift_hours)
+        )
+        for row in frame.itertuples(index=False)
+    }
+
+class CsvTimesheetRepository(ITimesheetRepository):
+    """
+    Timesheet repository backed by the CSV export.
+
+    The file is parsed once into a typed frame (categorical emails, datetime64 timestamps,
+    float64 hours) sorted by employee and clock-in time, with an offset table giving each
+    employee's contiguous row range. The file's mtime and size are checked on every access:
+    appended rows are parsed on their own and merged into their employees' blocks, any other
+    change triggers a full reload. An optional binary snapshot (`cache_path`), written in the
+    background after each change, lets a restart skip CSV parsing altogether.
+    Working-hours reports are cached per window and rosters until the data changes.
+    """
+
+    def __init__(
+            self,
+            csv_path: str = "docs/employee_timesheet.csv",
+            datetime_format: str | None = "%m/%d/%Y %H:%M",
+            cache_path: str | None = None
+        ):
+
+        self._csv_path = csv_path
+        self._datetime_format = datetime_format
+        self._cache_path = cache_path
+        self._lock = threading.Lock()
+
+        self._frame: Optional[pd.DataFrame] = None
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        self._clock_in: Optional[np.ndarray] = None
+        self._salary_hours: Optional[np.ndarray] = None
+        self._reports: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+
+        # (mtime_ns, size, trailing bytes) of the file as last parsed.
+        self._signature: Optional[Tuple[int, int, bytes]] = None
+        # One writer, so snapshots are written in order and a request never waits for one.
+        self._cache_writer: Optional[ThreadPoolExecutor] = None
+
+    def frame(self) -> pd.DataFrame:
+        """Returns the whole timesheet, sorted by employee_email and clock_in."""
+        with self._lock:
+            self._refresh()
+            return self._frame
+
+    def get_entries(
+            self,
+            employee_email: str,
+            start: datetime | None = None,
+            end: datetime | None = None
+        ) -> pd.DataFrame:
+        """Returns the employee's rows with start <= clock_in < end."""
+        with self._lock:
+            self._refresh()
+            lo, hi = self._window(employee_email, start, end)
+            return self._frame.iloc[lo:hi]
+
+    def total_salary_hours(
+            self,
+            employee_email: str,
+            start: datetime | None = None,
+            end: datetime | None = None
+        ) -> float:
+        """Sums the employee's salary hours for rows with start <= clock_in < end."""
+        with self._lock:
+            self._refresh()
+            lo, hi = self._window(employee_email, start, end)
+            return float(self._salary_hours[lo:hi].sum())
+
+    def working_hours_report(
+            self,
+            start: datetime,
+            end: datetime,
+            rosters: Mapping[str, RosterSchedule] | None = None
+        ) -> pd.DataFrame:
+        """
+        Returns one row per employee, indexed by employee_email, with the REPORT_COLUMNS for
+        rows with start <= clock_in < end. Employees in `rosters` are measured against their
+        roster, everyone else against 40 hrs/week. Overtime is working hours beyond the
+        expected hours; remaining hours are expected hours not yet covered by salary hours.
+        """
+        rosters = rosters or {}
+        key = (pd.Timestamp(start), pd.Timestamp(end), tuple(sorted(rosters.items())))
+
+        with self._lock:
+            self._refresh()
+            report = self._reports.get(key)
+            if report is None:
+                report = self._build_report(start, end, rosters)
+                self._reports[key] = report
+                while len(self._reports) > _REPORT_CACHE_SIZE:
+                    self._reports.popitem(last=False)
+            else:
+                self._reports.move_to_end(key)
+            return report
+
+    def _build_report(self, start: datetime, end: datetime, rosters: Mapping[str, RosterSchedule]) -> pd.DataFrame:
+        """Totals the window for every employee in one groupby pass. Caller holds the lock."""
+        in_window = (self._clock_in >= np.datetime64(pd.Timestamp(start))) & (self._clock_in < np.datetime64(pd.Timestamp(end)))
+
+        # Grouping on the categorical keeps employees without rows in the window, with zero totals.
+        report = self._frame.loc[in_window, ["employee_email", *HOUR_COLUMNS]].groupby("employee_email", observed=False).agg(
+            entries=("total_salary_hours", "size"),
+            salary_hours=("total_salary_hours", "sum"),
+            working_hours=("total_working_hours", "sum")
+        )
+        report.index = report.index.astype(str)
+
+        on_roster = report.index.isin(list(rosters))
+        report["strategy"] = np.where(on_roster, STRATEGY_ROSTER, STRATEGY_WEEKLY)
+        report["expected_hours"] = expected_hours(start, end)
+
+        by_schedule: Dict[RosterSchedule, list] = {}
+        for email, schedule in rosters.items():
+            by_schedule.setdefault(schedule, []).append(email)
+        for schedule, emails in by_schedule.items():
+            report.loc[report.index.isin(emails), "expected_hours"] = expected_hours(start, end, schedule)
+
+        report["overtime_hours"] = (report["working_hours"] - report["expected_hours"]).clip(lower=0)
+        report["remaining_hours"] = (report["expected_hours"] - report["salary_hours"]).clip(lower=0)
+
+        logger.info(f"Built working-hours report for {len(report)} employees over {int(in_window.sum())} rows.")
+        return report[REPORT_COLUMNS]
+
+    def _window(self, employee_email: str, start: datetime | None, end: datetime | None) -> Tuple[int, int]:
+        """Resolves a clock-in window to a row range using binary search within the employee's block."""
+        lo, hi = self._offsets.get(employee_email, (0, 0))
+        clock_in = self._clock_in[lo:hi]
+
+        if start is not None:
+            lo += int(np.searchsorted(clock_in, np.datetime64(pd.Timestamp(start)), side="left"))
+        if end is not None:
+            hi = lo + int(np.searchsorted(self._clock_in[lo:hi], np.datetime64(pd.Timestamp(end)), side="left"))
+
+        return lo, max(lo, hi)
+
+    def _refresh(self) -> None:
+        """Reloads the timesheet if the file changed since it was last parsed. Caller holds the lock."""
+        stat = os.stat(self._csv_path)
+
+        if self._signature is not None and self._signature[:2] == (stat.st_mtime_ns, stat.st_size):
+            return
+
+        appended = None
+        if self._signature is not None and stat.st_size > self._signature[1]:
+            appended = self._read_appended(self._signature[1], self._signature[2])
+
+        if appended is not None and appended.empty:
+            # Only blank lines were appended; nothing to merge, but the tail is the new baseline.
+            self._signature = (stat.st_mtime_ns, stat.st_size, self._tail(stat.st_size))
+            return
+
+        cached = False
+        # Rows without an email sort last in a full reload; merging is only for rows that have one.
+        if appended is not None and not (appended["employee_email"].isna().any() or self._frame["employee_email"].isna().any()):
+            self._index(self._merge(appended), presorted=True)
+            logger.info(f"Merged {len(appended)} appended timesheet rows.")
+        elif appended is not None:
+            self._index(pd.concat([self._frame, appended], ignore_index=True))
+            logger.info(f"Parsed {len(appended)} appended timesheet rows.")
+        elif self._signature is None and (frame := self._read_cache(stat)) is not None:
+            self._index(frame, presorted=True)
+            cached = True
+            logger.info(f"Loaded {len(frame)} timesheet rows from {self._cache_path}.")
+        else:
+            self._index(self._read_csv(self._csv_path))
+            logger.info(f"Parsed {len(self._frame)} timesheet rows from {self._csv_path}.")
+
+        self._signature = (stat.st_mtime_ns, stat.st_size, self._tail(stat.st_size))
+        if not cached:
+            self._schedule_cache_write()
+
+    def _read_csv(self, source) -> pd.DataFrame:
+        frame = pd.read_csv(
+            source,
+            usecols=TIMESHEET_COLUMNS,
+            dtype={"employee_email": "string", **{column: "float64" for column in HOUR_COLUMNS}}
+        )
+        return self._typed(frame)
+
+    def _read_appended(self, offset: int, tail: bytes) -> Optional[pd.DataFrame]:
+        """
+        Parses only the rows appended after `offset` (an empty frame if they are all blank), or returns
+        None if earlier bytes changed or the appended bytes cannot be parsed on their own.
+        """
+        if not tail.endswith(b"\n") or self._tail(offset) != tail:
+            return None
+
+        with open(self._csv_path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+
+        if not data.strip():
+            return pd.DataFrame(columns=TIMESHEET_COLUMNS)
+
+        try:
+            frame = pd.read_csv(
+                io.BytesIO(data),
+                header=None,
+                names=TIMESHEET_COLUMNS,
+                dtype={"employee_email": "string", **{column: "float64" for column in HOUR_COLUMNS}}
+            )
+            return self._typed(frame)
+        except (ValueError, pd.errors.ParserError) as e:
+            logger.warning(f"Could not parse the appended timesheet rows, reloading the file: {e}")
+            return None
+
+    def _typed(self, frame: pd.DataFrame) -> pd.DataFrame:
+        for column in TIMESTAMP_COLUMNS:
+            frame[column] = pd.to_datetime(frame[column], format=self._datetime_format)
+        return frame
+
+    def _merge(self, appended: pd.DataFrame) -> pd.DataFrame:
+        """
+        Inserts appended rows into their employees' blocks of the sorted frame (new employees
+        get a block in email order). Only the appended rows are sorted; the rest keep their order.
+        """
+        appended = appended.sort_values(["employee_email", "clock_in"], kind="stable", ignore_index=True)
+        emails = appended["employee_email"].to_numpy(dtype=object)
+        clock_in = appended["clock_in"].to_numpy(dtype="datetime64[ns]")
+
+        # Offsets are in frame order, which is email order.
+        known = list(self._offsets)
+        positions = np.empty(len(appended), dtype=np.int64)
+        boundaries = np.flatnonzero(emails[1:] != emails[:-1]) + 1
+        for start, stop in zip(np.concatenate([[0], boundaries]), np.concatenate([boundaries, [len(appended)]])):
+            email = emails[start]
+            if email in self._offsets:
+                lo, hi = self._offsets[email]
+                positions[start:stop] = lo + np.searchsorted(self._clock_in[lo:hi], clock_in[start:stop], side="right")
+            else:
+                following = bisect.bisect_left(known, email)
+                positions[start:stop] = self._offsets[known[following]][0] if following < len(known) else len(self._frame)
+
+        existing = self._frame["employee_email"].cat.add_categories(
+            pd.Index(pd.unique(emails)).difference(self._frame["employee_email"].cat.categories)
+        )
+        appended["employee_email"] = pd.Categorical(appended["employee_email"], categories=existing.cat.categories)
+        combined = pd.concat([self._frame.assign(employee_email=existing), appended], ignore_index=True)
+
+        order = np.insert(np.arange(len(self._frame)), positions, np.arange(len(self._frame), len(combined)))
+        return combined.take(order).reset_index(drop=True)
+
+    def _index(self, frame: pd.DataFrame, presorted: bool = False) -> None:
+        """Sorts the frame by employee and clock-in unless it already is, then builds the per-employee offset table."""
+        if not presorted:
+            frame = frame.sort_values(["employee_email", "clock_in"], kind="stable", ignore_index=True)
+            frame["employee_email"] = frame["employee_email"].astype("category")
+
+        codes = frame["employee_email"].cat.codes.to_numpy()
+        categories = frame["employee_email"].cat.categories
+        boundaries = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        starts = np.concatenate([[0], boundaries]) if len(frame) else np.array([], dtype=np.int64)
+        stops = np.concatenate([boundaries, [len(frame)]]) if len(frame) else np.array([], dtype=np.int64)
+
+        self._frame = frame
+        self._offsets = {
+            str(categories[codes[start]]) if codes[start] >= 0 else "nan": (int(start), int(stop))
+            for start, stop in zip(starts, stops)
+        }
+        self._clock_in = frame["clock_in"].to_numpy(dtype="datetime64[ns]")
+        self._salary_hours = frame["total_salary_hours"].to_numpy(dtype=np.float64)
+        self._reports.clear()
+
+    def _tail(self, size: int) -> bytes:
+        with open(self._csv_path, "rb") as f:
+            f.seek(max(0, size - _TAIL_SIGNATURE_BYTES))
+            return f.read(min(size, _TAIL_SIGNATURE_BYTES))
+
+    def _read_cache(self, stat: os.stat_result) -> Optional[pd.DataFrame]:
+        """Reads the binary snapshot if it was written for the current version of the CSV."""
+        if not self._cache_path or not os.path.exists(self._cache_path):
+            return None
+
+        cached = pd.read_pickle(self._cache_path)
+        if cached.attrs.get("source_signature") != [stat.st_mtime_ns, stat.st_size]:
+            return None
+        return cached
+
+    def _schedule_cache_write(self) -> None:
+        """Queues a snapshot of the current frame for the background writer. Caller holds the lock."""
+        if not self._cache_path:
+            return
+
+        if self._cache_writer is None:
+            self._cache_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="timesheet-snapshot")
+        self._frame.attrs["source_signature"] = list(self._signature[:2])
+        self._cache_writer.submit(self._write_cache, self._frame)
+
+    def _write_cache(self, frame: pd.DataFrame) -> None:
+        if frame is not self._frame:
+            # A newer version was loaded meanwhile; its own snapshot is queued behind this one.
+            return
+
+        try:
+            tmp_path = f"{self._cache_path}.tmp"
+            frame.to_pickle(tmp_path)
+            os.replace(tmp_path, self._cache_path)
+        except Exception as e:
+            logger.warning(f"Could not write the timesheet snapshot to {self._cache_path}: {e}")
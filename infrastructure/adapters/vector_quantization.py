@@ -0,0 +1,73 @@
+from typing import Dict
+
+import numpy as np
+
+# Rows scored per block, so the float32 copy of a block of codes stays small.
+SCORE_BLOCK_ROWS = 16384
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+Codes = Dict[str, np.ndarray]
+
+class Int8Quantizer:
+    """
+    Symmetric scalar quantization: each vector is stored as int8 codes plus one float32
+    scale, a quarter of its float32 size. Dot products with a float32 query are close to
+    exact, so a small rescoring shortlist recovers the exact ranking.
+    """
+
+    name = "int8"
+    keys = ("codes", "scales")
+    default_rescore_factor = 4
+
+    def encode(self, vectors: np.ndarray) -> Codes:
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return {"codes": codes, "scales": scales.astype(np.float32)}
+
+    def prepare(self, query: np.ndarray) -> np.ndarray:
+        return query.astype(np.float32)
+
+    def score(self, codes: Codes, query: np.ndarray, start: int, end: int) -> np.ndarray:
+        return (codes["codes"][start:end].astype(np.float32) @ query) * codes["scales"][start:end]
+
+class BinaryQuantizer:
+    """
+    Sign-bit codes packed eight dimensions to a byte, 1/32 of the float32 size. Candidates
+    are ranked by Hamming distance to the query's code, which is coarse, so the shortlist
+    for exact rescoring is larger than for int8.
+    """
+
+    name = "binary"
+    keys = ("codes",)
+    default_rescore_factor = 16
+
+    def encode(self, vectors: np.ndarray) -> Codes:
+        return {"codes": np.packbits(vectors > 0, axis=1)}
+
+    def prepare(self, query: np.ndarray) -> np.ndarray:
+        return np.packbits(query > 0)
+
+    def score(self, codes: Codes, query: np.ndarray, start: int, end: int) -> np.ndarray:
+        distances = _POPCOUNT[np.bitwise_xor(codes["codes"][start:end], query)].sum(axis=1, dtype=np.int32)
+        return -distances.astype(np.float32)
+
+QUANTIZERS = {quantizer.name: quantizer for quantizer in (Int8Quantizer(), BinaryQuantizer())}
+
+def encode_blocks(quantizer, matrix: np.ndarray) -> Codes:
+    """Encodes a (possibly memory-mapped) matrix block by block."""
+    blocks = [quantizer.encode(np.asarray(matrix[start:start + SCORE_BLOCK_ROWS], dtype=np.float32))
+              for start in range(0, len(matrix), SCORE_BLOCK_ROWS)]
+    if not blocks:
+        return quantizer.encode(np.zeros((0, matrix.shape[1]), dtype=np.float32))
+    return {key: np.concatenate([block[key] for block in blocks]) for key in blocks[0]}
+
+def approximate_scores(quantizer, codes: Codes, query: np.ndarray) -> np.ndarray:
+    """Scores the query against every code, block by block; higher is more similar."""
+    prepared = quantizer.prepare(query)
+    rows = len(codes["codes"])
+    scores = np.empty(rows, dtype=np.float32)
+    for start in range(0, rows, SCORE_BLOCK_ROWS):
+        end = min(start + SCORE_BLOCK_ROWS, rows)
+        scores[start:end] = quantizer.score(codes, prepared, start, end)
+    return scores
@@ -1,14 +1,16 @@
-from typing import List
+from typing import AsyncIterable, AsyncIterator, Dict, List, Mapping
+from datetime import datetime
 
+import pandas as pd
 from abc import ABC, abstractmethod
-from domain.entities import MCSDocumentChunk, QueryResult
+from domain.entities import MCSDocumentChunk, QueryResult, IngestionBatch, ChunkFilter, RosterSchedule, TimesheetSubmission
 
 class IKnowledgeService(ABC):
     """Interface for knowledge service operations."""
 
     @abstractmethod
-    async def query(self, question: str, top_k: int = 2) -> QueryResult:
-        """Handles a query to the knowledge base."""
+    async def query(self, question: str, top_k: int = 2, filters: ChunkFilter | None = None) -> QueryResult:
+        """Handles a query to the knowledge base, optionally restricted by metadata filters."""
         pass
 
     @abstractmethod
@@ -16,6 +18,16 @@ class IKnowledgeService(ABC):
         """Inserts document chunks into the knowledge base."""
         pass
 
+    @abstractmethod
+    async def insert_stream(self, batches: AsyncIterable[List[MCSDocumentChunk]]) -> int:
+        """Inserts document chunk batches as they arrive and returns the number inserted."""
+        pass
+
+    @abstractmethod
+    async def delete(self, chunk_ids: List[str]) -> bool:
+        """Deletes document chunks from the knowledge base."""
+        pass
+
 class IDocumentService(ABC):
     """Interface for document loading and ingestion services."""
     @abstractmethod
@@ -23,6 +35,21 @@ class IDocumentService(ABC):
         """Ingest documents from the specified directory and return document chunks."""
         pass
 
+    @abstractmethod
+    async def ingest_changed_documents(self, directory_path: str, parse: bool = True) -> IngestionBatch:
+        """Ingest only new or changed documents and report chunks of changed or removed ones."""
+        pass
+
+    @abstractmethod
+    def stream_documents(self, directory_path: str, batch_size: int = 64) -> AsyncIterator[List[MCSDocumentChunk]]:
+        """Ingest documents from the specified directory and yield document chunks in batches."""
+        pass
+
+    @abstractmethod
+    def stream_changed_documents(self, batch: IngestionBatch, batch_size: int = 64) -> AsyncIterator[List[MCSDocumentChunk]]:
+        """Yield the chunks of the changed files of an unparsed incremental batch in batches."""
+        pass
+
 class ILLMService(ABC):
     """Interface for LLM generation on grounds of prompt set and context."""
     @abstractmethod
@@ -45,16 +72,47 @@ class IKnowledgeBase(ABC):
         pass
 
     @abstractmethod
-    async def query(self, query_text: str, top_k: int = 5) -> QueryResult:
+    async def delete(self, chunk_ids: List[str]) -> None:
+        """
+        Remove document chunks from the knowledge base.
+
+        :param chunk_ids: The IDs of the chunks to be removed. Unknown IDs are ignored.
+        """
+        pass
+
+    @abstractmethod
+    def all_chunks(self) -> List[MCSDocumentChunk]:
+        """
+        Return every stored document chunk without embeddings, e.g. to rebuild derived indexes.
+        """
+        pass
+
+    @abstractmethod
+    async def query(self, query_text: str, top_k: int = 5, filters: ChunkFilter | None = None) -> QueryResult:
         """
         Query the knowledge base for relevant document chunks.
 
         :param query_text: The text of the query.
         :param top_k: The number of the closest chunks in the coordinate space to return.
+        :param filters: Metadata filters applied before scoring; only matching chunks are candidates.
         :return: A QueryResult containing the relevant chunks and response.
         """
         pass
 
+    async def query_local(self, query_text: str, top_k: int = 5, filters: ChunkFilter | None = None) -> QueryResult | None:
+        """
+        Answer the query from local indexes only, without a remote embedding call, if the knowledge
+        base can; None otherwise. Such answers are cheap enough not to be worth caching.
+        """
+        return None
+
+    @abstractmethod
+    def document_catalogue(self) -> Dict[str, str]:
+        """
+        Return the HR document codes in the knowledge base with the title of their newest version.
+        """
+        pass
+
     @abstractmethod
     async def persist(self) -> None:
         """
@@ -67,4 +125,78 @@ class IKnowledgeBase(ABC):
         """
         Load the knowledge base state from storage.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def state_version(self) -> int:
+        """
+        Return a number that changes whenever the persisted state changes, so processes sharing
+        the storage agree on it; 0 when nothing is persisted.
+        """
+        return 0
+
+class ITimesheetRepository(ABC):
+    """
+    Interface for read access to employee timesheet records.
+    """
+
+    @abstractmethod
+    def frame(self) -> pd.DataFrame:
+        """
+        Return every timesheet record, sorted by employee_email and clock_in.
+        """
+        pass
+
+    @abstractmethod
+    def get_entries(self, employee_email: str, start: datetime | None = None, end: datetime | None = None) -> pd.DataFrame:
+        """
+        Return the timesheet records of an employee within a clock-in window.
+
+        :param employee_email: The email of the employee.
+        :param start: Inclusive lower bound on clock_in, unbounded if None.
+        :param end: Exclusive upper bound on clock_in, unbounded if None.
+        """
+        pass
+
+    @abstractmethod
+    def total_salary_hours(self, employee_email: str, start: datetime | None = None, end: datetime | None = None) -> float:
+        """
+        Sum the salary hours of an employee within a clock-in window.
+
+        :param employee_email: The email of the employee.
+        :param start: Inclusive lower bound on clock_in, unbounded if None.
+        :param end: Exclusive upper bound on clock_in, unbounded if None.
+        """
+        pass
+
+    @abstractmethod
+    def working_hours_report(
+            self,
+            start: datetime,
+            end: datetime,
+            rosters: Mapping[str, RosterSchedule] | None = None
+        ) -> pd.DataFrame:
+        """
+        Return salary, working, expected, overtime and remaining hours of every employee for a clock-in window.
+
+        :param start: Inclusive lower bound on clock_in.
+        :param end: Exclusive upper bound on clock_in.
+        :param rosters: Roster schedules of employees on rosters; everyone else is expected to work 40 hrs/week.
+        """
+        pass
+
+class ITimesheetSink(ABC):
+    """
+    Interface for the system of record (ERP) that timesheet submissions are delivered to.
+    """
+
+    @abstractmethod
+    async def submit(self, submissions: List[TimesheetSubmission]) -> Dict[str, str]:
+        """
+        Deliver a batch of submissions. Submissions already delivered under the same
+        idempotency key must be acknowledged without being booked again.
+
+        :param submissions: The batch, in queue order.
+        :return: Idempotency key -> reason for every submission the ERP rejected; the rest are accepted.
+        :raises Exception: When the batch could not be delivered; it is retried as a whole.
+        """
+        pass
@@ -0,0 +1,419 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+import httpx
+import openai
+from dotenv import load_dotenv
+from pydantic import PrivateAttr
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.base.llms.types import ChatMessage, ChatResponse, ChatResponseAsyncGen
+from llama_index.embeddings.jinaai import JinaEmbedding
+from llama_index.llms.openai import OpenAI
+
+from infrastructure.adapters.embedding_cache import CachedEmbedding, cache_from_env
+from infrastructure.telemetry import registry
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("ModelGateway")
+
+T = TypeVar("T")
+
+OPENAI = "openai"
+JINA = "jina"
+
+MODEL_REQUESTS = registry.counter(
+    "hr_helpdesk_model_requests_total",
+    "Provider calls by outcome: ok, error or timeout. Retries are counted as separate calls.",
+    ["provider", "result"]
+)
+MODEL_COALESCED = registry.counter(
+    "hr_helpdesk_model_coalesced_total",
+    "Requests answered by an identical request already in flight.",
+    ["provider"]
+)
+MODEL_RETRIES = registry.counter(
+    "hr_helpdesk_model_retries_total",
+    "Retries by whether the retry budget allowed them: retried or exhausted.",
+    ["provider", "result"]
+)
+MODEL_IN_FLIGHT = registry.gauge("hr_helpdesk_model_in_flight", "Provider calls currently holding a concurrency slot.", ["provider"])
+
+# Status codes worth retrying; other 4xx responses fail the same way on every attempt.
+_RETRYABLE_STATUS = {408, 409, 429}
+
+@dataclass
+class ProviderLimits:
+    max_concurrency: int
+    timeout_seconds: float
+    max_retries: int = 3
+    retry_ratio: float = 0.2
+    max_connections: int = 32
+
+class RetryBudget:
+    """
+    Allows retries only while they stay below `ratio` of the requests made in the last
+    `window_seconds` (with `min_retries` always allowed), so that an outage does not turn
+    every request into `max_retries` more requests.
+    """
+
+    def __init__(self, ratio: float = 0.2, window_seconds: float = 10, min_retries: int = 3):
+        self._ratio = ratio
+        self._window_seconds = window_seconds
+        self._min_retries = min_retries
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+
+    def record_request(self) -> None:
+        self._requests.append(time.monotonic())
+
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        for events in (self._requests, self._retries):
+            while events and now - events[0] > self._window_seconds:
+                events.popleft()
+
+        if len(self._retries) >= max(self._min_retries, self._ratio * len(self._requests)):
+            return False
+        self._retries.append(now)
+        return True
+
+class _Provider:
+    def __init__(self, name: str, limits: ProviderLimits):
+        self.name = name
+        self.limits = limits
+        self.semaphore = asyncio.Semaphore(limits.max_concurrency)
+        self.budget = RetryBudget(ratio=limits.retry_ratio)
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self._http_client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """The provider's pooled HTTP client, created on first use rather than when the gateway module is imported."""
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(
+                timeout=self.limits.timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.limits.max_connections,
+                    max_keepalive_connections=self.limits.max_concurrency
+                )
+            )
+        return self._http_client
+
+class ModelGateway:
+    """
+    Single place through which the app calls model providers.
+
+    Each provider gets one pooled HTTP client shared by every model built here, a cap on
+    concurrent calls, a per-attempt timeout and retries with jittered backoff that draw on a
+    shared retry budget. Identical requests made while one is in flight share its result
+    instead of being sent again. Streamed calls hold a concurrency slot until the stream is
+    consumed and are retried only before their first chunk; they are never shared.
+    """
+
+    def __init__(self, limits: Dict[str, ProviderLimits]):
+        self._providers = {name: _Provider(name, provider_limits) for name, provider_limits in limits.items()}
+        self._llms: Dict[Tuple[str, float], "GatewayOpenAI"] = {}
+        self._embedding: Optional[BaseEmbedding] = None
+
+    @classmethod
+    def from_env(cls) -> "ModelGateway":
+        max_retries = int(os.getenv("MODEL_MAX_RETRIES", "3"))
+        retry_ratio = float(os.getenv("MODEL_RETRY_RATIO", "0.2"))
+        return cls({
+            OPENAI: ProviderLimits(
+                max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "16")),
+                timeout_seconds=float(os.getenv("OPENAI_TIMEOUT_SECONDS", "60")),
+                max_retries=max_retries,
+                retry_ratio=retry_ratio
+            ),
+            JINA: ProviderLimits(
+                max_concurrency=int(os.getenv("JINA_MAX_CONCURRENCY", "8")),
+                timeout_seconds=float(os.getenv("JINA_TIMEOUT_SECONDS", "20")),
+                max_retries=max_retries,
+                retry_ratio=retry_ratio
+            ),
+        })
+
+    def http_client(self, provider: str) -> httpx.AsyncClient:
+        return self._providers[provider].http_client
+
+    def llm(self, model: str, temperature: float = 0.1) -> "GatewayOpenAI":
+        """Returns the shared OpenAI model for `model` and `temperature`."""
+        key = (model, temperature)
+        if key not in self._llms:
+            provider = self._providers[OPENAI]
+            self._llms[key] = GatewayOpenAI(
+                gateway=self,
+                model=model,
+                temperature=temperature,
+                api_key=os.getenv("OPENAI_API_KEY"),
+                # Retries and timeouts are applied by the gateway, not by the OpenAI SDK.
+                max_retries=0,
+                timeout=provider.limits.timeout_seconds
+            )
+        return self._llms[key]
+
+    def embedding(self) -> BaseEmbedding:
+        """Returns the shared, query-cached Jina embedding model."""
+        if self._embedding is None:
+            jina = JinaEmbedding(model="jina-embeddings-v3", api_key=os.getenv("JINAAI_API_KEY"))
+            jina._api = _PooledJinaAPICaller(self, jina._api)
+            self._embedding = CachedEmbedding(GatewayEmbedding(jina, gateway=self), cache=cache_from_env())
+        return self._embedding
+
+    @asynccontextmanager
+    async def limit(self, provider: str) -> AsyncIterator[None]:
+        """Holds one of the provider's concurrency slots."""
+        state = self._providers[provider]
+        async with state.semaphore:
+            MODEL_IN_FLIGHT.inc(provider=provider)
+            try:
+                yield
+            finally:
+                MODEL_IN_FLIGHT.dec(provider=provider)
+
+    async def call(self, provider: str, fn: Callable[[], Awaitable[T]], key: str | None = None) -> T:
+        """
+        Runs `fn()` under the provider's limits. Calls with the same `key` made while one is
+        in flight wait for that call instead of starting their own.
+        """
+        if key is None:
+            return await self._call(provider, fn)
+
+        state = self._providers[provider]
+        future = state.in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._call(provider, fn))
+            state.in_flight[key] = future
+            future.add_done_callback(lambda _: state.in_flight.pop(key, None))
+        else:
+            MODEL_COALESCED.inc(provider=provider)
+
+        # Shielded so that one cancelled caller does not cancel the request others wait on.
+        return await asyncio.shield(future)
+
+    async def _call(self, provider: str, fn: Callable[[], Awaitable[T]]) -> T:
+        state = self._providers[provider]
+        attempt = 0
+        while True:
+            state.budget.record_request()
+            async with self.limit(provider):
+                try:
+                    result = await asyncio.wait_for(fn(), state.limits.timeout_seconds)
+                    MODEL_REQUESTS.inc(provider=provider, result="ok")
+                    return result
+                except Exception as e:
+                    MODEL_REQUESTS.inc(provider=provider, result="timeout" if isinstance(e, asyncio.TimeoutError) else "error")
+                    if not self._may_retry(state, attempt, e):
+                        raise
+                    logger.warning(f"{provider} call failed ({type(e).__name__}: {e}); retrying.")
+            await self.backoff(attempt)
+            attempt += 1
+
+    def may_retry(self, provider: str, attempt: int, error: Exception) -> bool:
+        return self._may_retry(self._providers[provider], attempt, error)
+
+    def _may_retry(self, state: _Provider, attempt: int, error: Exception) -> bool:
+        if attempt >= state.limits.max_retries or not self._is_retryable(error):
+            return False
+        if not state.budget.try_spend():
+            MODEL_RETRIES.inc(provider=state.name, result="exhausted")
+            return False
+        MODEL_RETRIES.inc(provider=state.name, result="retried")
+        return True
+
+    @staticmethod
+    async def backoff(attempt: int) -> None:
+        await asyncio.sleep(min(8.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0))
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, (asyncio.TimeoutError, httpx.TransportError, openai.APIConnectionError, ConnectionError)):
+            return True
+        status = getattr(error, "status_code", None)
+        if status is None and isinstance(error, httpx.HTTPStatusError):
+            status = error.response.status_code
+        return status is not None and (status in _RETRYABLE_STATUS or status >= 500)
+
+    @staticmethod
+    def request_key(*parts: Any) -> str:
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class GatewayOpenAI(OpenAI):
+    """OpenAI chat model whose requests go through the ModelGateway."""
+
+    _gateway: ModelGateway = PrivateAttr()
+
+    def __init__(self, gateway: ModelGateway, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._gateway = gateway
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "gateway_openai_llm"
+
+    def _get_credential_kwargs(self, is_async: bool = False) -> Dict[str, Any]:
+        if is_async and self._async_http_client is None:
+            # Resolved when the first async client is built, so creating the model opens no connection pool.
+            self._async_http_client = self._gateway.http_client(OPENAI)
+        return super()._get_credential_kwargs(is_async=is_async)
+
+    def _get_model_kwargs(self, **kwargs: Any) -> Dict[str, Any]:
+        if kwargs.get("stream"):
+            # A stream reports token usage only in an extra final chunk, and only when asked to.
+            kwargs.setdefault("stream_options", {"include_usage": True})
+        return super()._get_model_kwargs(**kwargs)
+
+    async def _achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        key = self._gateway.request_key(
+            self.model,
+            self.temperature,
+            [message.model_dump() for message in messages],
+            kwargs
+        )
+        return await self._gateway.call(OPENAI, lambda: super(GatewayOpenAI, self)._achat(messages, **kwargs), key=key)
+
+    async def _astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        gateway = self._gateway
+        open_stream = super()._astream_chat
+        timeout = self.timeout
+
+        async def gen() -> ChatResponseAsyncGen:
+            async with gateway.limit(OPENAI):
+                attempt = 0
+                while True:
+                    stream = await open_stream(messages, **kwargs)
+                    try:
+                        # The request is only sent when the stream is first read.
+                        first = await asyncio.wait_for(stream.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        return
+                    except Exception as e:
+                        # Releases the failed attempt's response before a retry opens another one.
+                        await _close_stream(stream)
+                        if not gateway.may_retry(OPENAI, attempt, e):
+                            raise
+                        await gateway.backoff(attempt)
+                        attempt += 1
+                        continue
+
+                    try:
+                        yield first
+                        async for chunk in stream:
+                            yield chunk
+                    finally:
+                        await _close_stream(stream)
+                    return
+
+        return gen()
+
+class GatewayEmbedding(BaseEmbedding):
+    """
+    Embedding model wrapper that sends the wrapped model's async calls through the
+    ModelGateway. Sync calls are passed through unchanged.
+    """
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _gateway: ModelGateway = PrivateAttr()
+    _provider: str = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, gateway: ModelGateway, provider: str = JINA, **kwargs: Any):
+        super().__init__(
+            # Keeps embedding cache keys the same as for the unwrapped model.
+            model_name=getattr(embed_model, "model", None) or embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            **kwargs
+        )
+        self._embed_model = embed_model
+        self._gateway = gateway
+        self._provider = provider
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "GatewayEmbedding"
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed_model._get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        key = self._gateway.request_key(self.model_name, "query", query)
+        return await self._gateway.call(self._provider, lambda: self._embed_model._aget_query_embedding(query), key=key)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed_model._get_text_embedding(text)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_model._get_text_embeddings(texts)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        key = self._gateway.request_key(self.model_name, "text", texts)
+        return await self._gateway.call(self._provider, lambda: self._embed_model._aget_text_embeddings(texts), key=key)
+
+async def _close_stream(stream: ChatResponseAsyncGen) -> None:
+    try:
+        await stream.aclose()
+    except Exception as e:
+        logger.debug(f"Closing an OpenAI stream failed: {e}")
+
+class _PooledJinaAPICaller:
+    """
+    Jina API caller whose async float requests reuse the gateway's HTTP client instead of opening
+    a session per call. Everything else goes to the caller JinaEmbedding built, which this one
+    replaces as its `_api`; that attribute is internal, so llama-index-embeddings-jinaai is pinned.
+    """
+
+    def __init__(self, gateway: ModelGateway, api: Any):
+        self._gateway = gateway
+        self._api = api
+        self.api_url = api.api_url
+        self.api_key = api.api_key
+        self.model = api.model
+
+    def get_embeddings(self, input, **kwargs: Any) -> List[List[float]]:
+        return self._api.get_embeddings(input, **kwargs)
+
+    async def aget_embeddings(
+            self,
+            input,
+            encoding_type: str = "float",
+            task: Optional[str] = None,
+            dimensions: Optional[int] = None,
+            late_chunking: Optional[bool] = None
+        ) -> List[List[float]]:
+
+        if encoding_type != "float":
+            return await self._api.aget_embeddings(input, encoding_type, task, dimensions, late_chunking)
+
+        payload: Dict[str, Any] = {"input": input, "model": self.model, "encoding_type": encoding_type}
+        if task is not None:
+            payload["task"] = task
+        if dimensions is not None:
+            payload["dimensions"] = dimensions
+        if late_chunking is not None:
+            payload["late_chunking"] = late_chunking
+
+        response = await self._gateway.http_client(JINA).post(
+            self.api_url,
+            json=payload,
+            headers={"Authorization": f"Bearer {self.api_key}", "Accept-Encoding": "identity"}
+        )
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+gateway = ModelGateway.from_env()
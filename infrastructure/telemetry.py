@@ -0,0 +1,342 @@
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events import BaseEvent
+from llama_index.core.instrumentation.events.embedding import EmbeddingEndEvent, EmbeddingStartEvent
+from llama_index.core.instrumentation.events.exception import ExceptionEvent
+from llama_index.core.instrumentation.events.llm import LLMChatEndEvent, LLMChatStartEvent
+from llama_index.core.base.llms.types import ToolCallBlock
+from pydantic import PrivateAttr
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("Telemetry")
+
+# Seconds; covers cache hits (milliseconds) up to slow agent turns (a minute).
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_INF_BUCKET = 'le="+Inf"'
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Monotonic counter with a fixed set of label names."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Gauge:
+    """Value that can go up and down, with a fixed set of label names."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed set of label names, as Prometheus expects."""
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+        ):
+
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._buckets = tuple(sorted(buckets))
+        # Label values -> (per-bucket counts, sum, count).
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            counts, total, count = self._series.get(key) or ([0] * len(self._buckets), 0.0, 0)
+            for i, bound in enumerate(self._buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._series[key] = (counts, total + value, count + 1)
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(str(labels[name]) for name in self.labelnames))
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self._buckets, counts):
+                    labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, _INF_BUCKET)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Holds the process's metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Counter | Gauge | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        with self._lock:
+            return self._metrics.setdefault(name, Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        with self._lock:
+            return self._metrics.setdefault(name, Gauge(name, documentation, labelnames))
+
+    def histogram(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+        ) -> Histogram:
+
+        with self._lock:
+            return self._metrics.setdefault(name, Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+SPAN_SECONDS = registry.histogram(
+    "hr_helpdesk_span_seconds",
+    "Duration of traced stages: bot turns, Teams lookups, tool calls, LLM and embedding requests.",
+    ["span"]
+)
+ERRORS = registry.counter("hr_helpdesk_errors_total", "Traced stages that raised an exception.", ["span"])
+LLM_TOKENS = registry.counter("hr_helpdesk_llm_tokens_total", "Tokens reported by the LLM provider.", ["model", "kind"])
+CACHE_REQUESTS = registry.counter("hr_helpdesk_cache_requests_total", "Cache lookups by cache and result.", ["cache", "result"])
+
+# Set TIMING_LOGS=true to log one JSON line with every span of each traced request.
+TIMING_LOGS = os.getenv("TIMING_LOGS", "false").lower() == "true"
+
+@dataclass
+class _Trace:
+    name: str
+    attributes: Dict[str, Any]
+    started: float
+    spans: List[Dict[str, Any]] = field(default_factory=list)
+
+_current_trace: contextvars.ContextVar[Optional[_Trace]] = contextvars.ContextVar("current_trace", default=None)
+
+def record_span(
+        name: str,
+        started: float,
+        duration: float,
+        attributes: Dict[str, Any] | None = None,
+        error: str | None = None
+    ) -> None:
+    """Observes a finished span and appends it to the current request trace, if any."""
+    SPAN_SECONDS.observe(duration, span=name)
+    if error is not None:
+        ERRORS.inc(span=name)
+
+    current = _current_trace.get()
+    if current is not None:
+        record = {
+            "span": name,
+            "start_ms": round((started - current.started) * 1000, 2),
+            "duration_ms": round(duration * 1000, 2),
+        }
+        if attributes:
+            record["attributes"] = attributes
+        if error is not None:
+            record["error"] = error
+        current.spans.append(record)
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Times the enclosed block as a span. The yielded dict can be filled with attributes
+    that end up in the structured timing log.
+    """
+    started = time.perf_counter()
+    error = None
+    try:
+        yield attributes
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        record_span(name, started, time.perf_counter() - started, attributes, error)
+
+@contextmanager
+def trace(name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Times one request as a span and collects every span recorded inside it, including those
+    in tasks and worker threads started from it. Logs them as JSON when TIMING_LOGS is set.
+    """
+    current = _Trace(name=name, attributes=attributes, started=time.perf_counter())
+    token = _current_trace.set(current)
+    error = None
+    try:
+        yield attributes
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - current.started
+        _current_trace.reset(token)
+        record_span(name, current.started, duration, error=error)
+
+        if TIMING_LOGS:
+            logger.info(json.dumps({
+                "trace": name,
+                "attributes": attributes,
+                "duration_ms": round(duration * 1000, 2),
+                "error": error,
+                "spans": current.spans,
+            }, ensure_ascii=False, default=str))
+
+# Embedding models that wrap another one and emit their own events around the inner model's
+# call. Only the innermost model that emits events (GatewayEmbedding, which calls the remote model
+# directly) is timed, so a request is one span; cache hits are counted in CACHE_REQUESTS instead.
+_WRAPPER_EMBEDDINGS = frozenset(("CachedEmbedding",))
+
+class LlamaIndexTelemetryHandler(BaseEventHandler):
+    """Turns LlamaIndex instrumentation events into LLM and embedding request spans and token counters."""
+
+    _started: Dict[str, Tuple[str, float, str]] = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LlamaIndexTelemetryHandler"
+
+    def handle(self, event: BaseEvent, **kwargs: Any) -> None:
+        if isinstance(event, LLMChatStartEvent):
+            self._started[event.span_id] = ("llm", time.perf_counter(), self._model_name(event.model_dict))
+        elif isinstance(event, EmbeddingStartEvent):
+            if event.model_dict.get("class_name") in _WRAPPER_EMBEDDINGS:
+                return
+            self._started[event.span_id] = ("embedding", time.perf_counter(), self._model_name(event.model_dict))
+        elif isinstance(event, LLMChatEndEvent):
+            self._finish_llm(event)
+        elif isinstance(event, EmbeddingEndEvent):
+            started = self._started.pop(event.span_id, None)
+            if started is not None:
+                record_span("embedding.request", started[1], time.perf_counter() - started[1], {"model": started[2], "texts": len(event.chunks)})
+        elif isinstance(event, ExceptionEvent):
+            started = self._started.pop(event.span_id, None)
+            if started is not None:
+                record_span(f"{started[0]}.request", started[1], time.perf_counter() - started[1], {"model": started[2]}, type(event.exception).__name__)
+
+    def _model_name(self, model_dict: Dict[str, Any]) -> str:
+        return str(model_dict.get("model") or model_dict.get("model_name") or model_dict.get("class_name", ""))
+
+    def _finish_llm(self, event: LLMChatEndEvent) -> None:
+        started = self._started.pop(event.span_id, None)
+        if started is None or event.response is None:
+            return
+
+        _, started_at, model = started
+        message = event.response.message
+        # A response that selects tools is a planning step; one without is the final answer.
+        selects_tools = bool(message.additional_kwargs.get("tool_calls")) or any(
+            isinstance(block, ToolCallBlock) for block in message.blocks
+        )
+        name = "llm.tool_selection" if selects_tools else "llm.answer"
+
+        prompt_tokens, completion_tokens = self._token_counts(event.response)
+        if prompt_tokens:
+            LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+        if completion_tokens:
+            LLM_TOKENS.inc(completion_tokens, model=model, kind="completion")
+
+        record_span(name, started_at, time.perf_counter() - started_at, {
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        })
+
+    @staticmethod
+    def _token_counts(response: Any) -> Tuple[int, int]:
+        usage = response.additional_kwargs
+        if not usage.get("prompt_tokens"):
+            # The last chunk of a stream; its usage is on the raw chunk when the LLM did not copy it over.
+            raw = response.raw
+            usage = getattr(raw, "usage", None) or (raw.get("usage") if isinstance(raw, dict) else None) or {}
+            if not isinstance(usage, dict):
+                usage = {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+        return int(usage.get("prompt_tokens") or 0), int(usage.get("completion_tokens") or 0)
+
+_handler: Optional[LlamaIndexTelemetryHandler] = None
+
+def instrument_llama_index() -> None:
+    """Registers the LlamaIndex event handler on the root dispatcher once per process."""
+    global _handler
+
+    if _handler is None:
+        _handler = LlamaIndexTelemetryHandler()
+        get_dispatcher().add_event_handler(_handler)
@@ -1,15 +1,45 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 
 from botbuilder.core import BotFrameworkAdapter, BotFrameworkAdapterSettings
-from botbuilder.schema import Activity
+from botbuilder.schema import Activity, ActivityTypes
 
 from config import Config
 from bot import MCSHumanResourcesBot
+from services.react_service import warmup, is_ready, timesheet_queue
+from infrastructure.telemetry import registry
+from turn_queue import TurnQueue, DUPLICATE, REJECTED
 
 _ = load_dotenv()
 
-app = FastAPI()
+_warmup_task: asyncio.Task | None = None
+
+# In queued mode message activities are acknowledged at once and answered by background workers.
+TURN_QUEUE_ENABLED = os.getenv("TURN_QUEUE_ENABLED", "false").lower() == "true"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Starts warmup in the background so the server binds immediately; /readyz reports when it is done."""
+    global _warmup_task
+
+    preconnect = os.getenv("WARMUP_PRECONNECT", "true").lower() == "true"
+    _warmup_task = asyncio.create_task(warmup(preconnect=preconnect))
+    await timesheet_queue.start()
+    if turn_queue is not None:
+        await turn_queue.start()
+    yield
+    if turn_queue is not None:
+        await turn_queue.stop()
+    await timesheet_queue.stop()
+    if not _warmup_task.done():
+        _warmup_task.cancel()
+
+app = FastAPI(lifespan=lifespan)
 bot = MCSHumanResourcesBot()
 
 settings = BotFrameworkAdapterSettings(
@@ -20,6 +50,17 @@ settings = BotFrameworkAdapterSettings(
 
 adapter = BotFrameworkAdapter(settings)
 
+turn_queue = (
+    TurnQueue(
+        adapter,
+        bot.on_turn,
+        workers=int(os.getenv("TURN_QUEUE_WORKERS", "8")),
+        max_pending=int(os.getenv("TURN_QUEUE_MAX_PENDING", "256"))
+    )
+    if TURN_QUEUE_ENABLED
+    else None
+)
+
 @app.post("/")
 async def messages(request: Request):
     body = await request.json()
@@ -27,13 +68,48 @@ async def messages(request: Request):
 
     auth_header = request.headers.get("Authorization", "")
 
+    # Invokes expect their response in the HTTP reply, so only messages are queued.
+    if turn_queue is not None and activity.type == ActivityTypes.message:
+        try:
+            result = await turn_queue.submit(activity, auth_header)
+        except PermissionError:
+            return Response(status_code=401)
+
+        if result == REJECTED:
+            return Response(status_code=503, headers={"Retry-After": "5"})
+        return Response(status_code=200 if result == DUPLICATE else 202)
+
     async def call_bot(context):
         await bot.on_turn(context)
     
     await adapter.process_activity(activity, auth_header, call_bot)
     return Response(status_code=200)
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: the knowledge base and timesheet are loaded."""
+    if is_ready():
+        return {"status": "ready"}
+
+    if _warmup_task is not None and _warmup_task.done() and _warmup_task.exception() is not None:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "failed", "error": str(_warmup_task.exception())}
+        )
+
+    return JSONResponse(status_code=503, content={"status": "starting"})
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: stage latency histograms and token, cache and error counters."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
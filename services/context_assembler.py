@@ -0,0 +1,163 @@
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence, Set, Union
+
+from llama_index.core.utils import get_tokenizer
+
+from domain.entities import ChunkView, MCSDocumentChunk
+from infrastructure.adapters.lexical_index import tokenize
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("ContextAssembler")
+
+Chunk = Union[ChunkView, MCSDocumentChunk]
+
+# Chunk IDs produced by DocumentService: "<file path and hash key>_chunk_<position in file>".
+_CHUNK_ID_PATTERN = re.compile(r"^(?P<file>.+)_chunk_(?P<position>\d+)$")
+# Longest overlap looked for between consecutive chunks; SentenceSplitter overlaps by a few sentences at most.
+_MAX_OVERLAP_CHARS = 1000
+# Allowance for a passage's "[Citation n] <source>" line, which is added after packing.
+_LABEL_TOKENS = 40
+
+@dataclass
+class _Passage:
+    file_key: Optional[str]
+    first: int
+    last: int
+    text: str
+    source: str
+    terms: Set[str] = field(default_factory=set)
+
+@dataclass
+class AssembledContext:
+    """Packed context text with one label per passage, and the sources in citation order."""
+    text: str
+    sources: List[str]
+    tokens: int
+    dropped: int
+
+class ContextAssembler:
+    """
+    Turns retrieved chunks into a compact, cited context for the LLM.
+
+    Chunks whose terms largely repeat an earlier chunk are dropped, the rest are taken in rank
+    order while they fit into `token_budget`, and selected neighbouring chunks of the same file
+    are merged into one labelled passage with their overlapping text removed. With `rerank` the
+    chunks are first reordered by how many of the question's terms they contain, keeping
+    retrieval order among ties.
+    """
+
+    def __init__(
+            self,
+            token_budget: int = 3000,
+            duplicate_threshold: float = 0.8,
+            rerank: bool = False,
+            tokenizer: Callable[[str], Sequence] | None = None
+        ):
+
+        self._token_budget = token_budget
+        self._duplicate_threshold = duplicate_threshold
+        self._rerank = rerank
+        self._tokenizer = tokenizer or get_tokenizer()
+
+    def assemble(self, question: str, chunks: Sequence[Chunk]) -> AssembledContext:
+        ranked = self._reranked(question, chunks) if self._rerank else list(chunks)
+        candidates = self._deduplicated(ranked)
+
+        # Chunks are selected individually so one long run of neighbours cannot crowd out the rest;
+        # merging afterwards only removes overlap and labels, so the selection stays within budget.
+        selected: List[_Passage] = []
+        used = 0
+        for passage in candidates:
+            tokens = len(self._tokenizer(passage.text)) + _LABEL_TOKENS
+            if used + tokens > self._token_budget:
+                continue
+            selected.append(passage)
+            used += tokens
+
+        parts = []
+        sources = []
+        for passage in self._merge_neighbours(selected):
+            sources.append(passage.source)
+            parts.append(f"[Citation {len(sources)}] {passage.source}\n{passage.text}")
+
+        text = "\n\n".join(parts)
+        tokens = len(self._tokenizer(text)) if text else 0
+        dropped = len(chunks) - len(selected)
+
+        logger.info(f"Packed {len(selected)} of {len(chunks)} chunks into {len(parts)} passages ({tokens} tokens).")
+        return AssembledContext(text=text, sources=sources, tokens=tokens, dropped=dropped)
+
+    def _reranked(self, question: str, chunks: Sequence[Chunk]) -> List[Chunk]:
+        question_terms = set(tokenize(question))
+        if not question_terms:
+            return list(chunks)
+
+        coverage = [len(question_terms.intersection(tokenize(chunk.content))) for chunk in chunks]
+        order = sorted(range(len(chunks)), key=lambda i: (-coverage[i], i))
+        return [chunks[i] for i in order]
+
+    def _deduplicated(self, chunks: Sequence[Chunk]) -> List[_Passage]:
+        kept: List[_Passage] = []
+
+        for chunk in chunks:
+            terms = set(tokenize(chunk.content))
+            if any(self._similarity(terms, passage.terms) >= self._duplicate_threshold for passage in kept):
+                continue
+
+            match = _CHUNK_ID_PATTERN.match(chunk.chunk_id)
+            position = int(match.group("position")) if match else 0
+            kept.append(_Passage(
+                file_key=match.group("file") if match else None,
+                first=position,
+                last=position,
+                text=chunk.content.strip(),
+                source=self._source(chunk),
+                terms=terms
+            ))
+
+        return kept
+
+    def _merge_neighbours(self, passages: List[_Passage]) -> List[_Passage]:
+        """Merges passages of consecutive chunks of one file into the better ranked of them."""
+        merged: List[_Passage] = []
+
+        for passage in passages:
+            for target in merged:
+                if target.file_key is None or target.file_key != passage.file_key:
+                    continue
+                if passage.first == target.last + 1:
+                    target.text = self._join(target.text, passage.text)
+                    target.last = passage.last
+                    break
+                if passage.last == target.first - 1:
+                    target.text = self._join(passage.text, target.text)
+                    target.first = passage.first
+                    break
+            else:
+                merged.append(passage)
+
+        return merged
+
+    @staticmethod
+    def _join(first: str, second: str) -> str:
+        """Concatenates two consecutive chunks, dropping the text the second repeats from the end of the first."""
+        for size in range(min(len(first), len(second), _MAX_OVERLAP_CHARS), 0, -1):
+            if first.endswith(second[:size]):
+                return first + second[size:]
+        return f"{first} {second}"
+
+    @staticmethod
+    def _similarity(a: Set[str], b: Set[str]) -> float:
+        """Share of the smaller term set found in the other; 1.0 when one chunk is contained in the other."""
+        if not a or not b:
+            return 0.0
+        return len(a & b) / min(len(a), len(b))
+
+    @staticmethod
+    def _source(chunk: Chunk) -> str:
+        metadata = chunk.metadata
+        source = str(metadata.get("file_name") or metadata.get("file_path") or chunk.chunk_id)
+        page = metadata.get("page_label")
+        return f"{source}, хуудас {page}" if page else source
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, Optional, Set
+
+from llama_index.core.base.llms.types import ChatMessage, MessageRole
+from llama_index.core.workflow import Context, JsonSerializer, Workflow
+
+from services.conversation_memory import CompactingChatMemory
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("ConversationContextStore")
+
+@dataclass
+class _Slot:
+    context: Context
+    last_used: float
+    size: int = 0
+    # Memory messages already counted in `size`; -1 until the context has been measured in full.
+    measured_messages: int = -1
+
+class ConversationContextStore:
+    """
+    Agent contexts keyed by Teams conversation (or user) ID.
+
+    Contexts are created lazily on the first message of a conversation. The least recently
+    used ones are evicted when the store exceeds `max_conversations` or `max_bytes`, or when
+    they have been idle for longer than `idle_ttl_seconds`. Evicted contexts are serialized to
+    `spill_dir` and restored from there when the conversation continues.
+
+    With a `memory_factory`, every context gets a CompactingChatMemory (contexts restored with
+    another memory are migrated). When a turn leaves the history over its token budget, the
+    history is summarized in the background under the conversation's lock, after the reply.
+    """
+
+    def __init__(
+            self,
+            workflow: Workflow,
+            spill_dir: str = "./conversations",
+            max_conversations: int = 256,
+            idle_ttl_seconds: float = 3600,
+            max_bytes: int = 64 * 1024 * 1024,
+            memory_factory: Optional[Callable[[], CompactingChatMemory]] = None
+        ):
+
+        self._workflow = workflow
+        self._spill_dir = spill_dir
+        self._max_conversations = max_conversations
+        self._idle_ttl_seconds = idle_ttl_seconds
+        self._max_bytes = max_bytes
+        self._memory_factory = memory_factory
+        self._serializer = JsonSerializer()
+
+        self._slots: "OrderedDict[str, _Slot]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._total_bytes = 0
+        self._compactions: Set[asyncio.Task] = set()
+
+    @asynccontextmanager
+    async def session(self, conversation_id: str) -> AsyncIterator[Context]:
+        """
+        Yields the conversation's context for one turn. Turns of the same conversation are
+        serialized; the context's footprint is measured and limits are enforced afterwards.
+        """
+        lock = self._locks.setdefault(conversation_id, asyncio.Lock())
+
+        async with lock:
+            slot = self._acquire(conversation_id)
+            memory = await self._memory(slot.context)
+            try:
+                yield slot.context
+            finally:
+                slot.last_used = time.monotonic()
+                self._resize(slot, await self._measure(slot))
+                self._enforce_limits(keep=conversation_id)
+                if memory is not None and memory.needs_compaction():
+                    task = asyncio.create_task(self._compact(conversation_id, slot.context, memory))
+                    self._compactions.add(task)
+                    task.add_done_callback(self._compactions.discard)
+
+    async def record(self, conversation_id: str, user_message: str, answer: str) -> None:
+        """Adds a turn answered without the agent to the conversation's memory, so later agent turns see it."""
+        async with self.session(conversation_id) as context:
+            memory = await context.store.get("memory", default=None)
+            if memory is not None:
+                await memory.aput_messages([
+                    ChatMessage(role=MessageRole.USER, content=user_message),
+                    ChatMessage(role=MessageRole.ASSISTANT, content=answer),
+                ])
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of resident conversations and their estimated size in bytes."""
+        return {"conversations": len(self._slots), "bytes": self._total_bytes}
+
+    async def _memory(self, context: Context) -> Optional[CompactingChatMemory]:
+        """Returns the context's compacting memory, installing one first if needed."""
+        if self._memory_factory is None:
+            return None
+
+        memory = await context.store.get("memory", default=None)
+        if isinstance(memory, CompactingChatMemory):
+            return memory
+
+        compacting = self._memory_factory()
+        if memory is not None:
+            compacting.set(await memory.aget_all())
+        await context.store.set("memory", compacting)
+        return compacting
+
+    async def _compact(self, conversation_id: str, context: Context, memory: CompactingChatMemory) -> None:
+        lock = self._locks.setdefault(conversation_id, asyncio.Lock())
+        async with lock:
+            slot = self._slots.get(conversation_id)
+            if slot is None or slot.context is not context:
+                # Evicted meanwhile; the restored context is compacted after its next turn.
+                return
+            if await memory.acompact():
+                self._resize(slot, await self._measure(slot))
+
+    def _acquire(self, conversation_id: str) -> _Slot:
+        slot = self._slots.get(conversation_id)
+
+        if slot is None:
+            slot = _Slot(context=self._restore(conversation_id), last_used=time.monotonic())
+            self._slots[conversation_id] = slot
+
+        self._slots.move_to_end(conversation_id)
+        return slot
+
+    def _restore(self, conversation_id: str) -> Context:
+        path = self._spill_path(conversation_id)
+
+        if not os.path.exists(path):
+            return Context(self._workflow)
+
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        os.remove(path)
+
+        logger.info(f"Restored conversation context {conversation_id} from disk.")
+        return Context.from_dict(self._workflow, data, serializer=self._serializer)
+
+    def _enforce_limits(self, keep: str) -> None:
+        now = time.monotonic()
+
+        # Oldest first; the conversation whose turn just ended is never evicted.
+        for conversation_id in list(self._slots):
+            over_limit = len(self._slots) > self._max_conversations or self._total_bytes > self._max_bytes
+            idle = now - self._slots[conversation_id].last_used > self._idle_ttl_seconds
+            if conversation_id != keep and (over_limit or idle):
+                self._evict(conversation_id)
+
+    def _evict(self, conversation_id: str) -> None:
+        lock = self._locks.get(conversation_id)
+        if lock is not None and lock.locked():
+            # A turn is in progress; it will be reconsidered when that turn ends.
+            return
+
+        slot = self._slots.pop(conversation_id)
+        self._total_bytes -= slot.size
+        self._locks.pop(conversation_id, None)
+
+        os.makedirs(self._spill_dir, exist_ok=True)
+        path = self._spill_path(conversation_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(slot.context.to_dict(serializer=self._serializer), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        logger.info(f"Evicted conversation context {conversation_id} to disk.")
+
+    async def _measure(self, slot: _Slot) -> int:
+        """
+        Estimated serialized size of the slot's context. The context is serialized in full when it
+        is first measured and when its history shrank (compaction); otherwise the messages added
+        since the last measurement are added to the previous size.
+        """
+        memory = await slot.context.store.get("memory", default=None)
+        history = memory.get_all() if memory is not None else None
+
+        if history is None or slot.measured_messages < 0 or len(history) < slot.measured_messages:
+            size = len(json.dumps(slot.context.to_dict(serializer=self._serializer), ensure_ascii=False))
+        else:
+            size = slot.size + sum(
+                len(json.dumps(message.model_dump(mode="json"), ensure_ascii=False))
+                for message in history[slot.measured_messages:]
+            )
+
+        slot.measured_messages = len(history) if history is not None else -1
+        return size
+
+    def _resize(self, slot: _Slot, size: int) -> None:
+        self._total_bytes += size - slot.size
+        slot.size = size
+
+    def _spill_path(self, conversation_id: str) -> str:
+        name = hashlib.sha256(conversation_id.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self._spill_dir, f"{name}.json")
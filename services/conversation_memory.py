@@ -0,0 +1,148 @@
+import logging
+from typing import Any, List, Optional
+
+from llama_index.core.base.llms.types import ChatMessage, MessageRole
+from llama_index.core.bridge.pydantic import Field, SerializeAsAny, field_serializer
+from llama_index.core.llms.llm import LLM
+from llama_index.core.memory import ChatMemoryBuffer
+from llama_index.core.storage.chat_store import BaseChatStore
+
+from infrastructure.model_gateway import gateway
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("CompactingChatMemory")
+
+SUMMARY_PROMPT = (
+    "You maintain the memory of a conversation between an employee and an HR assistant. "
+    "Update the summary with the new messages. Keep the employee's email, the questions they asked, "
+    "the facts and figures they were given (with the regulation they came from), timesheet entries "
+    "and submission IDs, and any open requests. Drop greetings and repetition. Write in the language "
+    "of the conversation, in at most {max_tokens} tokens."
+)
+
+class CompactingChatMemory(ChatMemoryBuffer):
+    """
+    Agent chat history held to a token budget.
+
+    Tool outputs are stored cut to `tool_output_chars`: the agent reads them in full during the
+    turn that called the tool (they reach memory only when the turn ends), so later turns only
+    need to know the call happened. Once the history exceeds `token_limit`, `acompact()` folds
+    everything but the most recent `recent_token_ratio` of the budget into a running summary,
+    which `get()` returns as a system message ahead of the kept turns. Until then, or if
+    summarizing fails, `get()` drops the oldest messages, so the prompt never exceeds the budget.
+    """
+
+    recent_token_ratio: float = 0.5
+    tool_output_chars: int = 300
+    summary: str = ""
+    summary_token_limit: int = 400
+    summary_model: str = "gpt-4o-mini"
+    # Overrides `summary_model`; not serialized, so a restored memory summarizes through the gateway.
+    summary_llm: Optional[SerializeAsAny[LLM]] = Field(default=None, exclude=True)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CompactingChatMemory"
+
+    # Named after the base class's serializer of `chat_store`, which it replaces: pydantic matches
+    # inherited serializers by method name and rejects a second one for the same field.
+    @field_serializer("chat_store")
+    def serialize_courses_in_order(self, chat_store: BaseChatStore) -> dict:
+        return self.serialize_chat_store(chat_store)
+
+    def serialize_chat_store(self, chat_store: BaseChatStore) -> dict:
+        # Dumped message by message: SimpleChatStore's own serializer fails under newer pydantic
+        # releases, and the workflow then silently drops the memory between runs.
+        return {
+            "store": {key: [message.model_dump(mode="json") for message in chat_store.get_messages(key)] for key in chat_store.get_keys()},
+            "class_name": chat_store.class_name(),
+        }
+
+    def get(self, input: Optional[str] = None, initial_token_count: int = 0, **kwargs: Any) -> List[ChatMessage]:
+        if not self.summary:
+            return super().get(input=input, initial_token_count=initial_token_count, **kwargs)
+
+        summary = ChatMessage(role=MessageRole.SYSTEM, content=f"Summary of the earlier conversation:\n{self.summary}")
+        summary_tokens = self._token_count_for_messages([summary])
+        return [summary, *super().get(input=input, initial_token_count=initial_token_count + summary_tokens, **kwargs)]
+
+    def put(self, message: ChatMessage) -> None:
+        super().put(self._collapse(message))
+
+    async def aput(self, message: ChatMessage) -> None:
+        await super().aput(self._collapse(message))
+
+    def set(self, messages: List[ChatMessage]) -> None:
+        super().set([self._collapse(message) for message in messages])
+
+    async def aset(self, messages: List[ChatMessage]) -> None:
+        await super().aset([self._collapse(message) for message in messages])
+
+    def needs_compaction(self) -> bool:
+        return self._token_count_for_messages(self.get_all()) > self.token_limit
+
+    async def acompact(self) -> bool:
+        """Summarizes the turns that no longer fit the recent part of the budget. Returns True if the history was compacted."""
+        history = self.get_all()
+        split = self._recent_start(history)
+        if split == 0:
+            return False
+
+        try:
+            self.summary = await self._summarize(history[:split])
+        except Exception as e:
+            logger.warning(f"Conversation summary failed, keeping the full history: {e}")
+            return False
+
+        self.set(history[split:])
+        logger.info(f"Compacted {split} messages into a {len(self.tokenizer_fn(self.summary))}-token summary.")
+        return True
+
+    def _recent_start(self, history: List[ChatMessage]) -> int:
+        """Index of the first user message from which the history fits the recent part of the budget."""
+        budget = self.token_limit * self.recent_token_ratio
+        start = len(history)
+        tokens = 0
+        for index in range(len(history) - 1, -1, -1):
+            tokens += len(self.tokenizer_fn(str(history[index].content or "")))
+            if tokens > budget:
+                break
+            if history[index].role == MessageRole.USER:
+                start = index
+
+        if start == len(history):
+            # The last turn alone is over the recent budget; keep it whole and summarize the rest.
+            start = next((index for index in range(len(history) - 1, -1, -1) if history[index].role == MessageRole.USER), 0)
+        return start
+
+    async def _summarize(self, messages: List[ChatMessage]) -> str:
+        transcript = "\n".join(
+            f"{message.role.value}: {message.content}" for message in messages if message.content
+        )
+        previous = f"Current summary:\n{self.summary}\n\n" if self.summary else ""
+        llm = self.summary_llm or gateway.llm(self.summary_model, temperature=0)
+        response = await llm.achat([
+            ChatMessage(role=MessageRole.SYSTEM, content=SUMMARY_PROMPT.format(max_tokens=self.summary_token_limit)),
+            ChatMessage(role=MessageRole.USER, content=f"{previous}New messages:\n{transcript}"),
+        ])
+
+        summary = (response.message.content or "").strip()
+        tokens = len(self.tokenizer_fn(summary))
+        if tokens > self.summary_token_limit:
+            # The budget must hold whatever the model returns.
+            summary = summary[:len(summary) * self.summary_token_limit // tokens]
+        return summary
+
+    def _collapse(self, message: ChatMessage) -> ChatMessage:
+        if message.role != MessageRole.TOOL:
+            return message
+
+        content = message.content or ""
+        if len(content) <= self.tool_output_chars:
+            return message
+
+        return ChatMessage(
+            role=MessageRole.TOOL,
+            content=f"{content[:self.tool_output_chars]} … [{len(content) - self.tool_output_chars} more characters of this earlier tool output omitted]",
+            additional_kwargs=message.additional_kwargs
+        )
@@ -1,8 +1,13 @@
 from infrastructure.interfaces import IDocumentService, IKnowledgeBase
-from domain.entities import MCSDocumentChunk
-from typing import List
+from domain.entities import MCSDocumentChunk, IngestionBatch
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
+import os
+import json
+import asyncio
+import hashlib
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from llama_index.readers.file import PDFReader
 from llama_index.core import SimpleDirectoryReader
 from llama_index.core.node_parser import SentenceSplitter
@@ -13,7 +18,11 @@ logger = logging.getLogger("DocumentService")
 class DocumentService(IDocumentService):
     """Service layer for document loading and ingestion."""
 
-    def __init__(self, allowed_extensions: List[str] = [".pdf"]):
+    def __init__(
+            self,
+            allowed_extensions: List[str] = [".pdf"],
+            manifest_path: str = "./ingestion_manifest.json"
+        ):
 
         self._allowed_extensions = allowed_extensions
 
@@ -21,38 +30,263 @@ class DocumentService(IDocumentService):
             ".pdf": PDFReader(return_full_document=True)
         }
         self._encoding = "utf-8"
+        self._chunk_size = 512
+        self._chunk_overlap = 20
         self._parser = SentenceSplitter(
-            chunk_size=512,
-            chunk_overlap=20
+            chunk_size=self._chunk_size,
+            chunk_overlap=self._chunk_overlap
         )
 
+        # Manifest maps each ingested file path to its content hash and the chunk IDs produced from it.
+        self._manifest_path = manifest_path
+        self._manifest: Dict[str, Dict] = self._read_manifest()
+        self._pending_manifest: Dict[str, Dict] | None = None
+
     async def ingest_documents(self, directory_path: str) -> List[MCSDocumentChunk]:
         """Ingest documents from the specified directory and return document chunks."""
 
+        file_paths = self._list_files(directory_path)
+        file_hashes = {path: self._hash_file(path) for path in file_paths}
+
+        return await asyncio.to_thread(self._load_chunks, file_hashes) if file_hashes else []
+
+    def stream_documents(
+            self,
+            directory_path: str,
+            batch_size: int = 64,
+            max_workers: int | None = None,
+            max_pending_files: int | None = None
+        ) -> AsyncIterator[List[MCSDocumentChunk]]:
+        """
+        Parse and split documents in a process pool and yield chunk batches as files complete.
+
+        At most `max_pending_files` files are parsed or waiting to be consumed at any time, so
+        memory stays bounded when the consumer (e.g. `KnowledgeService.insert_stream`) is slower
+        than parsing. Batches follow file completion order, not directory order.
+
+        :param batch_size: Maximum number of chunks per yielded batch.
+        :param max_workers: Number of parsing processes, defaults to the CPU count.
+        :param max_pending_files: Files submitted but not yet consumed, defaults to twice the workers.
+        """
+        return self._stream_files(self._list_files(directory_path), batch_size, max_workers, max_pending_files)
+
+    def stream_changed_documents(
+            self,
+            batch: IngestionBatch,
+            batch_size: int = 64,
+            max_workers: int | None = None,
+            max_pending_files: int | None = None
+        ) -> AsyncIterator[List[MCSDocumentChunk]]:
+        """
+        Stream the chunks of the changed files of a batch from `ingest_changed_documents(parse=False)`,
+        like `stream_documents`. The chunk IDs of each parsed file are recorded in the pending
+        manifest; call `commit_manifest()` once the stream has been inserted.
+        """
+        return self._stream_files(batch.changed_files, batch_size, max_workers, max_pending_files, record=True)
+
+    async def _stream_files(
+            self,
+            file_paths: List[str],
+            batch_size: int,
+            max_workers: int | None,
+            max_pending_files: int | None,
+            record: bool = False
+        ) -> AsyncIterator[List[MCSDocumentChunk]]:
+        max_workers = max_workers or os.cpu_count() or 1
+        max_pending_files = max_pending_files or 2 * max_workers
+
+        loop = asyncio.get_running_loop()
+        remaining = iter(file_paths)
+        batch: List[MCSDocumentChunk] = []
+
+        pool = ProcessPoolExecutor(max_workers=max_workers)
+        pending = set()
+
+        def submit_next() -> bool:
+            path = next(remaining, None)
+            if path is None:
+                return False
+            pending.add(loop.run_in_executor(
+                pool, _parse_file, path, self._encoding, self._chunk_size, self._chunk_overlap
+            ))
+            return True
+
+        try:
+            while len(pending) < max_pending_files and submit_next():
+                pass
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                for future in done:
+                    path, file_hash, parsed = future.result()
+                    logger.info(f"Parsed {len(parsed)} nodes from {path}.")
+                    if record:
+                        self._pending_manifest[path]["chunk_ids"] = [_chunk_id(path, file_hash, offset) for offset in range(len(parsed))]
+
+                    for offset, (content, metadata) in enumerate(parsed):
+                        batch.append(MCSDocumentChunk(
+                            chunk_id=_chunk_id(path, file_hash, offset),
+                            content=content,
+                            metadata={**metadata, "file_path": path},
+                            embedding=None
+                        ))
+                        if len(batch) >= batch_size:
+                            yield batch
+                            batch = []
+
+                    # Refill only after the file's chunks were handed over, which is the backpressure point.
+                    submit_next()
+
+            if batch:
+                yield batch
+        finally:
+            for future in pending:
+                future.cancel()
+            # Not waited for: exiting a `with` block would block the event loop on parses still running
+            # when the consumer stops early.
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def ingest_changed_documents(self, directory_path: str, parse: bool = True) -> IngestionBatch:
+        """
+        Compare the directory against the ingestion manifest and parse only new or changed files.
+
+        The returned batch holds the chunks to insert and the chunk IDs of changed or removed files
+        to delete. Call `commit_manifest()` once the batch has been applied to the knowledge base.
+        With `parse=False` the batch has no chunks; stream them with `stream_changed_documents`.
+        """
+        file_paths = self._list_files(directory_path)
+        file_hashes = {path: self._hash_file(path) for path in file_paths}
+
+        changed = {
+            path: file_hash for path, file_hash in file_hashes.items()
+            if self._manifest.get(path, {}).get("hash") != file_hash
+        }
+        removed = [path for path in self._manifest if path not in file_hashes]
+
+        deleted_chunk_ids = [
+            chunk_id
+            for path in [*removed, *changed]
+            for chunk_id in self._manifest.get(path, {}).get("chunk_ids", [])
+        ]
+
+        chunks = await asyncio.to_thread(self._load_chunks, changed) if changed and parse else []
+
+        pending = {path: entry for path, entry in self._manifest.items() if path in file_hashes and path not in changed}
+        for path, file_hash in changed.items():
+            pending[path] = {"hash": file_hash, "chunk_ids": []}
+        for chunk in chunks:
+            pending[chunk.metadata["file_path"]]["chunk_ids"].append(chunk.chunk_id)
+        self._pending_manifest = pending
+
+        logger.info(
+            f"Incremental ingestion: {len(changed)} new or changed, {len(removed)} removed, "
+            f"{len(file_hashes) - len(changed)} unchanged files."
+        )
+
+        return IngestionBatch(
+            chunks=chunks,
+            deleted_chunk_ids=deleted_chunk_ids,
+            changed_files=list(changed),
+            removed_files=removed
+        )
+
+    def commit_manifest(self) -> None:
+        """Persist the manifest computed by the last `ingest_changed_documents` call."""
+        if self._pending_manifest is None:
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(self._manifest_path)), exist_ok=True)
+        tmp_path = f"{self._manifest_path}.tmp"
+        with open(tmp_path, "w", encoding=self._encoding) as f:
+            json.dump(self._pending_manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._manifest_path)
+
+        self._manifest = self._pending_manifest
+        self._pending_manifest = None
+        logger.info(f"Ingestion manifest saved to {self._manifest_path}.")
+
+    def _load_chunks(self, file_hashes: Dict[str, str]) -> List[MCSDocumentChunk]:
+        """Parses and splits the given files into chunks with IDs derived from file path, file hash and chunk offset."""
+
         reader = SimpleDirectoryReader(
-            directory_path, 
-            required_exts=self._allowed_extensions, 
-            file_extractor=self._file_extractor, 
+            input_files=list(file_hashes),
+            file_extractor=self._file_extractor,
             encoding=self._encoding
         )
 
         documents = reader.load_data(show_progress=True)
-        
+
         nodes = self._parser.get_nodes_from_documents(
-            documents=documents, 
+            documents=documents,
             show_progress=True
         )
 
-        logger.info(f"Extracted {len(nodes)} nodes from documents. Type of a node: {type(nodes[0])}")
+        logger.info(f"Extracted {len(nodes)} nodes from {len(file_hashes)} documents.")
+
+        hashes_by_path = {os.path.abspath(path): (path, file_hash) for path, file_hash in file_hashes.items()}
+        offsets: Dict[str, int] = {}
 
         chunks = []
-        for i, node in enumerate(nodes):
+        for node in nodes:
+            path, file_hash = hashes_by_path[os.path.abspath(node.metadata["file_path"])]
+            offset = offsets.get(path, 0)
+            offsets[path] = offset + 1
+
             chunk = MCSDocumentChunk(
-                chunk_id=f"{node.id_}_chunk_{i+1}",
+                chunk_id=_chunk_id(path, file_hash, offset),
                 content=node.get_content(),
-                metadata=node.metadata,
+                metadata={**node.metadata, "file_path": path},
                 embedding=None
             )
             chunks.append(chunk)
-        
-        return chunks
\ No newline at end of file
+
+        return chunks
+
+    def _list_files(self, directory_path: str) -> List[str]:
+        return sorted(
+            os.path.join(directory_path, name)
+            for name in os.listdir(directory_path)
+            if not name.startswith(".")
+            and os.path.splitext(name)[1].lower() in self._allowed_extensions
+            and os.path.isfile(os.path.join(directory_path, name))
+        )
+
+    def _hash_file(self, path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _read_manifest(self) -> Dict[str, Dict]:
+        if not os.path.exists(self._manifest_path):
+            return {}
+        with open(self._manifest_path, encoding=self._encoding) as f:
+            return json.load(f)
+
+
+def _chunk_id(path: str, file_hash: str, offset: int) -> str:
+    """Chunk ID of the `offset`-th chunk of a file; identical files at different paths get different IDs."""
+    file_key = hashlib.sha256(f"{os.path.normpath(path)}\0{file_hash}".encode("utf-8")).hexdigest()[:16]
+    return f"{file_key}_chunk_{offset}"
+
+def _parse_file(path: str, encoding: str, chunk_size: int, chunk_overlap: int) -> Tuple[str, str, List[Tuple[str, Dict[str, Any]]]]:
+    """Hashes, parses and splits a single file. Runs in a worker process of `stream_documents`."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+    documents = SimpleDirectoryReader(
+        input_files=[path],
+        file_extractor={".pdf": PDFReader(return_full_document=True)},
+        encoding=encoding
+    ).load_data()
+
+    nodes = SentenceSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    ).get_nodes_from_documents(documents)
+
+    return path, digest.hexdigest(), [(node.get_content(), node.metadata) for node in nodes]
@@ -0,0 +1,202 @@
+import re
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from llama_index.core import Settings
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+from infrastructure.telemetry import registry, span
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("IntentRouter")
+
+WORKING_HOURS = "working_hours"
+POLICY = "policy"
+AGENT = "agent"
+
+INTENT_ROUTES = registry.counter(
+    "hr_helpdesk_intent_routes_total",
+    "Messages by route chosen by the local intent router: working_hours, policy or agent.",
+    ["route"]
+)
+
+# Phrases that decide an intent on their own terms; matched as lower-cased substrings.
+KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    WORKING_HOURS: (
+        "ажилласан цаг", "цалингийн цаг", "илүү цаг", "үлдсэн цаг", "ажиллах ёстой цаг", "хэдэн цаг ажилласан",
+        "working hours", "hours worked", "overtime",
+    ),
+    POLICY: (
+        "журам", "дүрэм", "бодлого", "тушаал", "амралт", "чөлөө", "тэтгэмж", "урамшуулал", "томилолт", "хөлс",
+        "нөхөн олговор", "hr-", "policy", "procedure", "regulation",
+    ),
+}
+
+# A working-hours question asks about the sender's own hours; without one of these (matched as
+# lower-cased words) it asks how hours are counted or paid, which the regulations answer.
+PERSONAL_MARKERS = frozenset((
+    "миний", "минийх", "надад", "намайг", "надаас", "би", "бид", "my", "i", "i've", "me",
+))
+_WORD_PATTERN = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+# Requests the fast path cannot serve: timesheet submissions and follow-ups that need the conversation.
+AGENT_KEYWORDS: Tuple[str, ...] = (
+    "бүртг", "илгээ", "оруул", "submit", "дээрх", "өмнөх", "тодруул", "үүн", "тэр ", "above", "previous",
+)
+
+EXAMPLES: Dict[str, Tuple[str, ...]] = {
+    WORKING_HOURS: (
+        "Миний энэ сарын ажилласан цаг хэд вэ?",
+        "Миний цалингийн цаг хэд болсон бэ?",
+        "Би энэ хугацаанд хэдэн цаг ажилласан бэ?",
+        "Надад илүү цаг хэд байна?",
+        "Надад хэдэн цаг ажиллах үлдсэн бэ?",
+        "Би энэ хоёр долоо хоногт хэдэн цаг ажиллах ёстой вэ?",
+        "How many hours have I worked this period?",
+        "What is my overtime so far?",
+    ),
+    POLICY: (
+        "Ээлжийн амралтын цалинг хэрхэн тооцдог вэ?",
+        "Өвчтэй үед чөлөө хэрхэн авах вэ?",
+        "Цалинтай чөлөө хэдэн хоног авч болох вэ?",
+        "Гэрээс ажиллах журам ямар вэ?",
+        "Сонгон шалгаруулалтын үе шатууд юу вэ?",
+        "Ажилтан ээлжийн амралтаа хэсэгчлэн эдэлж болох уу?",
+        "Томилолтын зардлыг яаж нөхөж олгодог вэ?",
+        "Ажлаас гарахад ямар бичиг баримт бүрдүүлэх вэ?",
+        "What does the leave policy say about sick days?",
+        "Илүү цагаар ажилласны хөлсийг хэрхэн тооцдог вэ?",
+        "Амралтын өдөр ажилласан цагийг хэрхэн нөхөн олгодог вэ?",
+        "How is overtime pay calculated?",
+    ),
+    AGENT: (
+        "Өчигдөр 4 цаг өвчтэй байсныг цаг бүртгэлд оруулаад өгөөч",
+        "Өнөөдөр 2 цаг хоцорсоноо бүртгүүлмээр байна",
+        "Миний илгээсэн цаг бүртгэл ERP-д орсон уу?",
+        "Сайн байна уу",
+        "Баярлалаа",
+        "Дээрх хариултаа тодруулаад өгөөч",
+        "Тэгвэл энэ нь надад хамаатай юу?",
+        "Submit a timesheet entry for yesterday, 8 hours working from home",
+    ),
+}
+
+@dataclass
+class Route:
+    intent: str
+    score: float
+    reason: str
+
+class IntentRouter:
+    """
+    Local classifier that decides whether a message can skip the agent's planning call.
+
+    Keyword rules come first: submission and follow-up phrases always go to the agent, and a
+    message without a personal marker is never a working-hours lookup, so its hours keywords
+    count as policy ones. The message is then embedded and compared with example questions of each intent (embedded once
+    and kept). A route other than AGENT is taken when the rules and the nearest example agree
+    with similarity of at least `agreement_threshold`, or, without a rule match, when the nearest
+    example reaches `threshold` and beats the other intents by `margin`. Everything else,
+    including embedding failures, goes to the agent.
+    """
+
+    def __init__(
+            self,
+            embed_model: Optional[BaseEmbedding] = None,
+            examples: Dict[str, Sequence[str]] = EXAMPLES,
+            threshold: float = 0.75,
+            agreement_threshold: float = 0.5,
+            margin: float = 0.05
+        ):
+
+        self._embed_model = embed_model
+        self._examples = examples
+        self._threshold = threshold
+        self._agreement_threshold = agreement_threshold
+        self._margin = margin
+
+        # Unit-length example vectors and the intent of each row, built on first use.
+        self._matrix: Optional[np.ndarray] = None
+        self._labels: List[str] = []
+        self._lock = asyncio.Lock()
+
+        self.routes: Dict[str, int] = {WORKING_HOURS: 0, POLICY: 0, AGENT: 0}
+
+    async def route(self, question: str) -> Route:
+        with span("router.classify"):
+            route = await self._classify(question)
+        self.routes[route.intent] += 1
+        INTENT_ROUTES.inc(route=route.intent)
+        logger.info(f"Routed to {route.intent} ({route.reason}, similarity {route.score:.2f}).")
+        return route
+
+    async def _classify(self, question: str) -> Route:
+        text = f" {question.lower()} "
+        if any(keyword in text for keyword in AGENT_KEYWORDS):
+            return Route(AGENT, 0.0, "agent keyword")
+
+        personal = not PERSONAL_MARKERS.isdisjoint(_WORD_PATTERN.findall(text))
+        keyword_intents = {intent for intent, keywords in KEYWORDS.items() if any(keyword in text for keyword in keywords)}
+        if not personal and WORKING_HOURS in keyword_intents:
+            # "Илүү цагийн хөлсийг яаж тооцдог вэ?" asks about the rule, not the employee's hours.
+            keyword_intents = (keyword_intents - {WORKING_HOURS}) | {POLICY}
+        if len(keyword_intents) > 1:
+            return Route(AGENT, 0.0, "keywords of several intents")
+
+        try:
+            scores = await self._scores(question)
+        except Exception as e:
+            logger.warning(f"Intent embedding failed, deferring to the agent: {e}")
+            return Route(AGENT, 0.0, "embedding failed")
+
+        if not personal:
+            scores.pop(WORKING_HOURS, None)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        (nearest, score), runner_up = ranked[0], ranked[1][1] if len(ranked) > 1 else -1.0
+
+        if keyword_intents:
+            keyword_intent = next(iter(keyword_intents))
+            if nearest == keyword_intent and score >= self._agreement_threshold:
+                return Route(keyword_intent, score, "keyword and nearest example agree")
+            return Route(AGENT, score, "keyword and nearest example disagree")
+
+        if nearest == AGENT:
+            return Route(AGENT, score, "nearest example is for the agent")
+        if score >= self._threshold and score - runner_up >= self._margin:
+            return Route(nearest, score, "nearest example")
+        return Route(AGENT, score, "not confident")
+
+    async def _scores(self, question: str) -> Dict[str, float]:
+        """Highest cosine similarity of the question to the examples of each intent."""
+        matrix = await self._example_matrix()
+        query = np.asarray(await self._model().aget_query_embedding(question), dtype=np.float32)
+        similarities = matrix @ (query / max(float(np.linalg.norm(query)), 1e-12))
+
+        scores: Dict[str, float] = {}
+        for label, similarity in zip(self._labels, similarities.tolist()):
+            scores[label] = max(scores.get(label, -1.0), similarity)
+        return scores
+
+    async def _example_matrix(self) -> np.ndarray:
+        if self._matrix is not None:
+            return self._matrix
+
+        async with self._lock:
+            if self._matrix is None:
+                labels = [intent for intent, texts in self._examples.items() for _ in texts]
+                texts = [text for examples in self._examples.values() for text in examples]
+                # Embedded as queries, like the messages they are compared with.
+                vectors = np.asarray(
+                    await asyncio.gather(*(self._model().aget_query_embedding(text) for text in texts)),
+                    dtype=np.float32
+                )
+                self._labels = labels
+                self._matrix = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+                logger.info(f"Embedded {len(texts)} intent examples.")
+        return self._matrix
+
+    def _model(self) -> BaseEmbedding:
+        return self._embed_model or Settings.embed_model
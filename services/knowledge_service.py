@@ -1,40 +1,146 @@
+import time
 import logging
-from typing import List
+from typing import AsyncIterable, Dict, List, Set, Tuple
 
 from infrastructure.interfaces import IKnowledgeBase, IKnowledgeService
-from domain.entities import QueryResult, MCSDocumentChunk
+from domain.entities import QueryResult, MCSDocumentChunk, ChunkFilter
 
 from infrastructure.adapters.llamaindex_adapter import LlamaIndexKnowledgeBase
+from infrastructure.adapters.lexical_index import tokenize
+from services.semantic_cache import SemanticCache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("KnowledgeService")
 
+# Shortest stem compared by prefix when matching question words to document title words.
+_MIN_PREFIX = 4
+
 class KnowledgeService(IKnowledgeService):
     """Service layer for knowledge base operations."""
 
-    def __init__(self, knowledge_base: IKnowledgeBase | None = None):
+    def __init__(
+            self,
+            knowledge_base: IKnowledgeBase | None = None,
+            semantic_cache: SemanticCache | None = None
+        ):
         
         if knowledge_base is None:
             knowledge_base = LlamaIndexKnowledgeBase()
 
         self._kb = knowledge_base
+        self._semantic_cache = semantic_cache
+        # Follows the persisted state, which is re-read on every query and version lookup, so
+        # cached retrievals and answers are dropped when another process (e.g. the ingestion
+        # script) persists into the same storage. This process's index is not reloaded for that.
+        self._persisted_version = knowledge_base.state_version()
+        self._version = self._persisted_version
+        # (version, code -> title terms that occur in no other document's title)
+        self._title_terms: Tuple[int, Dict[str, Set[str]]] | None = None
+
+    @property
+    def version(self) -> int:
+        """The knowledge base version; changes whenever ingested chunks are persisted, by any process."""
+        self._sync_version()
+        return self._version
+
+    async def query(self, question: str, top_k: int = 2, filters: ChunkFilter | None = None) -> QueryResult:
+        """
+        Handles a query to the knowledge base. Queries the knowledge base answers locally skip the
+        semantic cache, whose lookup would embed the question; the rest are served from it when a
+        similar question with the same filters was retrieved before.
+        """
+        local = await self._kb.query_local(question, top_k=top_k, filters=filters)
+        if local is not None:
+            return local
 
-    async def query(self, question: str, top_k: int = 2) -> QueryResult:
-        """Handles a query to the knowledge base."""
+        scope = filters.model_dump_json() if filters is not None else None
+
+        if self._semantic_cache is not None:
+            self._sync_version()
+            cached = await self._semantic_cache.lookup(question, self._version, top_k=top_k, scope=scope)
+            if cached is not None and cached.retrieval is not None:
+                return cached.retrieval
         
         query_result = await self._kb.query(
             question, 
-            top_k=top_k
+            top_k=top_k,
+            filters=filters
         )
 
+        if self._semantic_cache is not None:
+            await self._semantic_cache.store(question, self._version, top_k=top_k, retrieval=query_result, scope=scope)
+
         return query_result
+
+    def infer_filters(self, question: str, document_code: str | None = None) -> ChunkFilter:
+        """
+        Restricts a question to the current versions of the HR documents and, when it is clearly
+        about one of them, to that document: the given `document_code` or a code the question
+        mentions if the knowledge base has it, else the one document whose distinctive title
+        words the question uses most. Ties and unknown codes leave the document open.
+        """
+        catalogue = self._kb.document_catalogue()
+        terms = set(tokenize(question))
+
+        codes = [code for code in catalogue if code.lower() in terms]
+        if document_code and document_code.strip().upper() in catalogue:
+            codes = [document_code.strip().upper()]
+
+        if not codes:
+            matches = {
+                code: sum(1 for title_term in title_terms if any(self._same_word(term, title_term) for term in terms))
+                for code, title_terms in self._distinctive_title_terms(catalogue).items()
+            }
+            best = max(matches.values(), default=0)
+            if best > 0 and list(matches.values()).count(best) == 1:
+                codes = [code for code, count in matches.items() if count == best]
+
+        if codes:
+            logger.info(f"Restricting '{question}' to documents {codes}.")
+        return ChunkFilter(document_codes=codes, latest_only=True)
+
+    def _distinctive_title_terms(self, catalogue: Dict[str, str]) -> Dict[str, Set[str]]:
+        if self._title_terms is None or self._title_terms[0] != self._version:
+            terms = {code: set(tokenize(title)) for code, title in catalogue.items()}
+            counts: Dict[str, int] = {}
+            for title_terms in terms.values():
+                for term in title_terms:
+                    counts[term] = counts.get(term, 0) + 1
+            self._title_terms = (self._version, {
+                code: {term for term in title_terms if counts[term] == 1} for code, title_terms in terms.items()
+            })
+        return self._title_terms[1]
+
+    @staticmethod
+    def _same_word(a: str, b: str) -> bool:
+        """Equal, or one a prefix of the other, which absorbs suffixes the stemmer does not strip."""
+        if a == b:
+            return True
+        return min(len(a), len(b)) >= _MIN_PREFIX and (a.startswith(b) or b.startswith(a))
     
+    def _sync_version(self) -> None:
+        """Picks up state persisted by another process since the last check."""
+        if self._kb.state_version() != self._persisted_version:
+            self._refresh_version()
+            if self._semantic_cache is not None:
+                self._semantic_cache.invalidate()
+
+    def _refresh_version(self) -> None:
+        version = self._kb.state_version()
+        self._persisted_version = version
+        # A store that reports no persisted state (or the same one) still gets a new version.
+        self._version = version if version != self._version else self._version + 1
+
     async def insert(self, chunks: List[MCSDocumentChunk]) -> bool:
         """Inserts document chunks into the knowledge base and persists the state."""
         try:
             await self._kb.insert(chunks)
             await self._kb.persist()
 
+            self._refresh_version()
+            if self._semantic_cache is not None:
+                self._semantic_cache.invalidate()
+
             return True
         
         except Exception as e:
@@ -42,4 +148,60 @@ class KnowledgeService(IKnowledgeService):
             logger.setLevel(logging.ERROR)
             logger.error(f"Error inserting chunks: {e}")
             
+            return False
+
+    async def insert_stream(self, batches: AsyncIterable[List[MCSDocumentChunk]]) -> bool:
+        """
+        Inserts chunk batches as they are produced and persists once at the end.
+        Pulling the next batch only after the previous one is inserted keeps the producer bounded.
+        If a batch fails, the chunks inserted so far are removed again, so the knowledge base
+        matches its persisted state and the stream can be retried without duplicating chunks.
+        """
+        inserted: List[str] = []
+        started = time.perf_counter()
+
+        try:
+            async for batch in batches:
+                await self._kb.insert(batch)
+                inserted.extend(chunk.chunk_id for chunk in batch)
+                logger.info(f"Inserted {len(inserted)} chunks so far ({time.perf_counter() - started:.1f}s).")
+
+            await self._kb.persist()
+
+            self._refresh_version()
+            if self._semantic_cache is not None:
+                self._semantic_cache.invalidate()
+
+            return True
+
+        except Exception as e:
+
+            logger.setLevel(logging.ERROR)
+            logger.error(f"Error inserting chunk stream after {len(inserted)} chunks: {e}")
+
+            if inserted:
+                try:
+                    await self._kb.delete(inserted)
+                except Exception as rollback_error:
+                    logger.error(f"Error removing the partially inserted chunks: {rollback_error}")
+
+            return False
+
+    async def delete(self, chunk_ids: List[str]) -> bool:
+        """Deletes document chunks from the knowledge base and persists the state."""
+        try:
+            await self._kb.delete(chunk_ids)
+            await self._kb.persist()
+
+            self._refresh_version()
+            if self._semantic_cache is not None:
+                self._semantic_cache.invalidate()
+
+            return True
+
+        except Exception as e:
+
+            logger.setLevel(logging.ERROR)
+            logger.error(f"Error deleting chunks: {e}")
+
             return False
\ No newline at end of file
@@ -1,15 +1,23 @@
 from typing import List
 from domain.entities import MCSDocumentChunk, QueryResult
 from infrastructure.interfaces import ILLMService, IKnowledgeBase
+from services.context_assembler import ContextAssembler
 from llama_index.core.prompts import RichPromptTemplate
-from llama_index.llms.openai import OpenAI
+from llama_index.core.llms import LLM
+from infrastructure.model_gateway import gateway
 
 class LLMService(ILLMService):
     """
     Service layer for synthesizing responses via LLM based on provided context and prompts configured.
     """
 
-    def __init__(self, prompt_template: str | None = None) -> None:
+    def __init__(
+            self,
+            prompt_template: str | None = None,
+            llm: LLM | None = None,
+            context_assembler: ContextAssembler | None = None
+        ) -> None:
+
         if prompt_template is None:
             
             prompt_template = """
@@ -24,22 +32,19 @@ Always respond in Mongolian language while making your reasoning in English.
 """
 
         self._prompt_template = prompt_template
-        self._llm = OpenAI(
-            model="chatgpt-4o-latest",
-            temperature=0.2
-        )
+        self._context_assembler = context_assembler or ContextAssembler()
+        self._llm = llm or gateway.llm("chatgpt-4o-latest", temperature=0.2)
     
     async def synthesize_response(self, user_question: str, context: List[MCSDocumentChunk]) -> str:
         """
         Generate a response from the LLM based on the given context.
 
-        :param context: List of MCSDocumentChunk providing context for the response.
+        :param context: List of MCSDocumentChunk providing context for the response; it is deduplicated and packed to the assembler's token budget.
         :return: Generated response as a string.
         """
         prompt = RichPromptTemplate(self._prompt_template)
         
-        context_texts = [chunk.content for chunk in context]
-        combined_context = "\n".join(context_texts)
+        combined_context = self._context_assembler.assemble(user_question, context).text
 
         filled_prompt = prompt.format_messages(
             question=user_question,
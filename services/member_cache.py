@@ -0,0 +1,111 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, TypeVar
+
+from infrastructure.telemetry import CACHE_REQUESTS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("MemberProfileCache")
+
+T = TypeVar("T")
+
+@dataclass
+class _Entry(Generic[T]):
+    value: T
+    expires: float
+
+class MemberProfileCache(Generic[T]):
+    """
+    Size-bounded LRU of Teams member profiles keyed by AAD object (or Teams user) ID.
+
+    Concurrent lookups for the same user share one in-flight fetch. Profiles older than
+    `ttl_seconds` are refetched, but kept until evicted so that a failed refetch can still
+    serve them. After a failure the user is not retried for `retry_after_seconds`.
+    """
+
+    def __init__(
+            self,
+            ttl_seconds: float = 3600,
+            max_size: int = 4096,
+            retry_after_seconds: float = 30
+        ):
+
+        self._ttl_seconds = ttl_seconds
+        self._max_size = max_size
+        self._retry_after_seconds = retry_after_seconds
+
+        self._entries: "OrderedDict[str, _Entry[T]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._failed_at: "OrderedDict[str, float]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[T]]) -> Optional[T]:
+        """
+        Returns the cached profile, or awaits `fetch()` (shared with concurrent callers) when it
+        is missing or expired. If the fetch fails, returns the expired profile or None.
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+
+        if entry is not None and entry.expires > now:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache="member", result="hit")
+            return entry.value
+
+        self.misses += 1
+        CACHE_REQUESTS.inc(cache="member", result="miss")
+
+        failed_at = self._failed_at.get(key)
+        if failed_at is not None and now - failed_at < self._retry_after_seconds:
+            return entry.value if entry is not None else None
+
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(key, fetch))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        try:
+            # Shielded so that one cancelled turn does not cancel the fetch other turns wait on.
+            return await asyncio.shield(future)
+        except Exception as e:
+            logger.warning(f"Member lookup for {key} failed ({e}); {'serving expired profile' if entry else 'no profile available'}.")
+            return entry.value if entry is not None else None
+
+    def invalidate(self, key: str) -> None:
+        self._entries.pop(key, None)
+        self._failed_at.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and the number of cached profiles."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+            "in_flight": len(self._in_flight),
+        }
+
+    async def _fetch(self, key: str, fetch: Callable[[], Awaitable[T]]) -> T:
+        try:
+            value = await fetch()
+        except Exception:
+            self._failed_at[key] = time.monotonic()
+            self._failed_at.move_to_end(key)
+            while len(self._failed_at) > self._max_size:
+                self._failed_at.popitem(last=False)
+            raise
+
+        self._failed_at.pop(key, None)
+        self._entries[key] = _Entry(value=value, expires=time.monotonic() + self._ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+        return value
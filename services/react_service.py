@@ -1,30 +1,143 @@
+import os
+import asyncio
 import logging
+import threading
+from typing import List
 
 import pandas as pd
-from llama_index.llms.openai import OpenAI
+from dotenv import load_dotenv
+from llama_index.core import Settings
 from llama_index.core.agent.workflow import FunctionAgent
-from llama_index.core.workflow import Context
 from services.knowledge_service import KnowledgeService
+from infrastructure.adapters.knowledge_base_factory import knowledge_base_from_env
+from services.semantic_cache import SemanticCache
+from services.context_store import ConversationContextStore
+from services.context_assembler import ContextAssembler
+from services.conversation_memory import CompactingChatMemory
+from domain.entities import ChunkFilter, MCSDocumentChunk
+from infrastructure.adapters.timesheet_repository import CsvTimesheetRepository, expected_hours, load_rosters, payroll_period, STRATEGY_ROSTER, STRATEGY_WEEKLY
+from infrastructure.adapters.submission_log import SubmissionLog
+from infrastructure.adapters.file_timesheet_sink import FileTimesheetSink
+from services.timesheet_queue import TimesheetSubmissionQueue
+from infrastructure.telemetry import instrument_llama_index, span
+from infrastructure.adapters.embedding_cache import CachedEmbedding
+from infrastructure.model_gateway import gateway
 
-knowledge_service = KnowledgeService(None)
+load_dotenv()
+instrument_llama_index()
+
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+
+context_assembler = ContextAssembler(
+    token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000")),
+    rerank=os.getenv("CONTEXT_RERANK", "false").lower() == "true"
+)
+
+# The knowledge service loads the whole index and builds the embedding client, so it is
+# created on first use (or by warmup()) rather than at import time.
+_knowledge_service: KnowledgeService | None = None
+_knowledge_service_lock = threading.Lock()
+_ready = threading.Event()
+
+def _build_knowledge_service() -> KnowledgeService:
+    global _knowledge_service
+
+    with _knowledge_service_lock:
+        if _knowledge_service is None:
+            _knowledge_service = KnowledgeService(
+                knowledge_base_from_env(),
+                semantic_cache=SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD, max_size=SEMANTIC_CACHE_SIZE, name="retrieval")
+            )
+    return _knowledge_service
+
+async def get_knowledge_service() -> KnowledgeService:
+    """Returns the knowledge service, loading it in a worker thread on first use."""
+    if _knowledge_service is not None:
+        return _knowledge_service
+    return await asyncio.to_thread(_build_knowledge_service)
+
+def set_knowledge_service(knowledge_service: KnowledgeService) -> None:
+    """Replaces the knowledge service used by the agent tools, e.g. with one over a local index."""
+    global _knowledge_service
+
+    with _knowledge_service_lock:
+        _knowledge_service = knowledge_service
+
+# Final agent answers are only reused when explicitly enabled, since a cached answer skips the conversation context.
+answer_cache = (
+    SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD, max_size=SEMANTIC_CACHE_SIZE, name="answer")
+    if os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+    else None
+)
+
+timesheet_repository = CsvTimesheetRepository(
+    os.getenv("TIMESHEET_CSV_PATH", "docs/employee_timesheet.csv"),
+    cache_path=os.getenv("TIMESHEET_CACHE_PATH") or None
+)
+
+# Payroll periods of PAYROLL_PERIOD_DAYS days counted from PAYROLL_PERIOD_ANCHOR; roster employees are listed in ROSTER_CSV_PATH.
+PAYROLL_PERIOD_ANCHOR = pd.Timestamp(os.getenv("PAYROLL_PERIOD_ANCHOR", "2026-01-01")).date()
+PAYROLL_PERIOD_DAYS = int(os.getenv("PAYROLL_PERIOD_DAYS", "14"))
+rosters = load_rosters(os.environ["ROSTER_CSV_PATH"]) if os.getenv("ROSTER_CSV_PATH") else {}
+
+# Timesheet entries are logged to TIMESHEET_WAL_PATH and delivered to the ERP in the background;
+# until the ERP integration is available they are booked in TIMESHEET_SINK_PATH.
+timesheet_queue = TimesheetSubmissionQueue(
+    SubmissionLog(os.getenv("TIMESHEET_WAL_PATH", "./timesheet_submissions.wal")),
+    FileTimesheetSink(os.getenv("TIMESHEET_SINK_PATH", "./erp_outbox.jsonl")),
+    batch_size=int(os.getenv("TIMESHEET_BATCH_SIZE", "100")),
+    flush_interval_seconds=float(os.getenv("TIMESHEET_FLUSH_INTERVAL_SECONDS", "0.5")),
+    max_attempts=int(os.getenv("TIMESHEET_MAX_ATTEMPTS", "8"))
+)
+
+# Passed to the agent in place of the email when the sender's profile cannot be looked up.
+UNKNOWN_EMAIL = "тодорхойгүй"
+# Returned by the employee-specific tools instead of acting on an unknown or made-up email.
+EMAIL_UNAVAILABLE = ("Ажилтны email хаягийг Teams-ээс тодорхойлж чадсангүй тул энэ үйлдлийг хийх боломжгүй. "
+                     "Ажилтанд түр хүлээгээд дахин оролдох эсвэл HR-тай холбогдохыг зөвлө.")
+
+def _is_known_email(employee_email: str | None) -> bool:
+    email = (employee_email or "").strip()
+    return email != UNKNOWN_EMAIL and "@" in email
+
+# Mongolian labels for submission statuses shown to employees.
+_SUBMISSION_STATUS_LABELS = {
+    "queued": "ERP рүү илгээгдэхээр хүлээгдэж байна",
+    "sent": "ERP системд бүртгэгдсэн",
+    "rejected": "ERP систем татгалзсан",
+    "failed": "ERP рүү илгээж чадсангүй",
+}
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def ask_knowledge_base(query: str) -> str:
+async def retrieve_policy_chunks(query: str, document_code: str | None = None) -> List[MCSDocumentChunk]:
+    """Retrieves chunks of the current HR regulations, narrowed to the document the query names or clearly refers to."""
+    knowledge_service = await get_knowledge_service()
+    filters = knowledge_service.infer_filters(query, document_code=document_code)
+    res = await knowledge_service.query(query, top_k=10, filters=filters)
+    if not res.chunks and filters.document_codes:
+        # A wrongly inferred document should not leave the agent without context.
+        res = await knowledge_service.query(query, top_k=10, filters=ChunkFilter(latest_only=True))
+    return res.chunks
+
+async def ask_knowledge_base(query: str, document_code: str | None = None) -> str:
     """
     This function queries the knowledge base with the given query and returns a synthesized response. If employee asks anything related to workplace policies, procedures, benefits, payroll or organizational regulations, this function must be invoked to get the accurate information from the knowledge base.      
     
     Args:
         query (str): The query must be interpreted to get relevant information from the knowledge base, rather than simply copy-pasting the employee query.
+        document_code (str, optional): The HR regulation code (e.g. "HR-0506R") if the employee names or clearly refers to one regulation. Leave empty otherwise; only the current version of the documents is searched either way.
 
     Returns:
-        str: Chunks retrieved from the knowledge base as a result of the employee query.
+        str: Chunks retrieved from the knowledge base as a result of the employee query, each passage labelled with its citation and source document.
     """
-    res = await knowledge_service.query(query, top_k=10)
-    content = [chunk.content for chunk in res.chunks]
+    with span("tool.ask_knowledge_base"):
+        chunks = await retrieve_policy_chunks(query, document_code=document_code)
+        context = context_assembler.assemble(query, chunks)
 
-    return "\n\n".join(content)
+    return context.text
 
 def calculate_employee_working_hours(employee_email: str) -> str:
     """
@@ -34,31 +147,42 @@ def calculate_employee_working_hours(employee_email: str) -> str:
         employee_email (str): The email of the employee.
 
     Returns:
-        str: A message indicating the total working hours of the employee so far against the expected hours, the remaining hours as well as the calculation strategy (normal 40 hrs/week or roster) in the current time window.
+        str: A message indicating the total working hours of the employee so far against the expected hours, the overtime and remaining hours as well as the calculation strategy (normal 40 hrs/week or roster) in the current time window.
     """
 
-    # Read docs/employee_timesheet.csv to get working hours data
-    df = pd.read_csv("docs/employee_timesheet.csv")
+    if not _is_known_email(employee_email):
+        return EMAIL_UNAVAILABLE
+
     print(f"Calculating working hours for {employee_email}...")
-    # Get total_working_hours and total_salary_hours columns between the current day and January 1, 2026 for the given employee_email
-    expected_hours_per_month = 160
-    employee_data = df[(df['employee_email'] == employee_email) & 
-                       (pd.to_datetime(df['clock_in']) >= pd.to_datetime("2026-01-01 00:00:00"))]
-    total_salary_hours = employee_data['total_salary_hours'].sum()
-    remaining_hours = expected_hours_per_month - total_salary_hours
-    calculation_strategy = "normal 40 hrs/week"
-
-    response = (f"""Ажилчны ID: {employee_email}\n"
-            f"Нийт цалингийн цаг: {total_salary_hours} hrs\n"
-            f"Нийт ажиллах ёстой цаг: {expected_hours_per_month} hrs\n"
-            f"Үлдсэн цаг: {remaining_hours} hrs\n"
-            f"Тооцооллын стратеги: {calculation_strategy}""")
+    start, end = payroll_period(pd.Timestamp.now(), PAYROLL_PERIOD_ANCHOR, PAYROLL_PERIOD_DAYS)
+    with span("tool.calculate_employee_working_hours"):
+        # Built for every employee at once and cached for the period, so each call is a lookup.
+        report = timesheet_repository.working_hours_report(start, end, rosters=rosters)
+
+    if employee_email in report.index:
+        row = report.loc[employee_email]
+        salary_hours, expected, overtime, remaining, strategy = (
+            row["salary_hours"], row["expected_hours"], row["overtime_hours"], row["remaining_hours"], row["strategy"]
+        )
+    else:
+        roster = rosters.get(employee_email)
+        salary_hours, overtime = 0.0, 0.0
+        expected = remaining = expected_hours(start, end, roster)
+        strategy = STRATEGY_ROSTER if roster else STRATEGY_WEEKLY
+
+    response = (f"Ажилчны ID: {employee_email}\n"
+                f"Хугацаа: {start:%Y-%m-%d} - {end - pd.Timedelta(days=1):%Y-%m-%d}\n"
+                f"Нийт цалингийн цаг: {salary_hours:.2f} hrs\n"
+                f"Нийт ажиллах ёстой цаг: {expected:.2f} hrs\n"
+                f"Илүү цаг: {overtime:.2f} hrs\n"
+                f"Үлдсэн цаг: {remaining:.2f} hrs\n"
+                f"Тооцооллын стратеги: {strategy}")
     
     print(f"Calculated working hours for {employee_email}: {response}")
     return response
 
 
-def submit_timesheet(employee_email: str, timestamp: str, hours: float, absence_type: str) -> str:
+async def submit_timesheet(employee_email: str, timestamp: str, hours: float, absence_type: str) -> str:
     """
     Invoke this function if the employee wants to submit a timesheet entry for their absence or working hours. If they request you to submit a timesheet entry, but didn't provide all necessary details, you must inquire the timesheet entry details this function requires such as timestamp, hours and the reason for absence/work.
     
@@ -69,21 +193,59 @@ def submit_timesheet(employee_email: str, timestamp: str, hours: float, absence_
         absence_type (str): categorize the type of absence into one of the following list: "өвчтэй", "амралтаа авсан", "тасалсан", "хоцорсон", "гэрээс ажилласан" and "гадуур ажилласан".
 
     Returns:
-        str: A message indicating the successful submission of the timesheet entry.
+        str: A message with the submission ID of the timesheet entry, which is queued and delivered to the ERP system in the background.
     """
-    # Here you would implement the logic to submit the timesheet entry to your database or system.
-    # For demonstration purposes, we'll just return a success message.
-    response = (f"Ажилтан {employee_email}-ний хүсэлтийн дагуу ERP систем рүү дараах цаг бүртгэлийн хүсэлтийг илгээсэн:\n"
-                f"Хэзээ: {timestamp}\n"
-                f"Хэдэн цаг: {hours}\n"
-                f"Ажил дээр байгаагүй шалтгаан: {absence_type}")
+    if not _is_known_email(employee_email):
+        return EMAIL_UNAVAILABLE
+
+    with span("tool.submit_timesheet"):
+        submission = await timesheet_queue.submit(employee_email, timestamp, hours, absence_type)
+
+    response = (f"Ажилтан {employee_email}-ний хүсэлтийн дагуу ERP систем рүү дараах цаг бүртгэлийн хүсэлтийг илгээхээр бүртгэлээ:\n"
+                f"Хүсэлтийн дугаар: {submission.submission_id}\n"
+                f"Хэзээ: {submission.timestamp}\n"
+                f"Хэдэн цаг: {submission.hours}\n"
+                f"Ажил дээр байгаагүй шалтгаан: {submission.absence_type}\n"
+                f"Төлөв: {_SUBMISSION_STATUS_LABELS[submission.status]}")
     
     print(f"Ажилтан {employee_email} дээр цаг бүртгэл илгээлээ: {response}")
     return response
 
+def get_timesheet_submission_status(employee_email: str, submission_id: str | None = None) -> str:
+    """
+    Invoke this function if the employee asks whether their submitted timesheet entries reached the ERP system, or asks about the status of a timesheet submission.
+
+    Args:
+        employee_email (str): The email of the employee.
+        submission_id (str, optional): The submission ID of one timesheet entry, if the employee gives it. Leave empty to list their recent submissions.
+
+    Returns:
+        str: The status of the employee's timesheet submissions, newest first.
+    """
+    if not _is_known_email(employee_email):
+        return EMAIL_UNAVAILABLE
+
+    if submission_id:
+        submission = timesheet_queue.status(submission_id.strip())
+        submissions = [submission] if submission is not None and submission.employee_email.lower() == employee_email.lower() else []
+    else:
+        submissions = timesheet_queue.submissions_for(employee_email)
+
+    if not submissions:
+        return f"Ажилтан {employee_email}-ний цаг бүртгэлийн хүсэлт олдсонгүй."
+
+    lines = []
+    for submission in submissions:
+        line = (f"- {submission.submission_id}: {submission.timestamp}, {submission.hours} цаг, {submission.absence_type} — "
+                f"{_SUBMISSION_STATUS_LABELS[submission.status]}")
+        if submission.status in ("rejected", "failed") and submission.error:
+            line += f" ({submission.error})"
+        lines.append(line)
+    return f"Ажилтан {employee_email}-ний цаг бүртгэлийн хүсэлтүүд:\n" + "\n".join(lines)
+
 workflow = FunctionAgent(
-    tools=[calculate_employee_working_hours, ask_knowledge_base],
-    llm=OpenAI(model="gpt-4o-mini", temperature=0.1),
+    tools=[calculate_employee_working_hours, ask_knowledge_base, submit_timesheet, get_timesheet_submission_status],
+    llm=gateway.llm("gpt-4o-mini", temperature=0.1),
     system_prompt="""
 You are an assistant that helps employees with their queries regarding company policies, procedures, and personal work-related information. Employee queries are usually asked in Mongolian language.
 
@@ -95,10 +257,46 @@ For example, if an employee asks about their working hours or implies it in thei
 
 If the employee asks anything related to workplace policies, procedures, benefits, payroll or organizational regulations, you must call the 'ask_knowledge_base' function with their interpreted query to get the accurate information from the knowledge base. When querying the knowledge base, ensure that you interpret the employee's query to extract the intent rather than simply copy-pasting the employee query. If you respond according to the knowledge base citations, make sure to include their brief references in your final answer, such as according to [Citation 1], [Citation 2], etc.
 
-If the employee requests to submit a timesheet entry for their absence or working hours, you must ask for the necessary details such as timestamp, hours, and absence type. Once you have all the required information, you should inform the employee that their timesheet entry has been submitted successfully. However, you do not need to implement the actual submission logic; just confirm the submission in your response.
+If the employee email is "тодорхойгүй", it could not be looked up: do not call 'calculate_employee_working_hours', 'submit_timesheet' or 'get_timesheet_submission_status', and never guess an email. Tell the employee their working hours and timesheet entries are unavailable right now; policy questions can still be answered.
+
+If the employee requests to submit a timesheet entry for their absence or working hours, you must ask for the necessary details such as timestamp, hours, and absence type. Once you have all the required information, you must call the 'submit_timesheet' function and tell the employee that their entry was accepted and will be delivered to the ERP system, including its submission ID. If the employee asks whether their timesheet entries went through, you must call the 'get_timesheet_submission_status' function.
 
 Try to format your final response in a clear and structured manner, using bullet points or numbered lists where appropriate to enhance readability.
 """
 )
 
-ctx = Context(workflow)
\ No newline at end of file
+context_store = ConversationContextStore(
+    workflow,
+    spill_dir=os.getenv("CONVERSATION_SPILL_DIR", "./conversations"),
+    max_conversations=int(os.getenv("CONVERSATION_MAX_RESIDENT", "256")),
+    idle_ttl_seconds=float(os.getenv("CONVERSATION_IDLE_TTL_SECONDS", "3600")),
+    memory_factory=lambda: CompactingChatMemory(
+        token_limit=int(os.getenv("CONVERSATION_TOKEN_LIMIT", "3000")),
+        tool_output_chars=int(os.getenv("CONVERSATION_TOOL_OUTPUT_CHARS", "300"))
+    )
+)
+
+def is_ready() -> bool:
+    """True once warmup() has loaded the knowledge base and the timesheet."""
+    return _ready.is_set()
+
+async def warmup(preconnect: bool = True) -> None:
+    """
+    Loads the knowledge base index and the timesheet in worker threads and, optionally,
+    opens the embedding client's connection with one query embedding.
+    """
+    await get_knowledge_service()
+    await asyncio.to_thread(timesheet_repository.frame)
+
+    if preconnect:
+        embed_model = Settings.embed_model
+        if isinstance(embed_model, CachedEmbedding):
+            # A cached "warmup" vector, e.g. from a persisted cache, would answer without opening a connection.
+            embed_model = embed_model.embed_model
+        try:
+            await embed_model.aget_query_embedding("warmup")
+        except Exception as e:
+            logger.warning(f"Embedding client pre-connect failed: {e}")
+
+    _ready.set()
+    logger.info("Warmup finished; service is ready.")
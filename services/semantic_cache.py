@@ -0,0 +1,159 @@
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+from llama_index.core import Settings
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+from domain.entities import QueryResult
+from infrastructure.telemetry import CACHE_REQUESTS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("SemanticCache")
+
+@dataclass
+class SemanticCacheEntry:
+    """A cached question together with its retrieval result and/or final answer."""
+    question: str
+    vector: np.ndarray
+    top_k: Optional[int] = None
+    scope: Optional[str] = None
+    retrieval: Optional[QueryResult] = None
+    answer: Optional[str] = None
+
+class SemanticCache:
+    """
+    Size-bounded cache of retrieval results and answers looked up by question similarity.
+
+    A lookup hits when the cosine similarity between the new question and a cached one is
+    at least `threshold` and the entry was stored against the current knowledge base version.
+    Seeing a new version drops every entry stored against the previous one.
+    """
+
+    def __init__(
+            self,
+            embed_model: BaseEmbedding | None = None,
+            threshold: float = 0.95,
+            max_size: int = 512,
+            name: str = "semantic"
+        ):
+
+        self._embed_model = embed_model
+        self._threshold = threshold
+        self._max_size = max_size
+        # Label of this cache's hit and miss counters in the metrics endpoint.
+        self._name = name
+        self._entries: "OrderedDict[int, SemanticCacheEntry]" = OrderedDict()
+        self._next_id = 0
+        self._version: Optional[int] = None
+
+        # Stacked entry vectors, rebuilt lazily after the entries change.
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_ids: list[int] = []
+
+        self.hits = 0
+        self.misses = 0
+
+    async def lookup(
+            self,
+            question: str,
+            version: int,
+            top_k: Optional[int] = None,
+            require_answer: bool = False,
+            scope: Optional[str] = None
+        ) -> Optional[SemanticCacheEntry]:
+        """Returns the most similar cached entry above the threshold, stored with the same top_k and scope, or None."""
+        self._sync_version(version)
+
+        if not self._entries:
+            self.misses += 1
+            CACHE_REQUESTS.inc(cache=self._name, result="miss")
+            return None
+
+        vector = await self._embed(question)
+        matrix = self._stacked()
+        scores = matrix @ vector
+
+        for position in np.argsort(-scores):
+            if scores[position] < self._threshold:
+                break
+            entry_id = self._matrix_ids[position]
+            entry = self._entries[entry_id]
+            if top_k is not None and entry.top_k != top_k:
+                continue
+            if entry.scope != scope:
+                continue
+            if require_answer and entry.answer is None:
+                continue
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache=self._name, result="hit")
+            logger.info(f"Semantic cache hit for '{question}' (similarity {scores[position]:.3f} to '{entry.question}').")
+            return entry
+
+        self.misses += 1
+        CACHE_REQUESTS.inc(cache=self._name, result="miss")
+        return None
+
+    async def store(
+            self,
+            question: str,
+            version: int,
+            top_k: Optional[int] = None,
+            retrieval: Optional[QueryResult] = None,
+            answer: Optional[str] = None,
+            scope: Optional[str] = None
+        ) -> None:
+        """Caches a retrieval result and/or an answer for the question."""
+        self._sync_version(version)
+        vector = await self._embed(question)
+
+        self._entries[self._next_id] = SemanticCacheEntry(
+            question=question,
+            vector=vector,
+            top_k=top_k,
+            scope=scope,
+            retrieval=retrieval,
+            answer=answer
+        )
+        self._next_id += 1
+
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+        self._matrix = None
+
+    def invalidate(self) -> None:
+        """Drops every cached entry, e.g. after the knowledge base was re-ingested."""
+        self._entries.clear()
+        self._matrix = None
+        logger.info("Semantic cache invalidated.")
+
+    def stats(self) -> Dict[str, float]:
+        """Returns hit/miss counters and the current size."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries)
+        }
+
+    async def _embed(self, question: str) -> np.ndarray:
+        embed_model = self._embed_model or Settings.embed_model
+        vector = np.asarray(await embed_model.aget_query_embedding(question), dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _stacked(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix_ids = list(self._entries.keys())
+            self._matrix = np.stack([self._entries[i].vector for i in self._matrix_ids])
+        return self._matrix
+
+    def _sync_version(self, version: int) -> None:
+        if version != self._version:
+            if self._entries:
+                self.invalidate()
+            self._version = version
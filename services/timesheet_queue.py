@@ -0,0 +1,239 @@
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from domain.entities import TimesheetSubmission
+from infrastructure.interfaces import ITimesheetSink
+from infrastructure.adapters.submission_log import SubmissionLog
+from infrastructure.telemetry import registry, span
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("TimesheetSubmissionQueue")
+
+QUEUED = "queued"
+SENT = "sent"
+REJECTED = "rejected"
+FAILED = "failed"
+
+SUBMISSIONS = registry.counter(
+    "hr_helpdesk_timesheet_submissions_total",
+    "Timesheet submissions by outcome: queued, duplicate (already queued or sent), retried, sent, rejected or failed.",
+    ["status"]
+)
+PENDING = registry.gauge("hr_helpdesk_timesheet_pending", "Timesheet submissions logged but not yet accepted or rejected by the ERP.")
+BATCH_SECONDS = registry.histogram("hr_helpdesk_timesheet_batch_seconds", "Duration of ERP batch deliveries.")
+
+def idempotency_key(employee_email: str, timestamp: str, hours: float, absence_type: str) -> str:
+    """Identifies a timesheet entry to the ERP; the same entry submitted twice gets the same key."""
+    entry = f"{employee_email.strip().lower()}|{timestamp.strip()}|{float(hours):g}|{absence_type.strip()}"
+    return hashlib.sha256(entry.encode("utf-8")).hexdigest()[:32]
+
+class TimesheetSubmissionQueue:
+    """
+    Write-behind queue between the submit_timesheet tool and the ERP.
+
+    `submit()` returns as soon as the entry is in the write-ahead log, so a turn never waits on
+    the ERP. A background flusher delivers due entries in batches of up to `batch_size`,
+    lingering `flush_interval_seconds` to fill a batch, and logs each outcome. A batch that
+    fails is retried with exponential backoff up to `max_attempts` times; the idempotency key
+    lets the ERP acknowledge entries it already booked. On restart the log is replayed and
+    entries that were still queued are delivered again.
+    """
+
+    def __init__(
+            self,
+            log: SubmissionLog,
+            sink: ITimesheetSink,
+            batch_size: int = 100,
+            flush_interval_seconds: float = 0.5,
+            max_attempts: int = 8,
+            backoff_seconds: float = 1.0,
+            max_backoff_seconds: float = 300,
+            retention_days: int = 30,
+            compact_min_records: int = 10000
+        ):
+
+        self._log = log
+        self._sink = sink
+        self._batch_size = batch_size
+        self._flush_interval_seconds = flush_interval_seconds
+        self._max_attempts = max_attempts
+        self._backoff_seconds = backoff_seconds
+        self._max_backoff_seconds = max_backoff_seconds
+        self._retention = timedelta(days=retention_days)
+        self._compact_min_records = compact_min_records
+
+        self._submissions: Dict[str, TimesheetSubmission] = log.replay()
+        self._by_key: Dict[str, str] = {
+            submission.idempotency_key: submission.submission_id for submission in self._submissions.values()
+        }
+        # Submission ID -> monotonic time of its next delivery attempt, for queued entries only.
+        self._due: Dict[str, float] = {
+            submission.submission_id: 0.0 for submission in self._submissions.values() if submission.status == QUEUED
+        }
+        PENDING.set(len(self._due))
+
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def start(self) -> None:
+        self._closing = False
+        self._ensure_started()
+        logger.info(f"Timesheet queue started with {len(self._due)} pending submissions.")
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Gives submissions that are due `timeout` seconds to be delivered, then stops the flusher; the rest stay logged."""
+        self._closing = True
+        self._wakeup.set()
+        deadline = time.monotonic() + timeout
+        while self._task is not None and self._ready() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._log.close()
+        logger.info(f"Timesheet queue stopped with {len(self._due)} pending submissions.")
+
+    async def submit(self, employee_email: str, timestamp: str, hours: float, absence_type: str) -> TimesheetSubmission:
+        """
+        Durably queues a timesheet entry and returns its submission. An entry that is already
+        queued or sent is not queued again; its existing submission is returned instead.
+        """
+        key = idempotency_key(employee_email, timestamp, hours, absence_type)
+        existing = self._submissions.get(self._by_key.get(key, ""))
+        if existing is not None and existing.status in (QUEUED, SENT):
+            SUBMISSIONS.inc(status="duplicate")
+            return existing
+
+        submission = TimesheetSubmission(
+            submission_id=uuid.uuid4().hex[:12],
+            idempotency_key=key,
+            employee_email=employee_email,
+            timestamp=timestamp,
+            hours=hours,
+            absence_type=absence_type
+        )
+        await self._log.append([submission])
+
+        self._submissions[submission.submission_id] = submission
+        self._by_key[key] = submission.submission_id
+        self._due[submission.submission_id] = 0.0
+        PENDING.set(len(self._due))
+        SUBMISSIONS.inc(status=QUEUED)
+
+        self._ensure_started()
+        self._wakeup.set()
+        return submission
+
+    def status(self, submission_id: str) -> Optional[TimesheetSubmission]:
+        return self._submissions.get(submission_id)
+
+    def submissions_for(self, employee_email: str, limit: int = 5) -> List[TimesheetSubmission]:
+        """Returns the employee's most recent submissions, newest first."""
+        email = employee_email.strip().lower()
+        matches = []
+        for submission in reversed(self._submissions.values()):
+            if submission.employee_email.strip().lower() == email:
+                matches.append(submission)
+                if len(matches) == limit:
+                    break
+        return matches
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _ready(self) -> List[str]:
+        now = time.monotonic()
+        return [submission_id for submission_id, due in self._due.items() if due <= now]
+
+    async def _run(self) -> None:
+        while True:
+            due = min(self._due.values(), default=None)
+            timeout = None if due is None else max(due - time.monotonic(), 0.0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            if not self._closing and len(self._ready()) < self._batch_size:
+                # Linger so that entries submitted close together are delivered as one batch.
+                await asyncio.sleep(self._flush_interval_seconds)
+
+            try:
+                while ready := self._ready():
+                    await self._flush([self._submissions[submission_id] for submission_id in ready[:self._batch_size]])
+                    await self._maybe_compact()
+            except Exception as e:
+                # The outcome could not be logged; the entries stay due and are delivered again.
+                logger.error(f"Timesheet flush failed: {e}")
+                await asyncio.sleep(self._backoff_seconds)
+
+    async def _flush(self, batch: List[TimesheetSubmission]) -> None:
+        started = time.monotonic()
+        try:
+            with span("timesheet.deliver"):
+                rejected = await self._sink.submit(batch)
+        except Exception as e:
+            logger.warning(f"ERP delivery of {len(batch)} timesheet submissions failed: {e}")
+            outcomes = [self._retry(submission, str(e)) for submission in batch]
+        else:
+            outcomes = []
+            for submission in batch:
+                reason = rejected.get(submission.idempotency_key)
+                outcomes.append((self._settle(submission, REJECTED if reason else SENT, reason), None))
+        BATCH_SECONDS.observe(time.monotonic() - started)
+
+        # Applied only once logged: if the append fails, the entries keep their state and stay due.
+        await self._log.append([submission for submission, _ in outcomes])
+        for submission, due in outcomes:
+            self._submissions[submission.submission_id] = submission
+            if due is None:
+                self._due.pop(submission.submission_id, None)
+            else:
+                self._due[submission.submission_id] = due
+            SUBMISSIONS.inc(status="retried" if due is not None else submission.status)
+        PENDING.set(len(self._due))
+
+    def _retry(self, submission: TimesheetSubmission, error: str) -> Tuple[TimesheetSubmission, Optional[float]]:
+        """The submission after a failed delivery and when it is due again; None once it has failed for good."""
+        attempts = submission.attempts + 1
+        if attempts >= self._max_attempts:
+            logger.error(f"Timesheet submission {submission.submission_id} failed after {attempts} attempts: {error}")
+            return self._settle(submission, FAILED, error), None
+
+        backoff = min(self._backoff_seconds * 2 ** (attempts - 1), self._max_backoff_seconds)
+        updated = submission.model_copy(update={"attempts": attempts, "error": error, "updated_at": datetime.now()})
+        return updated, time.monotonic() + backoff
+
+    def _settle(self, submission: TimesheetSubmission, status: str, error: Optional[str]) -> TimesheetSubmission:
+        return submission.model_copy(update={
+            "status": status,
+            "attempts": submission.attempts + 1,
+            "error": error,
+            "updated_at": datetime.now()
+        })
+
+    async def _maybe_compact(self) -> None:
+        if self._log.records < max(self._compact_min_records, 2 * len(self._submissions)):
+            return
+
+        cutoff = datetime.now() - self._retention
+        expired = [
+            submission for submission in self._submissions.values()
+            if submission.status != QUEUED and submission.updated_at < cutoff
+        ]
+        for submission in expired:
+            del self._submissions[submission.submission_id]
+            if self._by_key.get(submission.idempotency_key) == submission.submission_id:
+                del self._by_key[submission.idempotency_key]
+
+        await self._log.compact(lambda: list(self._submissions.values()))
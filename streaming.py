@@ -0,0 +1,142 @@
+import time
+import asyncio
+import logging
+from typing import Optional
+
+from botbuilder.core import TurnContext
+from botbuilder.schema import Activity, ActivityTypes
+from llama_index.core.agent.workflow import AgentStream, ToolCall, ToolCallResult
+from llama_index.core.workflow import Event
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("TeamsResponseStreamer")
+
+STREAMING_MODES = ("update", "chunked", "off")
+
+class TeamsResponseStreamer:
+    """
+    Relays an agent run's event stream to a Teams conversation.
+
+    In "update" mode the first tokens are posted as a message that is then edited in place
+    at most every `update_interval` seconds. In "chunked" mode every completed paragraph of
+    at least `min_chunk_chars` characters is sent as its own message. In "off" mode only the
+    final answer is sent. A typing indicator is repeated while tools run or nothing is visible yet.
+    """
+
+    def __init__(
+            self,
+            turn_context: TurnContext,
+            mode: str = "update",
+            update_interval: float = 1.0,
+            typing_interval: float = 3.0,
+            min_chunk_chars: int = 400
+        ):
+
+        if mode not in STREAMING_MODES:
+            raise ValueError(f"Unknown streaming mode '{mode}', expected one of {STREAMING_MODES}.")
+
+        self._turn_context = turn_context
+        self._mode = mode
+        self._update_interval = update_interval
+        self._typing_interval = typing_interval
+        self._min_chunk_chars = min_chunk_chars
+
+        # Text of the current LLM step; reset when the step turns out to be a tool call.
+        self._buffer = ""
+        # Number of characters of the buffer already visible to the employee.
+        self._sent_chars = 0
+        self._activity_id: Optional[str] = None
+        # Starts the clock so a step's first tokens wait one interval, long enough to see a tool call.
+        self._last_update = time.monotonic()
+        self._tools_in_flight = 0
+        self._typing_task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "TeamsResponseStreamer":
+        self._typing_task = asyncio.create_task(self._keep_typing())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._typing_task is not None:
+            self._typing_task.cancel()
+            try:
+                await self._typing_task
+            except asyncio.CancelledError:
+                pass
+
+    async def on_event(self, event: Event) -> None:
+        """Consumes one event from `handler.stream_events()`."""
+        if isinstance(event, ToolCall):
+            # Any text streamed in this step was planning, not the answer.
+            self._tools_in_flight += 1
+            if self._sent_chars == 0:
+                self._buffer = ""
+                self._last_update = time.monotonic()
+        elif isinstance(event, ToolCallResult):
+            self._tools_in_flight = max(0, self._tools_in_flight - 1)
+        elif isinstance(event, AgentStream) and event.delta:
+            self._buffer += event.delta
+            await self._flush(final=False)
+
+    async def finish(self, text: str) -> None:
+        """Makes sure the complete final answer is visible."""
+        visible = self._buffer[:self._sent_chars]
+        self._buffer = text
+        # The streamed text can differ from the final answer, e.g. when an earlier step was shown;
+        # then the whole answer is sent rather than a tail cut at the old offset.
+        self._sent_chars = len(visible) if text.startswith(visible) else 0
+        await self._flush(final=True)
+
+    async def _flush(self, final: bool) -> None:
+        if self._mode == "update":
+            await self._flush_update(final)
+        elif self._mode == "chunked":
+            await self._flush_chunked(final)
+        elif final:
+            await self._send(self._buffer)
+
+    async def _flush_update(self, final: bool) -> None:
+        now = time.monotonic()
+        if not final and now - self._last_update < self._update_interval:
+            return
+        if self._sent_chars == len(self._buffer) and self._activity_id is not None:
+            return
+
+        if self._activity_id is None:
+            response = await self._send(self._buffer)
+            self._activity_id = response.id if response is not None else None
+        else:
+            activity = Activity(id=self._activity_id, type=ActivityTypes.message, text=self._buffer)
+            await self._turn_context.update_activity(activity)
+
+        self._sent_chars = len(self._buffer)
+        self._last_update = now
+
+    async def _flush_chunked(self, final: bool) -> None:
+        pending = self._buffer[self._sent_chars:]
+
+        if final:
+            if pending.strip():
+                await self._send(pending)
+            self._sent_chars = len(self._buffer)
+            return
+
+        boundary = pending.rfind("\n\n")
+        if boundary < self._min_chunk_chars:
+            return
+
+        await self._send(pending[:boundary])
+        self._sent_chars += boundary + 2
+
+    async def _send(self, text: str):
+        return await self._turn_context.send_activity(
+            Activity(type=ActivityTypes.message, text=text)
+        )
+
+    async def _keep_typing(self) -> None:
+        while True:
+            await asyncio.sleep(self._typing_interval)
+            if self._tools_in_flight > 0 or self._sent_chars == 0:
+                try:
+                    await self._turn_context.send_activity(Activity(type=ActivityTypes.typing))
+                except Exception as e:
+                    logger.warning(f"Could not send typing indicator: {e}")
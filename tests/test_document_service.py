@@ -2,24 +2,35 @@ import asyncio
 import logging
 
 from services.document_service import DocumentService
-from infrastructure.adapters.llamaindex_adapter import LlamaIndexKnowledgeBase
+from services.knowledge_service import KnowledgeService
+from infrastructure.adapters.knowledge_base_factory import knowledge_base_from_env
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("TestDocumentService")
 
 async def main():
     document_service = DocumentService([".pdf"])
-    logger.info("Starting document ingestion from 'docs/' directory...")
-    chunks = await document_service.ingest_documents("docs/")
+    logger.info("Starting incremental document ingestion from 'docs/' directory...")
+    # Changed files are parsed while their chunks are inserted, so only the file list is read here.
+    batch = await document_service.ingest_changed_documents("docs/", parse=False)
 
-    for chunk in chunks:
-        logger.info(f"Chunk ID: {chunk.chunk_id}\nContent Preview: {chunk.content[:100]}\nMetadata: {chunk.metadata}\n{'-'*40}")
+    logger.info(f"Changed files: {batch.changed_files}\nRemoved files: {batch.removed_files}")
+
+    knowledge_service = KnowledgeService(knowledge_base_from_env())
+    if batch.deleted_chunk_ids:
+        if not await knowledge_service.delete(batch.deleted_chunk_ids):
+            logger.error("Deleting stale chunks failed; the manifest is left unchanged so the next run retries.")
+            return
+        logger.info(f"Deleted {len(batch.deleted_chunk_ids)} stale chunks from the knowledge base.")
+
+    if batch.changed_files:
+        if not await knowledge_service.insert_stream(document_service.stream_changed_documents(batch)):
+            logger.error("Inserting chunks failed; the manifest is left unchanged so the next run retries.")
+            return
+        logger.info("Inserted chunks of the changed files into the knowledge base.")
+
+    document_service.commit_manifest()
 
-    kb = LlamaIndexKnowledgeBase(persist_dir="./storage")
-    await kb.insert(chunks)
-    logger.info("Inserted chunks into the knowledge base.")
-    await kb.persist()
-    
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,31 @@
+import asyncio
+import logging
+
+from benchmarks.fakes import FakeEmbedding
+from services.intent_router import IntentRouter, AGENT, POLICY, WORKING_HOURS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("TestIntentRouter")
+
+CASES = [
+    ("Миний энэ сарын ажилласан цаг хэд вэ?", WORKING_HOURS),
+    ("What is my overtime so far?", WORKING_HOURS),
+    # Hours keywords without a personal marker ask about the rules.
+    ("Илүү цагийн хөлсийг яаж тооцдог вэ?", POLICY),
+    ("How is overtime calculated?", POLICY),
+    ("Ээлжийн амралтын цалинг хэрхэн тооцдог вэ?", POLICY),
+    ("Өчигдөр 4 цаг өвчтэй байсныг цаг бүртгэлд оруулаад өгөөч", AGENT),
+]
+
+def test_routes():
+    router = IntentRouter(FakeEmbedding())
+
+    async def run():
+        return [(await router.route(question)).intent for question, _ in CASES]
+
+    for (question, expected), intent in zip(CASES, asyncio.run(run())):
+        assert intent == expected, f"{question!r} routed to {intent}, expected {expected}"
+
+if __name__ == "__main__":
+    test_routes()
+    logger.info("Intent router checks passed.")
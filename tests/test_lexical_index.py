@@ -0,0 +1,34 @@
+import logging
+
+from infrastructure.adapters.lexical_index import LexicalIndex, tokenize
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("TestLexicalIndex")
+
+# Nominative, genitive and accusative forms of each word.
+DECLENSIONS = [
+    ("амралт", "амралтын", "амралтыг"),
+    ("ажилтан", "ажилтны", "ажилтныг"),
+    ("цалин", "цалингийн", "цалинг"),
+    ("хуваарь", "хуваарийн", "хуваарийг"),
+    ("чөлөө", "чөлөөний", "чөлөөг"),
+    ("байгууллага", "байгууллагын", "байгууллагыг"),
+]
+
+def test_declensions_share_a_term():
+    for forms in DECLENSIONS:
+        terms = {tuple(tokenize(form)) for form in forms}
+        assert len(terms) == 1, f"{forms} tokenize to {terms}"
+
+def test_inflected_query_matches_nominative_text():
+    index = LexicalIndex()
+    index.add("leave", "Ээлжийн амралт олгох журам", {})
+    index.add("other", "Сонгон шалгаруулалтын үе шат", {})
+
+    hits = index.search("ээлжийн амралтын хуваарь", top_k=2)
+    assert hits and hits[0][0] == "leave", hits
+
+if __name__ == "__main__":
+    test_declensions_share_a_term()
+    test_inflected_query_matches_nominative_text()
+    logger.info("Lexical index checks passed.")
@@ -0,0 +1,53 @@
+import asyncio
+import logging
+import tempfile
+
+from benchmarks.fakes import FakeEmbedding
+from domain.entities import MCSDocumentChunk
+
+from services.document_service import DocumentService
+from infrastructure.adapters.numpy_adapter import NumpyKnowledgeBase
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("TestNumpyKB")
+
+async def main():
+    kb = NumpyKnowledgeBase(persist_dir="./storage_np")
+
+    if kb.count() == 0:
+        document_service = DocumentService([".pdf"])
+        chunks = await document_service.ingest_documents("docs/")
+        await kb.insert(chunks)
+        await kb.persist()
+        logger.info(f"Inserted {kb.count()} chunks into the NumPy knowledge base.")
+
+    responses = await kb.query("Цалинтай чөлөөний тухай мэдээлэл", top_k=3)
+    for response in responses.chunks:
+        logger.info(f"Chunk ID: {response.chunk_id}")
+        logger.info(f"Content: {response.content[:100]}")
+        logger.info(f"Metadata: {response.metadata}")
+        logger.info("-----")
+
+def test_reinserted_chunks_replace_their_rows():
+    kb = NumpyKnowledgeBase(persist_dir=tempfile.mkdtemp(), embed_model=FakeEmbedding())
+    chunks = [
+        MCSDocumentChunk(chunk_id=f"b{i}", content=f"Ээлжийн амралт {i}", metadata={"file_name": "HR-0505R-Амралт-220125.pdf"})
+        for i in range(8)
+    ]
+
+    async def run():
+        await kb.insert(chunks)
+        await kb.persist()
+        await kb.insert([MCSDocumentChunk(chunk_id="b0", content="Цалинтай чөлөө", metadata=chunks[0].metadata)])
+        await kb.persist()
+        return await kb.query("Цалинтай чөлөө", top_k=3)
+
+    result = asyncio.run(run())
+    ids = [chunk.chunk_id for chunk in kb.all_chunks()]
+    assert sorted(ids) == sorted(chunk.chunk_id for chunk in chunks), ids
+    assert kb.count() == 8
+    assert [chunk.chunk_id for chunk in result.chunks].count("b0") == 1
+    assert next(chunk for chunk in kb.all_chunks() if chunk.chunk_id == "b0").content == "Цалинтай чөлөө"
+
+if __name__ == "__main__":
+    asyncio.run(main())
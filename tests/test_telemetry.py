@@ -0,0 +1,85 @@
+import json
+import logging
+import asyncio
+
+import httpx
+from llama_index.core.base.llms.types import ChatMessage, MessageRole
+
+from infrastructure import telemetry
+from infrastructure.adapters.embedding_cache import CachedEmbedding
+from infrastructure.model_gateway import GatewayEmbedding, GatewayOpenAI, ModelGateway
+from infrastructure.telemetry import CACHE_REQUESTS, LLM_TOKENS, instrument_llama_index
+from benchmarks.fakes import FakeEmbedding
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("TestTelemetry")
+
+MODEL = "gpt-4o-mini"
+
+def _chunk(delta: dict, usage: dict | None = None, finish_reason: str | None = None) -> str:
+    choices = [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    return "data: " + json.dumps({
+        "id": "chatcmpl-test",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": MODEL,
+        "choices": choices,
+        "usage": usage,
+    }) + "\n\n"
+
+def _stream(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    # Usage arrives only when the request asks for it.
+    usage = {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15}
+    events = [
+        _chunk({"role": "assistant", "content": ""}),
+        _chunk({"content": "Сайн "}),
+        _chunk({"content": "байна"}, finish_reason="stop"),
+    ]
+    if body.get("stream_options", {}).get("include_usage"):
+        events.append(_chunk({}, usage=usage))
+    events.append("data: [DONE]\n\n")
+    return httpx.Response(200, headers={"content-type": "text/event-stream"}, content="".join(events).encode("utf-8"))
+
+async def _stream_reply() -> str:
+    llm = GatewayOpenAI(
+        gateway=ModelGateway.from_env(),
+        model=MODEL,
+        api_key="test",
+        max_retries=0,
+        async_http_client=httpx.AsyncClient(transport=httpx.MockTransport(_stream))
+    )
+    text = ""
+    async for response in await llm.astream_chat([ChatMessage(role=MessageRole.USER, content="Сайн уу")]):
+        text = response.message.content
+    return text
+
+def test_streamed_call_counts_tokens():
+    instrument_llama_index()
+    prompt_before = LLM_TOKENS.value(model=MODEL, kind="prompt")
+    completion_before = LLM_TOKENS.value(model=MODEL, kind="completion")
+
+    text = asyncio.run(_stream_reply())
+    assert text == "Сайн байна", text
+    assert LLM_TOKENS.value(model=MODEL, kind="prompt") - prompt_before == 12
+    assert LLM_TOKENS.value(model=MODEL, kind="completion") - completion_before == 3
+
+def test_cached_embedding_records_one_span_per_request():
+    instrument_llama_index()
+    embed_model = CachedEmbedding(GatewayEmbedding(FakeEmbedding(), gateway=ModelGateway.from_env()))
+    hits_before = CACHE_REQUESTS.value(cache="embedding", result="hit")
+
+    async def run():
+        current = telemetry._Trace(name="test", attributes={}, started=0.0)
+        telemetry._current_trace.set(current)
+        await embed_model.aget_query_embedding("Ээлжийн амралт")
+        await embed_model.aget_query_embedding("Ээлжийн амралт")
+        return [record["span"] for record in current.spans]
+
+    assert asyncio.run(run()) == ["embedding.request"]
+    assert CACHE_REQUESTS.value(cache="embedding", result="hit") - hits_before == 1
+
+if __name__ == "__main__":
+    test_streamed_call_counts_tokens()
+    test_cached_embedding_records_one_span_per_request()
+    logger.info("Telemetry checks passed.")
@@ -0,0 +1,208 @@
+import os
+import time
+import asyncio
+import logging
+import tempfile
+from typing import Dict, List
+
+from domain.entities import TimesheetSubmission
+from infrastructure.interfaces import ITimesheetSink
+from infrastructure.adapters.submission_log import SubmissionLog
+from services.timesheet_queue import TimesheetSubmissionQueue, QUEUED, SENT, FAILED
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("TestTimesheetQueue")
+
+class RecordingSink(ITimesheetSink):
+    """Books every entry once; raises while `failing` is set."""
+
+    def __init__(self, failing: bool = False):
+        self.failing = failing
+        self.calls = 0
+        self.booked: List[str] = []
+
+    async def submit(self, submissions: List[TimesheetSubmission]) -> Dict[str, str]:
+        self.calls += 1
+        if self.failing:
+            raise ConnectionError("ERP unavailable")
+        self.booked.extend(submission.idempotency_key for submission in submissions if submission.idempotency_key not in self.booked)
+        return {}
+
+class CountingLog(SubmissionLog):
+    def __init__(self, path: str):
+        super().__init__(path, fsync=False)
+        self.writes = 0
+
+    def _write(self, data: bytes) -> None:
+        self.writes += 1
+        # Slow enough that concurrent appends queue up behind the write in progress.
+        time.sleep(0.01)
+        super()._write(data)
+
+class FlakyLog(SubmissionLog):
+    """Fails the first `failures` appends made after `armed` is set."""
+
+    def __init__(self, path: str, failures: int):
+        super().__init__(path, fsync=False)
+        self.armed = False
+        self.failures = failures
+
+    async def append(self, submissions: List[TimesheetSubmission]) -> None:
+        if self.armed and self.failures > 0:
+            self.failures -= 1
+            raise OSError("disk full")
+        await super().append(submissions)
+
+def _submission(submission_id: str, status: str = QUEUED) -> TimesheetSubmission:
+    return TimesheetSubmission(
+        submission_id=submission_id,
+        idempotency_key=f"key-{submission_id}",
+        employee_email="bat@example.mn",
+        timestamp="2024-03-01T09:00:00",
+        hours=8,
+        absence_type="Ажилласан",
+        status=status
+    )
+
+async def _wait_for(predicate, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+def test_replay_drops_torn_record():
+    path = os.path.join(tempfile.mkdtemp(), "submissions.wal")
+
+    async def run():
+        log = SubmissionLog(path, fsync=False)
+        await log.append([_submission("a"), _submission("b")])
+        await log.append([_submission("a", status=SENT)])
+        log.close()
+
+    asyncio.run(run())
+    with open(path, "ab") as f:
+        f.write(b'{"submission_id": "c", "idempot')
+
+    submissions = SubmissionLog(path).replay()
+    assert list(submissions) == ["a", "b"]
+    assert submissions["a"].status == SENT and submissions["b"].status == QUEUED
+    with open(path, "rb") as f:
+        assert f.read().endswith(b"\n")
+
+def test_concurrent_appends_share_a_write():
+    log = CountingLog(os.path.join(tempfile.mkdtemp(), "submissions.wal"))
+
+    async def run():
+        await asyncio.gather(*(log.append([_submission(str(i))]) for i in range(200)))
+
+    asyncio.run(run())
+    log.close()
+    assert log.records == 200
+    assert log.writes <= 2, log.writes
+
+def test_duplicate_submit_returns_existing():
+    directory = tempfile.mkdtemp()
+    sink = RecordingSink()
+
+    async def run():
+        queue = TimesheetSubmissionQueue(SubmissionLog(os.path.join(directory, "submissions.wal"), fsync=False), sink, flush_interval_seconds=0)
+        first = await queue.submit("bat@example.mn", "2024-03-01T09:00:00", 8, "Ажилласан")
+        second = await queue.submit("Bat@example.mn ", "2024-03-01T09:00:00", 8.0, "Ажилласан")
+        assert second.submission_id == first.submission_id
+
+        await _wait_for(lambda: queue.status(first.submission_id).status == SENT)
+        third = await queue.submit("bat@example.mn", "2024-03-01T09:00:00", 8, "Ажилласан")
+        assert third.submission_id == first.submission_id
+        await queue.stop()
+
+    asyncio.run(run())
+    assert len(sink.booked) == 1
+
+def test_failing_delivery_backs_off_until_failed():
+    sink = RecordingSink(failing=True)
+    path = os.path.join(tempfile.mkdtemp(), "submissions.wal")
+
+    async def run():
+        queue = TimesheetSubmissionQueue(
+            SubmissionLog(path, fsync=False), sink,
+            flush_interval_seconds=0, max_attempts=3, backoff_seconds=0.05
+        )
+        submission = await queue.submit("bat@example.mn", "2024-03-01T09:00:00", 8, "Ажилласан")
+        started = time.monotonic()
+        await _wait_for(lambda: queue.status(submission.submission_id).status == FAILED)
+        elapsed = time.monotonic() - started
+        await queue.stop()
+        return submission.submission_id, elapsed
+
+    submission_id, elapsed = asyncio.run(run())
+    assert sink.calls == 3
+    # Backoffs of 0.05s and 0.1s between the three attempts.
+    assert elapsed >= 0.15, elapsed
+
+    replayed = SubmissionLog(path).replay()[submission_id]
+    assert replayed.status == FAILED and replayed.attempts == 3 and "ERP unavailable" in replayed.error
+
+def test_queued_entries_are_delivered_after_restart():
+    path = os.path.join(tempfile.mkdtemp(), "submissions.wal")
+
+    async def crash():
+        queue = TimesheetSubmissionQueue(SubmissionLog(path, fsync=False), RecordingSink(failing=True), flush_interval_seconds=60)
+        submission = await queue.submit("bat@example.mn", "2024-03-01T09:00:00", 8, "Ажилласан")
+        await queue.stop(timeout=0)
+        return submission.submission_id
+
+    async def restart(submission_id: str):
+        queue = TimesheetSubmissionQueue(SubmissionLog(path, fsync=False), sink, flush_interval_seconds=0)
+        assert queue.status(submission_id).status == QUEUED
+        await queue.start()
+        await _wait_for(lambda: queue.status(submission_id).status == SENT)
+        await queue.stop()
+
+    sink = RecordingSink()
+    asyncio.run(restart(asyncio.run(crash())))
+    assert len(sink.booked) == 1
+
+def test_outcome_is_applied_only_once_logged():
+    sink = RecordingSink()
+    log = FlakyLog(os.path.join(tempfile.mkdtemp(), "submissions.wal"), failures=1)
+
+    async def run():
+        queue = TimesheetSubmissionQueue(log, sink, flush_interval_seconds=0, backoff_seconds=0.05)
+        submission = await queue.submit("bat@example.mn", "2024-03-01T09:00:00", 8, "Ажилласан")
+        log.armed = True
+        # The first outcome is not logged, so the entry stays queued and is delivered again.
+        await _wait_for(lambda: sink.calls >= 1)
+        assert queue.status(submission.submission_id).status == QUEUED
+        await _wait_for(lambda: queue.status(submission.submission_id).status == SENT)
+        await queue.stop()
+        return submission.submission_id
+
+    submission_id = asyncio.run(run())
+    assert sink.calls == 2 and len(sink.booked) == 1
+    assert SubmissionLog(log._path).replay()[submission_id].status == SENT
+
+def test_log_is_compacted_to_one_record_per_submission():
+    log = SubmissionLog(os.path.join(tempfile.mkdtemp(), "submissions.wal"), fsync=False)
+
+    async def run():
+        queue = TimesheetSubmissionQueue(log, RecordingSink(), flush_interval_seconds=0, compact_min_records=1)
+        submissions = await asyncio.gather(*(
+            queue.submit("bat@example.mn", f"2024-03-{day:02d}T09:00:00", 8, "Ажилласан") for day in range(1, 6)
+        ))
+        await _wait_for(lambda: all(queue.status(submission.submission_id).status == SENT for submission in submissions))
+        await queue.stop()
+
+    asyncio.run(run())
+    replayed = SubmissionLog(log._path).replay()
+    assert log.records == 5 and len(replayed) == 5
+    assert all(submission.status == SENT for submission in replayed.values())
+
+if __name__ == "__main__":
+    test_replay_drops_torn_record()
+    test_concurrent_appends_share_a_write()
+    test_duplicate_submit_returns_existing()
+    test_failing_delivery_backs_off_until_failed()
+    test_queued_entries_are_delivered_after_restart()
+    test_outcome_is_applied_only_once_logged()
+    test_log_is_compacted_to_one_record_per_submission()
+    logger.info("Timesheet queue checks passed.")
@@ -0,0 +1,53 @@
+import os
+import shutil
+import logging
+import tempfile
+
+from infrastructure.adapters.timesheet_repository import CsvTimesheetRepository
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("TestTimesheetRepository")
+
+SOURCE = "docs/employee_timesheet.csv"
+
+def _copy() -> str:
+    path = os.path.join(tempfile.mkdtemp(), "timesheet.csv")
+    shutil.copy(SOURCE, path)
+    return path
+
+def test_blank_append_keeps_the_repository_usable():
+    path = _copy()
+    repository = CsvTimesheetRepository(path)
+    rows = len(repository.frame())
+    email = next(iter(repository._offsets))
+    hours = repository.total_salary_hours(email)
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n")
+    assert len(repository.frame()) == rows
+    assert repository.total_salary_hours(email) == hours
+
+    # The blank line is the new baseline, so later rows are still merged.
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(f"{email},03/01/2027 09:00,03/01/2027 17:00,8,8\n")
+    assert len(repository.frame()) == rows + 1
+    assert repository.total_salary_hours(email) == hours + 8
+
+def test_appended_rows_match_a_full_reload():
+    path = _copy()
+    repository = CsvTimesheetRepository(path)
+    repository.frame()
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("aaa@example.mn,02/01/2026 09:00,02/01/2026 17:00,8,8\n")
+        f.write(f"{next(iter(repository._offsets))},01/01/2020 09:00,01/01/2020 17:00,4,4\n")
+
+    merged = repository.frame()
+    reloaded = CsvTimesheetRepository(path)
+    assert merged.astype({"employee_email": str}).equals(reloaded.frame().astype({"employee_email": str}))
+    assert repository._offsets == reloaded._offsets
+
+if __name__ == "__main__":
+    test_blank_append_keeps_the_repository_usable()
+    test_appended_rows_match_a_full_reload()
+    logger.info("Timesheet repository checks passed.")
@@ -0,0 +1,175 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, List
+
+from botbuilder.core import BotFrameworkAdapter, TurnContext
+from botbuilder.schema import Activity
+from botframework.connector.auth import ClaimsIdentity
+
+from infrastructure.telemetry import ERRORS, registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("TurnQueue")
+
+QUEUE_DEPTH = registry.gauge("hr_helpdesk_turn_queue_depth", "Turns accepted but not yet picked up by a worker.")
+ACTIVE_WORKERS = registry.gauge("hr_helpdesk_turn_queue_active_workers", "Workers currently running a turn.")
+ACTIVITIES = registry.counter(
+    "hr_helpdesk_turn_queue_activities_total",
+    "Incoming activities by outcome: queued, duplicate (redelivered) or rejected (queue full).",
+    ["result"]
+)
+QUEUE_WAIT_SECONDS = registry.histogram(
+    "hr_helpdesk_turn_queue_wait_seconds",
+    "Time between acknowledging an activity and a worker starting its turn."
+)
+
+QUEUED = "queued"
+DUPLICATE = "duplicate"
+REJECTED = "rejected"
+
+@dataclass
+class _Turn:
+    activity: Activity
+    identity: ClaimsIdentity
+    enqueued: float
+
+class TurnQueue:
+    """
+    Runs bot turns on a bounded pool of workers after the HTTP request has been acknowledged.
+
+    Requests are authenticated before they are accepted. Turns of one conversation run one at
+    a time in arrival order, turns of different conversations run concurrently on up to
+    `workers` workers. Replies go out through the Bot Connector API from the worker, as with
+    proactive messages. Activities redelivered by Bot Framework are recognised by their ID and
+    dropped, and new activities are rejected once `max_pending` turns are waiting.
+    """
+
+    def __init__(
+            self,
+            adapter: BotFrameworkAdapter,
+            logic: Callable[[TurnContext], Awaitable],
+            workers: int = 8,
+            max_pending: int = 256,
+            dedup_ttl_seconds: float = 600,
+            dedup_size: int = 10000
+        ):
+
+        self._adapter = adapter
+        self._logic = logic
+        self._workers = workers
+        self._max_pending = max_pending
+        self._dedup_ttl_seconds = dedup_ttl_seconds
+        self._dedup_size = dedup_size
+
+        # Conversation ID -> its waiting turns. A conversation is in `_ready` at most once and
+        # is not put back until its running turn has finished, which keeps turns ordered.
+        self._pending: Dict[str, Deque[_Turn]] = {}
+        self._ready: asyncio.Queue[str] = asyncio.Queue()
+        self._depth = 0
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+        self._closing = False
+
+    async def start(self) -> None:
+        self._closing = False
+        self._tasks = [asyncio.create_task(self._work(i)) for i in range(self._workers)]
+        logger.info(f"Turn queue started with {self._workers} workers.")
+
+    async def stop(self, timeout: float = 30) -> None:
+        """Stops accepting activities, gives queued turns `timeout` seconds to finish and cancels the workers."""
+        self._closing = True
+        deadline = time.monotonic() + timeout
+        while (self._depth or ACTIVE_WORKERS.value()) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Turn queue stopped.")
+
+    async def submit(self, activity: Activity, auth_header: str) -> str:
+        """
+        Authenticates the activity and queues its turn. Returns QUEUED, DUPLICATE or REJECTED;
+        raises PermissionError when the request is not authorized.
+        """
+        identity = await self._adapter._authenticate_request(activity, auth_header or "")
+
+        key = self._dedup_key(activity)
+        if key is not None and self._is_duplicate(key):
+            ACTIVITIES.inc(result=DUPLICATE)
+            logger.info(f"Dropped redelivered activity {activity.id}.")
+            return DUPLICATE
+
+        if self._closing or self._depth >= self._max_pending:
+            ACTIVITIES.inc(result=REJECTED)
+            logger.warning(f"Turn queue full ({self._depth} pending); rejected activity {activity.id}.")
+            return REJECTED
+
+        if key is not None:
+            self._remember(key)
+
+        conversation_id = activity.conversation.id
+        turns = self._pending.get(conversation_id)
+        if turns is None:
+            turns = self._pending[conversation_id] = deque()
+            self._ready.put_nowait(conversation_id)
+        turns.append(_Turn(activity=activity, identity=identity, enqueued=time.monotonic()))
+
+        self._depth += 1
+        QUEUE_DEPTH.set(self._depth)
+        ACTIVITIES.inc(result=QUEUED)
+        return QUEUED
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self._depth,
+            "conversations": len(self._pending),
+            "active_workers": int(ACTIVE_WORKERS.value()),
+            "workers": len(self._tasks),
+        }
+
+    async def _work(self, worker: int) -> None:
+        while True:
+            conversation_id = await self._ready.get()
+            turn = self._pending[conversation_id].popleft()
+
+            self._depth -= 1
+            QUEUE_DEPTH.set(self._depth)
+            QUEUE_WAIT_SECONDS.observe(time.monotonic() - turn.enqueued)
+            ACTIVE_WORKERS.inc()
+
+            try:
+                await self._adapter.process_activity_with_identity(turn.activity, turn.identity, self._logic)
+            except Exception as e:
+                ERRORS.inc(span="queue.turn")
+                logger.exception(f"Worker {worker} failed on activity {turn.activity.id}: {e}")
+            finally:
+                ACTIVE_WORKERS.dec()
+                if self._pending[conversation_id]:
+                    self._ready.put_nowait(conversation_id)
+                else:
+                    del self._pending[conversation_id]
+
+    def _dedup_key(self, activity: Activity) -> str | None:
+        if not activity.id:
+            return None
+        conversation_id = activity.conversation.id if activity.conversation else ""
+        return f"{conversation_id}|{activity.id}"
+
+    def _is_duplicate(self, key: str) -> bool:
+        now = time.monotonic()
+        while self._seen:
+            oldest_key, seen_at = next(iter(self._seen.items()))
+            if now - seen_at <= self._dedup_ttl_seconds:
+                break
+            del self._seen[oldest_key]
+        return key in self._seen
+
+    def _remember(self, key: str) -> None:
+        self._seen[key] = time.monotonic()
+        while len(self._seen) > self._dedup_size:
+            self._seen.popitem(last=False)